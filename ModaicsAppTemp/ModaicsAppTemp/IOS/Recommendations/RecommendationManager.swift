@@ -33,18 +33,44 @@ final class RecommendationManager {
             mlModel = model
         }
 
-        // 2. Load pre-baked embeddings JSON (optional)
-        if  let eURL = Bundle.main.url(forResource: "Embeddings", withExtension: "json"),
-            let idURL = Bundle.main.url(forResource: "EmbeddingIDs", withExtension: "json"),
-            let eData = try? Data(contentsOf: eURL),
-            let idData = try? Data(contentsOf: idURL),
-            let vectors = try? JSONDecoder().decode([[Float]].self, from: eData),
-            let ids     = try? JSONDecoder().decode([UUID].self,     from: idData) {
+        // 2. Load pre-baked embeddings (optional): binary Embeddings.bin, else legacy JSON
+        guard let idURL = Bundle.main.url(forResource: "EmbeddingIDs", withExtension: "json"),
+              let idData = try? Data(contentsOf: idURL),
+              let ids    = try? JSONDecoder().decode([UUID].self, from: idData) else { return }
+
+        if let bURL = Bundle.main.url(forResource: "Embeddings", withExtension: "bin"),
+           let vectors = Self.loadBinaryEmbeddings(from: bURL) {
+            embeddings = vectors
+            itemIDs    = ids
+        } else if let eURL = Bundle.main.url(forResource: "Embeddings", withExtension: "json"),
+                  let eData = try? Data(contentsOf: eURL),
+                  let vectors = try? JSONDecoder().decode([[Float]].self, from: eData) {
             embeddings = vectors
             itemIDs    = ids
         }
     }
 
+    /// Reads `Embeddings.bin` written by the training pipeline:
+    /// 16-byte little-endian header (magic "MDEM", N: u32, D: u32, dtype: u32 = 1 for fp16)
+    /// followed by N×D row-major Float16 values. The file is memory-mapped, not parsed.
+    private static func loadBinaryEmbeddings(from url: URL) -> [[Float]]? {
+        guard let data = try? Data(contentsOf: url, options: .alwaysMapped),
+              data.count >= 16 else { return nil }
+
+        return data.withUnsafeBytes { raw -> [[Float]]? in
+            guard raw.prefix(4).elementsEqual("MDEM".utf8) else { return nil }
+            let n     = Int(UInt32(littleEndian: raw.loadUnaligned(fromByteOffset: 4,  as: UInt32.self)))
+            let d     = Int(UInt32(littleEndian: raw.loadUnaligned(fromByteOffset: 8,  as: UInt32.self)))
+            let dtype = UInt32(littleEndian: raw.loadUnaligned(fromByteOffset: 12, as: UInt32.self))
+            guard dtype == 1, raw.count >= 16 + n * d * MemoryLayout<Float16>.size else { return nil }
+
+            let values = UnsafeRawBufferPointer(rebasing: raw[16...]).bindMemory(to: Float16.self)
+            return (0..<n).map { row in
+                (0..<d).map { Float(values[row * d + $0]) }
+            }
+        }
+    }
+
     // MARK: – Public API  ---------------------------------------------------
     /// Returns the top *k* similar items to `queryItem`.
     func recommendations(for queryItem: FashionItem,
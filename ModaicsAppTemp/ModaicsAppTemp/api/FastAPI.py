@@ -3,27 +3,38 @@ Modaics API Backend Service
 FastAPI-based backend for handling server-side operations
 """
 
-from fastapi import FastAPI, HTTPException, UploadFile, File, Depends, BackgroundTasks
+from fastapi import FastAPI, HTTPException, UploadFile, File, Depends, BackgroundTasks, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator, model_validator
 from typing import List, Optional, Dict, Any
 import numpy as np
 from datetime import datetime, timedelta
 import torch
-import torchvision.transforms as transforms
 from PIL import Image
 import io
+import os
 import uuid
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 import firebase_admin
-from firebase_admin import credentials, firestore, auth, storage
+from firebase_admin import credentials, firestore, firestore_async, auth, storage
+from google.api_core.exceptions import Aborted, DeadlineExceeded
+from google.api_core.retry import if_exception_type
+from google.api_core.retry_async import AsyncRetry
 import redis
 import json
-from sklearn.neighbors import NearestNeighbors
-import joblib
+import orjson
+import zstandard
+import hnswlib
+from numba import njit, prange
+from collections import OrderedDict
 import logging
 from contextlib import asynccontextmanager
 
+from page_cursor import decode_page_cursor, encode_page_cursor
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -34,23 +45,100 @@ firebase_admin.initialize_app(cred, {
     'storageBucket': 'modaics.appspot.com'
 })
 
-db = firestore.client()
+# Async Firestore client so handlers never block the event loop
+db = firestore_async.client()
 bucket = storage.bucket()
 
 # Initialize Redis for caching
 redis_client = redis.Redis(host='localhost', port=6379, decode_responses=True)
+redis_binary_client = redis.Redis(host='localhost', port=6379, decode_responses=False)
+
+# Binary cache payloads: serialized JSON, zstd-compressed above the threshold
+CACHE_COMPRESS_THRESHOLD = 4096
+zstd_compressor = zstandard.ZstdCompressor(level=3)
+zstd_decompressor = zstandard.ZstdDecompressor()
+
+# Thread pool for blocking Firebase Storage uploads
+upload_executor = ThreadPoolExecutor(max_workers=8)
+
+# Bulk Firestore writes: 500 ops per WriteBatch (Firestore limit)
+WRITE_BATCH_SIZE = 500
+batch_commit_retry = AsyncRetry(predicate=if_exception_type(Aborted, DeadlineExceeded))
 
 # Security
 security = HTTPBearer()
 
+# Similarity index configuration
+EMBEDDING_DIM = 512  # FashionFeatureExtractor embedding size
+HNSW_INDEX_PATH = 'models/hnsw.bin'
+HNSW_ITEM_IDS_PATH = 'models/hnsw_item_ids.npy'
+HNSW_EF_SEARCH = 64
+
+# ImageNet normalization, pre-scaled to 0-255 pixel values for fused preprocessing
+IMAGENET_MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32) * 255
+IMAGENET_STD_INV = 1.0 / (np.array([0.229, 0.224, 0.225], dtype=np.float32) * 255)
+
+# Offline embedding reindex batch size
+REINDEX_BATCH_SIZE = 64
+
+# Trace + freeze the embedding model with TorchScript at load time
+TORCHSCRIPT_INFERENCE = os.getenv("TORCHSCRIPT_INFERENCE", "1") == "1"
+
+# Dynamic int8 quantization of Linear layers for CPU inference
+QUANTIZE_INT8 = os.getenv("QUANTIZE_INT8", "1") == "1"
+
+# ONNX Runtime inference (used when the exported model exists; see export_onnx_model)
+ONNX_MODEL_PATH = 'models/fashion.onnx'
+ONNX_OPSET = 17
+
+# Approximate similarity cache configuration
+SIM_CACHE_CAPACITY = 10000
+SIM_CACHE_TAU = 0.1  # Max cosine distance for an approximate hit
+SIM_CACHE_TTL = 600
+
+# Trending sorted set (score = views + 2 * likes, decayed hourly)
+TRENDING_KEY = "trending"
+TRENDING_DECAY = 0.98
+TRENDING_DECAY_INTERVAL = 3600
+TRENDING_DECAY_LOCK = "trending:decay"  # SET NX per interval: one worker decays
+TRENDING_SEEDED_KEY = "trending:seeded"  # set once the ZSET is backfilled from Firestore
+ITEM_CACHE_TTL = 300
+
+# Per-item embedding cache (fp16 bytes, no TTL; overwritten on re-upload)
+EMBEDDING_CACHE_PREFIX = "emb:"
+
+# Micro-batching for single-image embedding requests
+EMBED_BATCH_WINDOW = 0.01  # Seconds to wait for more requests after the first
+EMBED_MAX_BATCH = 32
+
 # Load ML models
+class EmbeddingModule(torch.nn.Module):
+    """Embedding-only view of FashionFeatureExtractor (traceable forward)"""
+    
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+    
+    def forward(self, x):
+        return self.model(x, return_embeddings=True)
+
 class ModelManager:
     def __init__(self):
         self.model = None
+        self.embedding_model = None
+        self.session = None  # onnxruntime InferenceSession, if available
         self.transform = None
         self.nn_index = None
+        self.item_ids = None  # HNSW label -> Firestore item id
         self.embeddings_cache = {}
         
+    def embed(self, inputs: np.ndarray) -> np.ndarray:
+        """Run the embedding model on a normalized (N, 3, 224, 224) float32 batch"""
+        if self.session is not None:
+            return self.session.run(None, {"input": inputs})[0]
+        with torch.inference_mode():
+            return self.embedding_model(torch.from_numpy(inputs)).numpy()
+    
     def load_models(self):
         """Load PyTorch model and similarity index"""
         try:
@@ -64,16 +152,35 @@ class ModelManager:
             self.model.load_state_dict(checkpoint['model_state_dict'])
             self.model.eval()
             
-            # Load similarity index
-            self.nn_index = joblib.load('models/similarity_index.pkl')
+            if QUANTIZE_INT8:
+                # int8 weights for the Linear layers (conv layers stay FP32;
+                # dynamic quantization does not cover Conv2d)
+                from torch.ao.quantization import quantize_dynamic
+                self.model = quantize_dynamic(self.model, {torch.nn.Linear}, dtype=torch.qint8)
+            
+            self.embedding_model = EmbeddingModule(self.model).eval()
+            if os.path.exists(ONNX_MODEL_PATH):
+                import onnxruntime as ort
+                so = ort.SessionOptions()
+                so.intra_op_num_threads = max(1, (os.cpu_count() or 2) // 2)
+                so.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+                self.session = ort.InferenceSession(
+                    ONNX_MODEL_PATH, sess_options=so, providers=["CPUExecutionProvider"]
+                )
+                logger.info(f"Using ONNX Runtime session from {ONNX_MODEL_PATH}")
+            elif TORCHSCRIPT_INFERENCE:
+                # Fuse ops and drop Python dispatch overhead for inference
+                traced = torch.jit.trace(self.embedding_model, torch.rand(1, 3, 224, 224))
+                self.embedding_model = torch.jit.optimize_for_inference(torch.jit.freeze(traced))
+            
+            # Load HNSW similarity index and its label -> item id mapping
+            self.nn_index = hnswlib.Index(space='cosine', dim=EMBEDDING_DIM)
+            self.nn_index.load_index(HNSW_INDEX_PATH)
+            self.nn_index.set_ef(HNSW_EF_SEARCH)
+            self.item_ids = np.load(HNSW_ITEM_IDS_PATH, allow_pickle=True)
             
             # Setup transforms
-            self.transform = transforms.Compose([
-                transforms.Resize(256),
-                transforms.CenterCrop(224),
-                transforms.ToTensor(),
-                transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
-            ])
+            self.transform = preprocess_image
             
             logger.info("Models loaded successfully")
         except Exception as e:
@@ -82,13 +189,150 @@ class ModelManager:
 
 model_manager = ModelManager()
 
+class SimilarityCache:
+    """
+    Approximate-hit cache for similarity queries.
+    Recent query embeddings live in a small in-process HNSW index; their
+    raw ANN results (top_k + 1, the query item itself included) live in Redis.
+    A new query whose nearest cached query is within SIM_CACHE_TAU reuses that
+    result instead of searching again; callers drop their own item on read.
+    """
+    
+    def __init__(self, capacity=SIM_CACHE_CAPACITY, tau=SIM_CACHE_TAU, ttl=SIM_CACHE_TTL):
+        self.capacity = capacity
+        self.tau = tau
+        self.ttl = ttl
+        self.index = hnswlib.Index(space='cosine', dim=EMBEDDING_DIM)
+        self.index.init_index(
+            max_elements=capacity, ef_construction=100, M=16, allow_replace_deleted=True
+        )
+        self.entries = OrderedDict()  # label -> Redis key, least recently used first
+        self.next_label = 0
+    
+    def _evict(self, label: int):
+        key = self.entries.pop(label)
+        self.index.mark_deleted(label)
+        redis_client.delete(key)
+    
+    def lookup(self, query_embedding: np.ndarray, top_k: int) -> Optional[List[Dict[str, Any]]]:
+        """Return cached raw results (up to top_k + 1) for a nearby query, or None on a miss"""
+        if not self.entries:
+            return None
+        
+        labels, distances = self.index.knn_query(query_embedding, k=1)
+        label = int(labels[0][0])
+        if distances[0][0] > self.tau:
+            return None
+        
+        cached = redis_client.get(self.entries[label])
+        if not cached:
+            # Redis entry expired; drop the stale index entry
+            self._evict(label)
+            return None
+        
+        payload = json.loads(cached)
+        if payload["top_k"] < top_k:
+            return None
+        
+        self.entries.move_to_end(label)
+        return payload["items"][:top_k + 1]
+    
+    def store(self, query_embedding: np.ndarray, top_k: int, items: List[Dict[str, Any]]):
+        """
+        Cache raw ANN results for a query (not filtered for the requesting item,
+        since nearby queries from other items share the entry), evicting the
+        least recently used entry if full
+        """
+        if len(self.entries) >= self.capacity:
+            self._evict(next(iter(self.entries)))
+        
+        label = self.next_label
+        self.next_label += 1
+        key = f"sim:{uuid.uuid4()}"
+        
+        self.index.add_items(query_embedding, [label], replace_deleted=True)
+        self.entries[label] = key
+        redis_client.setex(key, self.ttl, json.dumps({"top_k": top_k, "items": items}, default=str))
+
+similarity_cache = SimilarityCache()
+
+class EmbeddingBatcher:
+    """
+    Micro-batcher for embedding requests.
+    Requests arriving within EMBED_BATCH_WINDOW of the first queued one are
+    run as a single forward pass (at most EMBED_MAX_BATCH); each caller
+    awaits its own Future.
+    """
+    
+    def __init__(self, window=EMBED_BATCH_WINDOW, max_batch=EMBED_MAX_BATCH):
+        self.window = window
+        self.max_batch = max_batch
+        self.queue: Optional[asyncio.Queue] = None  # created by start(), on the serving loop
+    
+    def start(self) -> asyncio.Task:
+        """
+        Create the queue and launch the worker on the running loop (call from lifespan).
+        Creating the queue at import would bind it to the import-time loop on Python < 3.10.
+        """
+        self.queue = asyncio.Queue()
+        return asyncio.create_task(self.run())
+    
+    async def embed(self, image: Image.Image) -> List[float]:
+        """Queue an image and wait for its embedding"""
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((image, future))
+        return await future
+    
+    async def run(self):
+        """Worker loop: collect a batch, run one forward pass, resolve futures"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            # One window per batch (not per item), so a steady trickle can't stall the first caller
+            deadline = loop.time() + self.window
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self.queue.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout=remaining))
+                except asyncio.TimeoutError:
+                    break
+            
+            images = [image for image, _ in batch]
+            try:
+                embeddings = await asyncio.to_thread(extract_embeddings, images)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            
+            for (_, future), embedding in zip(batch, embeddings):
+                if not future.done():
+                    future.set_result(embedding)
+
+embedding_batcher = EmbeddingBatcher()
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     model_manager.load_models()
+    seed_task = asyncio.create_task(seed_trending_scores())
+    decay_task = asyncio.create_task(decay_trending_scores())
+    batcher_task = embedding_batcher.start()
     yield
     # Shutdown
+    seed_task.cancel()
+    decay_task.cancel()
+    batcher_task.cancel()
     redis_client.close()
+    redis_binary_client.close()
 
 # Create FastAPI app
 app = FastAPI(
@@ -127,6 +371,29 @@ class UserResponse(BaseModel):
     sustainability_points: int = 0
     created_at: datetime
 
+class MaterialComposition(BaseModel):
+    """Item materials as parallel arrays (one entry per material)"""
+    names: List[str] = []
+    fractions: List[float] = []
+    is_organic: List[bool] = []
+    is_recycled: List[bool] = []
+    
+    @model_validator(mode="after")
+    def check_lengths(self):
+        if not (len(self.names) == len(self.fractions) == len(self.is_organic) == len(self.is_recycled)):
+            raise ValueError("material_composition arrays must have equal lengths")
+        return self
+    
+    @classmethod
+    def from_records(cls, records: List[Dict[str, Any]]) -> "MaterialComposition":
+        """Convert the legacy list-of-dicts representation"""
+        return cls(
+            names=[r.get("name", "") for r in records],
+            fractions=[float(r.get("percentage") or 0) / 100 for r in records],
+            is_organic=[bool(r.get("is_organic")) for r in records],
+            is_recycled=[bool(r.get("is_recycled")) for r in records],
+        )
+
 class ItemCreate(BaseModel):
     name: str
     brand: str
@@ -137,7 +404,7 @@ class ItemCreate(BaseModel):
     listing_price: float
     description: str
     sustainability_info: Dict[str, Any]
-    material_composition: List[Dict[str, Any]]
+    material_composition: MaterialComposition
     color_tags: List[str]
     style_tags: List[str]
 
@@ -153,11 +420,24 @@ class ItemResponse(BaseModel):
     description: str
     image_urls: List[str]
     sustainability_score: Dict[str, Any]
+    material_composition: Optional[MaterialComposition] = None
     owner_id: str
     created_at: datetime
     view_count: int = 0
     like_count: int = 0
     is_available: bool = True
+    
+    @field_validator("material_composition", mode="before")
+    @classmethod
+    def convert_legacy_materials(cls, value):
+        # Documents not yet migrated still store a list of dicts
+        if isinstance(value, list):
+            return MaterialComposition.from_records(value)
+        return value
+
+class ItemPage(BaseModel):
+    items: List[ItemResponse]
+    next_cursor: Optional[str] = None  # Pass back as `cursor` to fetch the next page
 
 class SimilarityRequest(BaseModel):
     item_id: str
@@ -180,7 +460,7 @@ class SustainabilityScore(BaseModel):
 async def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
     """Verify Firebase auth token"""
     try:
-        decoded_token = auth.verify_id_token(credentials.credentials)
+        decoded_token = await asyncio.to_thread(auth.verify_id_token, credentials.credentials)
         return decoded_token
     except Exception as e:
         raise HTTPException(status_code=401, detail="Invalid authentication token")
@@ -194,7 +474,8 @@ async def register_user(user_data: UserCreate):
     """Register a new user"""
     try:
         # Create Firebase auth user
-        user = auth.create_user(
+        user = await asyncio.to_thread(
+            auth.create_user,
             email=user_data.email,
             password=user_data.password,
             display_name=user_data.username
@@ -216,7 +497,7 @@ async def register_user(user_data: UserCreate):
             "is_verified": False
         }
         
-        db.collection("users").document(user.uid).set(user_doc)
+        await db.collection("users").document(user.uid).set(user_doc)
         
         return UserResponse(**user_doc)
     
@@ -228,7 +509,7 @@ async def register_user(user_data: UserCreate):
 async def get_user(user_id: str, current_user=Depends(verify_token)):
     """Get user profile"""
     try:
-        user_doc = db.collection("users").document(user_id).get()
+        user_doc = await db.collection("users").document(user_id).get()
         
         if not user_doc.exists:
             raise HTTPException(status_code=404, detail="User not found")
@@ -245,37 +526,34 @@ async def follow_user(user_id: str, current_user=Depends(verify_token)):
     try:
         follower_id = current_user["uid"]
         
-        # Update follower's following list
         follower_ref = db.collection("users").document(follower_id)
-        follower_doc = follower_ref.get()
+        target_ref = db.collection("users").document(user_id)
+        
+        # Independent reads, issued concurrently on the shared client
+        follower_doc, target_doc = await asyncio.gather(follower_ref.get(), target_ref.get())
         
         if not follower_doc.exists:
             raise HTTPException(status_code=404, detail="Follower not found")
         
-        following = follower_doc.to_dict().get("following", [])
+        if not target_doc.exists:
+            raise HTTPException(status_code=404, detail="User not found")
         
-        if user_id in following:
+        if user_id in follower_doc.to_dict().get("following", []):
             # Unfollow
-            following.remove(user_id)
+            following_op = firestore.ArrayRemove([user_id])
+            followers_op = firestore.ArrayRemove([follower_id])
             action = "unfollowed"
         else:
             # Follow
-            following.append(user_id)
+            following_op = firestore.ArrayUnion([user_id])
+            followers_op = firestore.ArrayUnion([follower_id])
             action = "followed"
         
-        follower_ref.update({"following": following})
-        
-        # Update target user's followers list
-        target_ref = db.collection("users").document(user_id)
-        target_doc = target_ref.get()
-        
-        if target_doc.exists:
-            followers = target_doc.to_dict().get("followers", [])
-            if action == "followed":
-                followers.append(follower_id)
-            else:
-                followers.remove(follower_id) if follower_id in followers else None
-            target_ref.update({"followers": followers})
+        # Apply both sides atomically on the server
+        batch = db.batch()
+        batch.update(follower_ref, {"following": following_op})
+        batch.update(target_ref, {"followers": followers_op})
+        await batch.commit()
         
         return {"message": f"Successfully {action} user", "action": action}
     
@@ -304,31 +582,10 @@ async def create_item(
         )
         
         # Create item document
-        item_doc = {
-            "id": item_id,
-            "name": item_data.name,
-            "brand": item_data.brand,
-            "category": item_data.category,
-            "size": item_data.size,
-            "condition": item_data.condition,
-            "original_price": item_data.original_price,
-            "listing_price": item_data.listing_price,
-            "description": item_data.description,
-            "image_urls": [],  # Will be updated after image upload
-            "sustainability_score": sustainability_score,
-            "material_composition": item_data.material_composition,
-            "color_tags": item_data.color_tags,
-            "style_tags": item_data.style_tags,
-            "owner_id": current_user["uid"],
-            "created_at": datetime.utcnow(),
-            "updated_at": datetime.utcnow(),
-            "view_count": 0,
-            "like_count": 0,
-            "is_available": True
-        }
+        item_doc = build_item_doc(item_id, item_data, sustainability_score, current_user["uid"])
         
         # Save to Firestore
-        db.collection("items").document(item_id).set(item_doc)
+        await db.collection("items").document(item_id).set(item_doc)
         
         # Update user's sustainability points in background
         background_tasks.add_task(
@@ -343,6 +600,29 @@ async def create_item(
         logger.error(f"Failed to create item: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/items/bulk", response_model=List[ItemResponse])
+async def bulk_create_items_endpoint(
+    items: List[ItemCreate],
+    background_tasks: BackgroundTasks,
+    current_user=Depends(verify_token)
+):
+    """Create many item listings at once (e.g. wardrobe import)"""
+    try:
+        item_docs = await bulk_create_items(items, current_user["uid"])
+        
+        # Update user's sustainability points once for the whole import
+        background_tasks.add_task(
+            update_user_sustainability_points,
+            current_user["uid"],
+            sum(doc["sustainability_score"]["total_score"] for doc in item_docs)
+        )
+        
+        return [ItemResponse(**doc) for doc in item_docs]
+    
+    except Exception as e:
+        logger.error(f"Failed to bulk create items: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.post("/api/items/{item_id}/images")
 async def upload_item_images(
     item_id: str,
@@ -352,32 +632,39 @@ async def upload_item_images(
     """Upload images for an item"""
     try:
         # Verify item ownership
-        item_doc = db.collection("items").document(item_id).get()
+        item_doc = await db.collection("items").document(item_id).get()
         if not item_doc.exists:
             raise HTTPException(status_code=404, detail="Item not found")
         
         if item_doc.to_dict()["owner_id"] != current_user["uid"]:
             raise HTTPException(status_code=403, detail="Not authorized")
         
-        image_urls = []
+        files = files[:5]  # Limit to 5 images
+        
+        # Decode straight from the spooled upload files (no full-body bytes copy),
+        # off the event loop; finishes before the uploads start reading the same files
+        images = await asyncio.to_thread(decode_upload_images, files)
+        
+        # Stream files to Firebase Storage off the event loop
+        loop = asyncio.get_running_loop()
+        uploads = [
+            loop.run_in_executor(
+                upload_executor,
+                upload_image_blob,
+                f"items/{item_id}/{idx}_{file.filename}",
+                file.file,
+                file.content_type,
+                file.size
+            )
+            for idx, file in enumerate(files)
+        ]
+        
+        # Embed all images in one forward pass (worker thread) while uploads are in flight
         embeddings = []
+        if images:
+            embeddings = await asyncio.to_thread(extract_embeddings, images)
         
-        for idx, file in enumerate(files[:5]):  # Limit to 5 images
-            # Upload to Firebase Storage
-            blob_name = f"items/{item_id}/{idx}_{file.filename}"
-            blob = bucket.blob(blob_name)
-            
-            contents = await file.read()
-            blob.upload_from_string(contents, content_type=file.content_type)
-            blob.make_public()
-            
-            image_urls.append(blob.public_url)
-            
-            # Extract embedding for first image
-            if idx == 0:
-                image = Image.open(io.BytesIO(contents)).convert('RGB')
-                embedding = extract_embedding(image)
-                embeddings.append(embedding)
+        image_urls = list(await asyncio.gather(*uploads))
         
         # Update item with image URLs and embedding
         update_data = {
@@ -386,9 +673,13 @@ async def upload_item_images(
         }
         
         if embeddings:
-            update_data["embedding"] = embeddings[0]
+            # Item embedding is the mean over all of its images
+            update_data["embedding"] = encode_embedding(np.mean(embeddings, axis=0))
         
-        db.collection("items").document(item_id).update(update_data)
+        await db.collection("items").document(item_id).update(update_data)
+        
+        if embeddings:
+            redis_binary_client.set(f"{EMBEDDING_CACHE_PREFIX}{item_id}", update_data["embedding"])
         
         return {"image_urls": image_urls, "message": "Images uploaded successfully"}
     
@@ -396,23 +687,24 @@ async def upload_item_images(
         logger.error(f"Failed to upload images: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/items", response_model=List[ItemResponse])
+@app.get("/api/items", response_model=ItemPage)
 async def get_items(
     category: Optional[str] = None,
     min_price: Optional[float] = None,
     max_price: Optional[float] = None,
     min_sustainability: Optional[int] = None,
     limit: int = 20,
-    offset: int = 0
+    cursor: Optional[str] = None
 ):
-    """Get items with filters"""
+    """Get items with filters, newest first, paginated by cursor"""
     try:
         # Check cache first
-        cache_key = f"items:{category}:{min_price}:{max_price}:{min_sustainability}:{limit}:{offset}"
-        cached_result = redis_client.get(cache_key)
+        cache_key = f"items:{category}:{min_price}:{max_price}:{min_sustainability}:{limit}:{cursor}"
+        cached_result = redis_binary_client.get(cache_key)
         
         if cached_result:
-            return json.loads(cached_result)
+            # Return the pre-serialized JSON as-is (no parsing or re-validation)
+            return Response(content=unpack_cache_payload(cached_result), media_type="application/json")
         
         # Build query
         query = db.collection("items")
@@ -429,16 +721,32 @@ async def get_items(
         if min_sustainability is not None:
             query = query.where("sustainability_score.total_score", ">=", min_sustainability)
         
+        # Newest first; doc id breaks ties between items created in one batch
+        query = query.order_by("created_at", direction=firestore.Query.DESCENDING)
+        query = query.order_by("__name__", direction=firestore.Query.DESCENDING)
+        
+        if cursor:
+            created_at, doc_id = decode_page_cursor(cursor)
+            query = query.start_after({
+                "created_at": created_at,
+                "__name__": db.collection("items").document(doc_id)
+            })
+        
         # Execute query
         items = []
-        for doc in query.limit(limit).offset(offset).stream():
+        async for doc in query.limit(limit).stream():
             items.append(ItemResponse(**doc.to_dict()))
         
+        next_cursor = encode_page_cursor(items[-1].created_at, items[-1].id) if len(items) == limit else None
+        payload = orjson.dumps({"items": [item.dict() for item in items], "next_cursor": next_cursor})
+        
         # Cache result for 5 minutes
-        redis_client.setex(cache_key, 300, json.dumps([item.dict() for item in items]))
+        redis_binary_client.setex(cache_key, 300, pack_cache_payload(payload))
         
-        return items
+        return Response(content=payload, media_type="application/json")
     
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Failed to get items: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -449,38 +757,40 @@ async def like_item(item_id: str, current_user=Depends(verify_token)):
     try:
         user_id = current_user["uid"]
         
-        # Get user's liked items
         user_ref = db.collection("users").document(user_id)
-        user_doc = user_ref.get()
+        item_ref = db.collection("items").document(item_id)
+        
+        # Independent reads, issued concurrently on the shared client
+        user_doc, item_doc = await asyncio.gather(user_ref.get(), item_ref.get())
         
         if not user_doc.exists:
             raise HTTPException(status_code=404, detail="User not found")
         
-        liked_items = user_doc.to_dict().get("liked_items", [])
-        
-        # Get item
-        item_ref = db.collection("items").document(item_id)
-        item_doc = item_ref.get()
-        
         if not item_doc.exists:
             raise HTTPException(status_code=404, detail="Item not found")
         
         like_count = item_doc.to_dict().get("like_count", 0)
         
-        if item_id in liked_items:
+        if item_id in user_doc.to_dict().get("liked_items", []):
             # Unlike
-            liked_items.remove(item_id)
-            like_count = max(0, like_count - 1)
+            liked_items_op = firestore.ArrayRemove([item_id])
+            delta = -1 if like_count > 0 else 0
             action = "unliked"
         else:
             # Like
-            liked_items.append(item_id)
-            like_count += 1
+            liked_items_op = firestore.ArrayUnion([item_id])
+            delta = 1
             action = "liked"
         
-        # Update user and item
-        user_ref.update({"liked_items": liked_items})
-        item_ref.update({"like_count": like_count})
+        like_count += delta
+        
+        # Update user and item atomically on the server
+        batch = db.batch()
+        batch.update(user_ref, {"liked_items": liked_items_op})
+        batch.update(item_ref, {"like_count": firestore.Increment(delta)})
+        await batch.commit()
+        
+        redis_client.zincrby(TRENDING_KEY, 2 * delta, item_id)
         
         return {"message": f"Successfully {action} item", "action": action, "like_count": like_count}
     
@@ -488,6 +798,19 @@ async def like_item(item_id: str, current_user=Depends(verify_token)):
         logger.error(f"Failed to like/unlike item: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/items/{item_id}/view")
+async def view_item(item_id: str):
+    """Record a view of an item"""
+    try:
+        await db.collection("items").document(item_id).update({"view_count": firestore.Increment(1)})
+        redis_client.zincrby(TRENDING_KEY, 1, item_id)
+        
+        return {"message": "View recorded"}
+    
+    except Exception as e:
+        logger.error(f"Failed to record view: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 # =====================================================
 # ML/Recommendation Endpoints
 # =====================================================
@@ -500,34 +823,48 @@ async def get_similar_items(request: SimilarityRequest):
             # Use provided embedding
             query_embedding = np.array(request.embedding).reshape(1, -1)
         else:
-            # Get embedding from item
-            item_doc = db.collection("items").document(request.item_id).get()
-            if not item_doc.exists:
-                raise HTTPException(status_code=404, detail="Item not found")
+            # Get embedding from the Redis cache, falling back to the item doc
+            cache_key = f"{EMBEDDING_CACHE_PREFIX}{request.item_id}"
+            embedding = redis_binary_client.get(cache_key)
+            if embedding is None:
+                item_doc = await db.collection("items").document(request.item_id).get()
+                if not item_doc.exists:
+                    raise HTTPException(status_code=404, detail="Item not found")
+                
+                embedding = item_doc.to_dict().get("embedding")
+                if not embedding:
+                    raise HTTPException(status_code=400, detail="Item has no embedding")
+                
+                embedding = encode_embedding(decode_embedding(embedding))
+                redis_binary_client.set(cache_key, embedding)
             
-            embedding = item_doc.to_dict().get("embedding")
-            if not embedding:
-                raise HTTPException(status_code=400, detail="Item has no embedding")
-            
-            query_embedding = np.array(embedding).reshape(1, -1)
-        
-        # Find similar items using the pre-built index
-        distances, indices = model_manager.nn_index.kneighbors(
-            query_embedding, 
-            n_neighbors=request.top_k + 1  # +1 to exclude self
-        )
+            query_embedding = decode_embedding(embedding).reshape(1, -1)
         
-        # Get item IDs from indices (this assumes you have a mapping)
-        # For now, we'll query items by embedding similarity
-        similar_items = []
+        query_embedding = query_embedding.astype(np.float32)
         
-        # In production, you'd have a better way to map indices to items
-        # For now, return top items from database
-        items_query = db.collection("items").limit(request.top_k).stream()
-        for doc in items_query:
-            if doc.id != request.item_id:
-                similar_items.append(ItemResponse(**doc.to_dict()))
+        # Serve near-duplicate queries from the similarity cache
+        candidates = similarity_cache.lookup(query_embedding, request.top_k)
+        if candidates is None:
+            # Find similar items using the HNSW index (+1 to exclude self)
+            count = model_manager.nn_index.get_current_count()
+            if count == 0:
+                return {"similar_items": [], "count": 0}
+            k = min(request.top_k + 1, count)
+            labels, distances = model_manager.nn_index.knn_query(query_embedding, k=k)
+            candidate_ids = [str(item_id) for item_id in model_manager.item_ids[labels[0]]]
+            
+            # Fetch matched items, preserving similarity order
+            refs = [db.collection("items").document(item_id) for item_id in candidate_ids]
+            docs = {doc.id: doc async for doc in db.get_all(refs) if doc.exists}
+            candidates = [
+                ItemResponse(**docs[item_id].to_dict()).dict()
+                for item_id in candidate_ids if item_id in docs
+            ]
+            
+            # Cached unfiltered: the entry also serves nearby queries from other items
+            similarity_cache.store(query_embedding, request.top_k, candidates)
         
+        similar_items = [item for item in candidates if item["id"] != request.item_id][:request.top_k]
         return {"similar_items": similar_items, "count": len(similar_items)}
     
     except Exception as e:
@@ -538,10 +875,10 @@ async def get_similar_items(request: SimilarityRequest):
 async def extract_embedding_endpoint(file: UploadFile = File(...)):
     """Extract embedding from an uploaded image"""
     try:
-        contents = await file.read()
-        image = Image.open(io.BytesIO(contents)).convert('RGB')
+        # Decode from the spooled upload file, off the event loop
+        (image,) = await asyncio.to_thread(decode_upload_images, [file])
         
-        embedding = extract_embedding(image)
+        embedding = await embedding_batcher.embed(image)
         
         return {"embedding": embedding, "dimension": len(embedding)}
     
@@ -559,28 +896,29 @@ async def get_sustainability_impact(current_user=Depends(verify_token)):
     try:
         user_id = current_user["uid"]
         
-        # Get user's items and transactions
-        items_query = db.collection("items").where("owner_id", "==", user_id).stream()
-        transactions_query = db.collection("transactions").where("buyer_id", "==", user_id).stream()
-        
-        total_water_saved = 0
-        total_co2_saved = 0
-        items_recycled = 0
-        
-        for item_doc in items_query:
-            item = item_doc.to_dict()
-            score = item.get("sustainability_score", {})
-            total_water_saved += score.get("water_usage", 0)
-            total_co2_saved += score.get("carbon_footprint", 0)
-            if score.get("is_recycled", False):
-                items_recycled += 1
-        
-        for trans_doc in transactions_query:
-            trans = trans_doc.to_dict()
-            if trans.get("type") == "swap":
-                # Swaps save more resources
-                total_water_saved += 2000  # Average water per item
-                total_co2_saved += 5  # Average CO2 per item
+        # Get user's items and transactions concurrently
+        items_docs, trans_docs = await asyncio.gather(
+            db.collection("items")
+                .where("owner_id", "==", user_id)
+                .select(["sustainability_score"])
+                .get(),
+            db.collection("transactions")
+                .where("buyer_id", "==", user_id)
+                .select(["type"])
+                .get()
+        )
+        
+        scores = [doc.to_dict().get("sustainability_score", {}) for doc in items_docs]
+        water = np.fromiter((score.get("water_usage", 0) for score in scores), dtype=np.float64, count=len(scores))
+        co2 = np.fromiter((score.get("carbon_footprint", 0) for score in scores), dtype=np.float64, count=len(scores))
+        recycled = np.fromiter((bool(score.get("is_recycled", False)) for score in scores), dtype=bool, count=len(scores))
+        
+        # Swaps save more resources (average water / CO2 per item)
+        swaps = sum(1 for doc in trans_docs if doc.to_dict().get("type") == "swap")
+        
+        total_water_saved = float(water.sum()) + 2000 * swaps
+        total_co2_saved = float(co2.sum()) + 5 * swaps
+        items_recycled = int(recycled.sum())
         
         return {
             "water_saved_liters": total_water_saved,
@@ -594,26 +932,45 @@ async def get_sustainability_impact(current_user=Depends(verify_token)):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/analytics/trending")
-async def get_trending_items(limit: int = 10):
+async def get_trending_items(limit: int = Query(10, ge=1)):
     """Get trending items based on views and likes"""
     try:
-        # Calculate trending score (views + 2 * likes)
-        # In production, use a more sophisticated algorithm
+        # Trending score (views + 2 * likes) is maintained in a Redis sorted set
+        item_ids = redis_client.zrevrange(TRENDING_KEY, 0, limit - 1)
         
-        trending_items = []
-        items_query = db.collection("items")\
-            .order_by("like_count", direction=firestore.Query.DESCENDING)\
-            .limit(limit)\
-            .stream()
+        # Serve item documents from the Redis item cache, Firestore for misses
+        cached = redis_client.mget([f"item:{item_id}" for item_id in item_ids]) if item_ids else []
+        items_by_id = {
+            item_id: ItemResponse(**json.loads(data))
+            for item_id, data in zip(item_ids, cached) if data
+        }
+        
+        missing_refs = [
+            db.collection("items").document(item_id)
+            for item_id in item_ids if item_id not in items_by_id
+        ]
+        if missing_refs:
+            pipe = redis_client.pipeline()
+            async for doc in db.get_all(missing_refs):
+                if doc.exists:
+                    item = ItemResponse(**doc.to_dict())
+                    items_by_id[doc.id] = item
+                    pipe.setex(f"item:{doc.id}", ITEM_CACHE_TTL, json.dumps(item.dict(), default=str))
+            pipe.execute()
         
-        for doc in items_query:
-            item_data = doc.to_dict()
-            trending_score = item_data.get("view_count", 0) + 2 * item_data.get("like_count", 0)
-            item_data["trending_score"] = trending_score
-            trending_items.append(ItemResponse(**item_data))
+        trending_items = [items_by_id[item_id] for item_id in item_ids if item_id in items_by_id]
         
-        # Sort by trending score
-        trending_items.sort(key=lambda x: x.dict().get("trending_score", 0), reverse=True)
+        if len(trending_items) < limit:
+            # Cold start or sparse set (e.g. before the backfill finishes): top up with most-liked items
+            items_query = db.collection("items")\
+                .order_by("like_count", direction=firestore.Query.DESCENDING)\
+                .limit(limit)\
+                .stream()
+            async for doc in items_query:
+                if len(trending_items) >= limit:
+                    break
+                if doc.id not in items_by_id:
+                    trending_items.append(ItemResponse(**doc.to_dict()))
         
         return {"trending_items": trending_items}
     
@@ -627,18 +984,15 @@ async def get_trending_items(limit: int = 10):
 
 def calculate_sustainability_score(
     sustainability_info: Dict[str, Any],
-    material_composition: List[Dict[str, Any]]
+    material_composition: MaterialComposition
 ) -> Dict[str, Any]:
     """Calculate comprehensive sustainability score"""
     
     base_score = 50
     
     # Material bonus
-    for material in material_composition:
-        if material.get("is_organic"):
-            base_score += 10
-        if material.get("is_recycled"):
-            base_score += 15
+    base_score += 10 * sum(material_composition.is_organic)
+    base_score += 15 * sum(material_composition.is_recycled)
     
     # Certification bonus
     certifications = sustainability_info.get("certifications", [])
@@ -665,35 +1019,425 @@ def calculate_sustainability_score(
         "fibre_trace_verified": sustainability_info.get("fibre_trace_verified", False)
     }
 
+def pack_cache_payload(buf: bytes) -> bytes:
+    """Frame a serialized cache payload, zstd-compressing large ones"""
+    if len(buf) > CACHE_COMPRESS_THRESHOLD:
+        return b"\x01" + zstd_compressor.compress(buf)
+    return b"\x00" + buf
+
+def unpack_cache_payload(blob: bytes) -> bytes:
+    """Inverse of pack_cache_payload"""
+    buf = blob[1:]
+    if blob[:1] == b"\x01":
+        buf = zstd_decompressor.decompress(buf)
+    return buf
+
+def build_item_doc(
+    item_id: str,
+    item_data: ItemCreate,
+    sustainability_score: Dict[str, Any],
+    owner_id: str
+) -> Dict[str, Any]:
+    """Build the Firestore document for a new item"""
+    now = datetime.utcnow()
+    return {
+        "id": item_id,
+        "name": item_data.name,
+        "brand": item_data.brand,
+        "category": item_data.category,
+        "size": item_data.size,
+        "condition": item_data.condition,
+        "original_price": item_data.original_price,
+        "listing_price": item_data.listing_price,
+        "description": item_data.description,
+        "image_urls": [],  # Will be updated after image upload
+        "sustainability_score": sustainability_score,
+        "material_composition": item_data.material_composition.dict(),
+        "color_tags": item_data.color_tags,
+        "style_tags": item_data.style_tags,
+        "owner_id": owner_id,
+        "created_at": now,
+        "updated_at": now,
+        "view_count": 0,
+        "like_count": 0,
+        "is_available": True
+    }
+
+async def bulk_create_items(items: List[ItemCreate], owner_id: str) -> List[Dict[str, Any]]:
+    """
+    Score and write many items to Firestore.
+    Writes are grouped into WriteBatches of WRITE_BATCH_SIZE and committed
+    concurrently, retrying on Aborted/DeadlineExceeded.
+    """
+    if not items:
+        return []
+    
+    # Score all items in one vectorized pass
+    infos = [item.sustainability_info for item in items]
+    scores = calculate_sustainability_score_batch(
+        materials_to_soa([item.material_composition for item in items]),
+        np.fromiter((len(info.get("certifications", [])) for info in infos), dtype=np.int64),
+        np.fromiter((bool(info.get("fibre_trace_verified")) for info in infos), dtype=bool)
+    )
+    
+    item_docs = []
+    for i, (item, info) in enumerate(zip(items, infos)):
+        certifications = info.get("certifications", [])
+        sustainability_score = {
+            "total_score": int(scores["total_score"][i]),
+            "carbon_footprint": float(scores["carbon_footprint"][i]),
+            "water_usage": float(scores["water_usage"][i]),
+            "is_recycled": info.get("is_recycled", False),
+            "is_certified": len(certifications) > 0,
+            "certifications": certifications,
+            "fibre_trace_verified": info.get("fibre_trace_verified", False)
+        }
+        item_docs.append(build_item_doc(str(uuid.uuid4()), item, sustainability_score, owner_id))
+    
+    async def commit_chunk(chunk: List[Dict[str, Any]]):
+        batch = db.batch()
+        for doc in chunk:
+            batch.set(db.collection("items").document(doc["id"]), doc)
+        await batch.commit(retry=batch_commit_retry)
+    
+    await asyncio.gather(*[
+        commit_chunk(item_docs[start:start + WRITE_BATCH_SIZE])
+        for start in range(0, len(item_docs), WRITE_BATCH_SIZE)
+    ])
+    
+    logger.info(f"Bulk created {len(item_docs)} items for user {owner_id}")
+    return item_docs
+
+def materials_to_soa(material_compositions: List[MaterialComposition]) -> Dict[str, np.ndarray]:
+    """Concatenate per-item material arrays into flat arrays for batch scoring"""
+    lengths = np.fromiter((len(m.names) for m in material_compositions), dtype=np.int64)
+    
+    return {
+        # Item i owns materials offsets[i]:offsets[i + 1]
+        "offsets": np.concatenate(([0], np.cumsum(lengths))),
+        "is_organic": np.fromiter(
+            (flag for m in material_compositions for flag in m.is_organic), dtype=np.float64
+        ),
+        "is_recycled": np.fromiter(
+            (flag for m in material_compositions for flag in m.is_recycled), dtype=np.float64
+        ),
+    }
+
+@njit(parallel=True, cache=True)
+def sustainability_totals_kernel(offsets, is_organic, is_recycled, cert_counts, fibre_trace_verified, out):
+    """Per-item total sustainability score, parallel over items"""
+    for i in prange(len(out)):
+        score = 50.0 + 5.0 * cert_counts[i]
+        for j in range(offsets[i], offsets[i + 1]):
+            score += 10.0 * is_organic[j] + 15.0 * is_recycled[j]
+        if fibre_trace_verified[i]:
+            score += 20.0
+        out[i] = min(100, int(score))
+
+def calculate_sustainability_score_batch(
+    materials_soa: Dict[str, np.ndarray],
+    cert_counts: np.ndarray,
+    fibre_trace_verified: np.ndarray
+) -> Dict[str, np.ndarray]:
+    """
+    Vectorized sustainability scoring for many items at once.
+    Same scoring rules as calculate_sustainability_score; materials_soa is
+    the output of materials_to_soa().
+    """
+    total_score = np.empty(len(cert_counts), dtype=np.int64)
+    sustainability_totals_kernel(
+        materials_soa["offsets"],
+        materials_soa["is_organic"],
+        materials_soa["is_recycled"],
+        np.asarray(cert_counts, dtype=np.int64),
+        np.asarray(fibre_trace_verified, dtype=np.bool_),
+        total_score
+    )
+    impact = 1 - total_score / 100
+    
+    return {
+        "total_score": total_score,
+        "carbon_footprint": 5 * impact,
+        "water_usage": 2000 * impact,
+    }
+
+def resize_and_crop(image: Image.Image, resize: int = 256, crop: int = 224) -> Image.Image:
+    """Resize the shorter side to `resize`, then center crop to `crop` x `crop`"""
+    width, height = image.size
+    scale = resize / min(width, height)
+    width, height = round(width * scale), round(height * scale)
+    image = image.resize((width, height), Image.BILINEAR)
+    
+    left, top = (width - crop) // 2, (height - crop) // 2
+    return image.crop((left, top, left + crop, top + crop))
+
+def preprocess_image(image: Image.Image) -> torch.Tensor:
+    """
+    Resize (shorter side) + center crop + normalize in a single pixel pass.
+    Equivalent to Resize -> CenterCrop -> ToTensor -> Normalize, without the
+    intermediate tensor allocations.
+    """
+    image = resize_and_crop(image)
+    
+    # /255, mean subtraction and std division fused into one subtract + multiply
+    arr = np.array(image, dtype=np.float32)
+    arr -= IMAGENET_MEAN
+    arr *= IMAGENET_STD_INV
+    
+    return torch.from_numpy(arr.transpose(2, 0, 1))
+
+@njit(parallel=True, fastmath=True, cache=True)
+def normalize_batch(images_u8, mean, std_inv, out):
+    """
+    Normalize a (N, H, W, 3) uint8 batch into a preallocated (N, 3, H, W)
+    float32 buffer. Used by the offline reindex; API calls use preprocess_image.
+    """
+    n, height, width, channels = images_u8.shape
+    for i in prange(n):
+        for y in range(height):
+            for x in range(width):
+                for c in range(channels):
+                    out[i, c, y, x] = (images_u8[i, y, x, c] - mean[c]) * std_inv[c]
+
+def encode_embedding(embedding) -> bytes:
+    """Pack an embedding as float16 bytes for storage"""
+    return np.asarray(embedding, dtype=np.float16).tobytes()
+
+def decode_embedding(value) -> np.ndarray:
+    """Unpack a stored embedding (float16 bytes, or a legacy float list) to float32"""
+    if isinstance(value, bytes):
+        return np.frombuffer(value, dtype=np.float16).astype(np.float32)
+    return np.asarray(value, dtype=np.float32)
+
 def extract_embedding(image: Image.Image) -> List[float]:
     """Extract embedding from PIL image using the loaded model"""
+    return extract_embeddings([image])[0]
+
+def extract_embeddings(images: List[Image.Image]) -> List[List[float]]:
+    """Extract embeddings for a batch of PIL images in a single forward pass"""
     try:
-        # Transform image
-        image_tensor = model_manager.transform(image).unsqueeze(0)
+        # Transform and stack images into one batch
+        image_tensors = torch.stack([model_manager.transform(image) for image in images])
         
-        # Extract embedding
-        with torch.no_grad():
-            embedding = model_manager.model(image_tensor, return_embeddings=True)
-            embedding = embedding.cpu().numpy().squeeze()
+        # Extract embeddings
+        embeddings = model_manager.embed(image_tensors.numpy())
         
-        return embedding.tolist()
+        return embeddings.tolist()
     
     except Exception as e:
-        logger.error(f"Failed to extract embedding: {e}")
+        logger.error(f"Failed to extract embeddings: {e}")
         raise
 
+def decode_upload_images(files: List[UploadFile]) -> List[Image.Image]:
+    """Decode uploaded files to RGB images, rewinding each for the upload that follows (blocking)"""
+    images = []
+    for file in files:
+        images.append(Image.open(file.file).convert('RGB'))
+        file.file.seek(0)
+    return images
+
+def upload_image_blob(blob_name: str, file_obj, content_type: str, size: Optional[int] = None) -> str:
+    """Stream an image file to Firebase Storage and return the public URL (blocking)"""
+    blob = bucket.blob(blob_name)
+    blob.upload_from_file(file_obj, content_type=content_type, size=size)
+    blob.make_public()
+    return blob.public_url
+
+async def build_similarity_index(
+    index_path: str = HNSW_INDEX_PATH,
+    item_ids_path: str = HNSW_ITEM_IDS_PATH
+) -> int:
+    """Build the HNSW similarity index offline from all item embeddings in Firestore"""
+    item_ids = []
+    buffers = []
+    
+    async for doc in db.collection("items").select(["embedding"]).stream():
+        embedding = doc.to_dict().get("embedding")
+        if embedding:
+            item_ids.append(doc.id)
+            # Legacy docs store a float list; normalize everything to fp16 bytes
+            buffers.append(embedding if isinstance(embedding, bytes) else encode_embedding(embedding))
+    
+    # One contiguous (N, dim) array from all embedding blobs
+    embeddings = np.frombuffer(b"".join(buffers), dtype=np.float16)
+    embeddings = embeddings.reshape(-1, EMBEDDING_DIM).astype(np.float32)
+    
+    index = hnswlib.Index(space='cosine', dim=EMBEDDING_DIM)
+    index.init_index(max_elements=max(len(item_ids), 1), ef_construction=200, M=16)
+    if item_ids:
+        index.add_items(embeddings, np.arange(len(item_ids)))
+    
+    index.save_index(index_path)
+    np.save(item_ids_path, np.asarray(item_ids, dtype=object))
+    
+    logger.info(f"Built HNSW index with {len(item_ids)} items")
+    return len(item_ids)
+
+def export_onnx_model(path: str = ONNX_MODEL_PATH) -> str:
+    """
+    One-time export of the FP32 embedding model to ONNX (dynamic batch axis).
+    Loads the checkpoint directly so int8 quantization / TorchScript are not
+    baked into the export; ONNX Runtime applies its own graph fusions.
+    """
+    checkpoint = torch.load('models/best_fashion_model.pth', map_location='cpu')
+    from modaics_training_pipeline import FashionFeatureExtractor
+    
+    model = FashionFeatureExtractor(
+        num_categories=len(checkpoint['category_encoder'].classes_)
+    )
+    model.load_state_dict(checkpoint['model_state_dict'])
+    model.eval()
+    
+    torch.onnx.export(
+        EmbeddingModule(model).eval(),
+        torch.rand(1, 3, 224, 224),
+        path,
+        opset_version=ONNX_OPSET,
+        input_names=["input"],
+        output_names=["embedding"],
+        dynamic_axes={"input": {0: "B"}, "embedding": {0: "B"}}
+    )
+    logger.info(f"Exported ONNX embedding model to {path}")
+    return path
+
+def _download_item_images(item_id: str) -> List[bytes]:
+    """Download all stored images for an item (blocking)"""
+    return [blob.download_as_bytes() for blob in bucket.list_blobs(prefix=f"items/{item_id}/")]
+
+async def reindex_embeddings(batch_size: int = REINDEX_BATCH_SIZE) -> int:
+    """
+    Offline bulk re-embedding of every item from its stored images, then
+    rebuild the similarity index. Images are normalized with the
+    numba normalize_batch kernel into a buffer reused across batches.
+    """
+    out = np.empty((batch_size, 3, 224, 224), dtype=np.float32)
+    
+    async def embed_batch(pending: List[tuple]):
+        # pending: (item_id, [uint8 HWC arrays])
+        images = np.stack([img for _, imgs in pending for img in imgs])
+        embeddings = []
+        for start in range(0, len(images), batch_size):
+            chunk = images[start:start + batch_size]
+            normalize_batch(chunk, IMAGENET_MEAN, IMAGENET_STD_INV, out)
+            embeddings.append(model_manager.embed(out[:len(chunk)]))
+        embeddings = np.concatenate(embeddings)
+        
+        batch = db.batch()
+        cache_pipe = redis_binary_client.pipeline()
+        offset = 0
+        for item_id, imgs in pending:
+            item_embedding = encode_embedding(embeddings[offset:offset + len(imgs)].mean(axis=0))
+            offset += len(imgs)
+            batch.update(db.collection("items").document(item_id), {"embedding": item_embedding})
+            cache_pipe.set(f"{EMBEDDING_CACHE_PREFIX}{item_id}", item_embedding)
+        await batch.commit(retry=batch_commit_retry)
+        cache_pipe.execute()
+    
+    reindexed = 0
+    pending = []
+    pending_images = 0
+    
+    async for doc in db.collection("items").select(["image_urls"]).stream():
+        contents_list = await asyncio.to_thread(_download_item_images, doc.id)
+        if not contents_list:
+            continue
+        
+        images = [
+            np.asarray(resize_and_crop(Image.open(io.BytesIO(c)).convert('RGB')), dtype=np.uint8)
+            for c in contents_list
+        ]
+        pending.append((doc.id, images))
+        pending_images += len(images)
+        
+        if pending_images >= batch_size:
+            await embed_batch(pending)
+            reindexed += len(pending)
+            pending, pending_images = [], 0
+    
+    if pending:
+        await embed_batch(pending)
+        reindexed += len(pending)
+    
+    logger.info(f"Re-embedded {reindexed} items")
+    await build_similarity_index()
+    return reindexed
+
+async def migrate_material_composition() -> int:
+    """One-off migration: rewrite list-of-dicts material_composition as parallel arrays"""
+    migrated = 0
+    batch = db.batch()
+    pending = 0
+    
+    async for doc in db.collection("items").select(["material_composition"]).stream():
+        materials = doc.to_dict().get("material_composition")
+        if not isinstance(materials, list):
+            continue
+        
+        batch.update(doc.reference, {
+            "material_composition": MaterialComposition.from_records(materials).dict()
+        })
+        pending += 1
+        
+        if pending == WRITE_BATCH_SIZE:
+            await batch.commit(retry=batch_commit_retry)
+            migrated += pending
+            batch, pending = db.batch(), 0
+    
+    if pending:
+        await batch.commit(retry=batch_commit_retry)
+        migrated += pending
+    
+    logger.info(f"Migrated material_composition for {migrated} items")
+    return migrated
+
+async def seed_trending_scores():
+    """
+    Backfill the trending set from stored view/like counts, once per Redis
+    (the first worker to claim TRENDING_SEEDED_KEY does it)
+    """
+    try:
+        if not redis_client.set(TRENDING_SEEDED_KEY, 1, nx=True):
+            return
+        
+        seeded = 0
+        pipe = redis_client.pipeline()
+        items_query = db.collection("items").select(["view_count", "like_count"]).stream()
+        async for doc in items_query:
+            data = doc.to_dict()
+            score = (data.get("view_count") or 0) + 2 * (data.get("like_count") or 0)
+            if score:
+                # nx: don't clobber scores already bumped by live views/likes
+                pipe.zadd(TRENDING_KEY, {doc.id: score}, nx=True)
+                seeded += 1
+                if seeded % 500 == 0:
+                    pipe.execute()
+        pipe.execute()
+        logger.info(f"Seeded trending scores for {seeded} items")
+    except Exception as e:
+        redis_client.delete(TRENDING_SEEDED_KEY)  # let the next startup retry
+        logger.error(f"Failed to seed trending scores: {e}")
+
+async def decay_trending_scores():
+    """
+    Periodically decay all trending scores so old activity fades out.
+    Every worker runs this loop; the SET NX lock makes only one of them
+    decay per interval.
+    """
+    while True:
+        await asyncio.sleep(TRENDING_DECAY_INTERVAL)
+        try:
+            if redis_client.set(TRENDING_DECAY_LOCK, 1, nx=True, ex=TRENDING_DECAY_INTERVAL):
+                redis_client.zunionstore(TRENDING_KEY, {TRENDING_KEY: TRENDING_DECAY})
+        except Exception as e:
+            logger.error(f"Failed to decay trending scores: {e}")
+
 async def update_user_sustainability_points(user_id: str, points: int):
     """Update user's sustainability points"""
     try:
         user_ref = db.collection("users").document(user_id)
-        user_doc = user_ref.get()
+        await user_ref.update({"sustainability_points": firestore.Increment(points)})
         
-        if user_doc.exists:
-            current_points = user_doc.to_dict().get("sustainability_points", 0)
-            new_points = current_points + points
-            user_ref.update({"sustainability_points": new_points})
-            
-            logger.info(f"Updated sustainability points for user {user_id}: {new_points}")
+        logger.info(f"Added {points} sustainability points for user {user_id}")
     
     except Exception as e:
         logger.error(f"Failed to update sustainability points: {e}")
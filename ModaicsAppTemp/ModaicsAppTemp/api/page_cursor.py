@@ -0,0 +1,26 @@
+"""
+Opaque pagination cursors for the item listing endpoint.
+A cursor is the last item's created_at timestamp and doc id, urlsafe-base64
+encoded so it survives query strings untouched (a raw ISO timestamp's "+00:00"
+is left unescaped by some clients and decoded as a space by the server).
+"""
+import base64
+import binascii
+from datetime import datetime
+
+from fastapi import HTTPException
+
+
+def encode_page_cursor(created_at: datetime, doc_id: str) -> str:
+    """Cursor for the page after the item with this created_at and doc id"""
+    raw = f"{created_at.isoformat()}|{doc_id}".encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+def decode_page_cursor(cursor: str) -> tuple:
+    """Parse a cursor from encode_page_cursor into (created_at, doc_id)"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, doc_id = raw.split("|", 1)  # timestamps never contain "|"; ids might
+        return datetime.fromisoformat(created_at), doc_id
+    except (ValueError, binascii.Error):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
@@ -0,0 +1,36 @@
+"""Tests for the opaque item-listing pagination cursors."""
+import os
+import sys
+from datetime import datetime, timezone
+from urllib.parse import parse_qs
+
+import pytest
+from fastapi import HTTPException
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from page_cursor import decode_page_cursor, encode_page_cursor  # noqa: E402
+
+
+def test_round_trip_through_unescaped_query_string():
+    # Firestore timestamps are tz-aware, so the raw ISO form contains "+00:00"
+    created_at = datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=timezone.utc)
+    cursor = encode_page_cursor(created_at, "item|42")
+
+    # Clients may append the cursor without percent-escaping it
+    parsed = parse_qs(f"limit=20&cursor={cursor}")["cursor"][0]
+
+    assert parsed == cursor
+    assert decode_page_cursor(parsed) == (created_at, "item|42")
+
+
+def test_naive_timestamp_round_trip():
+    created_at = datetime(2024, 5, 1, 12, 30, 15)
+    assert decode_page_cursor(encode_page_cursor(created_at, "abc")) == (created_at, "abc")
+
+
+@pytest.mark.parametrize("cursor", ["", "not-a-cursor", "!!!", "bm8tc2VwYXJhdG9y"])
+def test_malformed_cursor_is_a_400(cursor):
+    with pytest.raises(HTTPException) as exc_info:
+        decode_page_cursor(cursor)
+    assert exc_info.value.status_code == 400
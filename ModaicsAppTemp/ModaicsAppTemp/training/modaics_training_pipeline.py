@@ -7,25 +7,41 @@ and Core ML conversion for the fashion recommendation system.
 
 import os
 import json
+import hashlib
 import torch
 import torch.nn as nn
 import torch.optim as optim
-from torch.utils.data import Dataset, DataLoader
+from torch.utils.data import Dataset, DataLoader, default_collate
 import torchvision.models as models
 import torchvision.transforms as transforms
+from torchvision.transforms import v2
+from torchvision.io import read_image, ImageReadMode
 from torchvision.datasets import ImageFolder
 import numpy as np
 from PIL import Image
 import pandas as pd
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import LabelEncoder
-from sklearn.neighbors import NearestNeighbors
-import joblib
+import faiss
 import coremltools as ct
 from tqdm import tqdm
 import requests
 from pathlib import Path
 import argparse
+import struct
+
+# Switch from exact to IVF-PQ similarity search above this many items
+FAISS_IVFPQ_THRESHOLD = 100_000
+
+# IVF lists probed per query when no --nprobe is given: nlist // FAISS_NPROBE_DIVISOR.
+# nprobe is saved with the index; faiss's default of 1 collapses recall.
+FAISS_NPROBE_DIVISOR = 16
+
+# Embeddings.bin layout for iOS: 16-byte little-endian header
+# (magic, N: u32, D: u32, dtype: u32) followed by N*D row-major values
+EMBEDDINGS_MAGIC = b'MDEM'
+EMBEDDINGS_DTYPE_FP16 = 1
+EMBEDDINGS_HEADER = struct.Struct('<4sIII')
 
 # =====================================================
 # 1. Dataset Preparation
@@ -94,12 +110,20 @@ class FashionFeatureExtractor(nn.Module):
     ResNet50-based feature extractor with additional fashion-specific layers
     """
     
+    # Early ResNet50 stages kept frozen during fine-tuning (generic low-level features)
+    FROZEN_STAGES = ('conv1', 'bn1', 'layer1', 'layer2')
+    
     def __init__(self, num_categories=10, embedding_dim=512):
         super(FashionFeatureExtractor, self).__init__()
         
         # Load pretrained ResNet50
         self.backbone = models.resnet50(pretrained=True)
         
+        # Freeze early stages: no weight grads or backward work past layer3
+        for name, param in self.backbone.named_parameters():
+            if name.startswith(self.FROZEN_STAGES):
+                param.requires_grad_(False)
+        
         # Remove the final classification layer
         self.feature_dim = self.backbone.fc.in_features
         self.backbone.fc = nn.Identity()
@@ -120,10 +144,16 @@ class FashionFeatureExtractor(nn.Module):
         self.sustainability_predictor = nn.Sequential(
             nn.Linear(embedding_dim, 128),
             nn.ReLU(),
-            nn.Linear(128, 1),
-            nn.Sigmoid()  # Output 0-1 for sustainability score
+            nn.Linear(128, 1)  # Raw logit; torch.sigmoid gives the 0-1 score
         )
         
+    def train(self, mode=True):
+        super().train(mode)
+        # Frozen stages stay in eval mode so their BatchNorm running stats are preserved
+        for stage in self.FROZEN_STAGES:
+            getattr(self.backbone, stage).eval()
+        return self
+    
     def forward(self, x, return_embeddings=False):
         # Extract base features
         features = self.backbone(x)
@@ -136,12 +166,12 @@ class FashionFeatureExtractor(nn.Module):
         
         # Get predictions
         category_logits = self.category_classifier(embeddings)
-        sustainability_score = self.sustainability_predictor(embeddings) * 100  # Scale to 0-100
+        sustainability_logits = self.sustainability_predictor(embeddings)
         
         return {
             'embeddings': embeddings,
             'category_logits': category_logits,
-            'sustainability_score': sustainability_score
+            'sustainability_logits': sustainability_logits
         }
 
 # =====================================================
@@ -149,43 +179,103 @@ class FashionFeatureExtractor(nn.Module):
 # =====================================================
 
 class FashionDataset(Dataset):
-    """Custom dataset for fashion items with metadata"""
+    """
+    Custom dataset for fashion items with metadata.
+    Images are decoded and resized to 256x256 uint8 once; with `cache_dir`
+    the resized images are kept in a memory-mapped array so later epochs
+    skip decoding entirely and only run the per-epoch (random) transforms.
+    """
+    
+    IMAGE_SIZE = 256
     
-    def __init__(self, root_dir, metadata_file, transform=None):
+    def __init__(self, root_dir, metadata_file, transform=None, cache_dir=None):
         self.root_dir = Path(root_dir)
         self.transform = transform
+        self.resize = v2.Compose([
+            v2.Resize(self.IMAGE_SIZE, antialias=True),
+            v2.CenterCrop(self.IMAGE_SIZE)
+        ])
         
-        # Load metadata
+        # Load metadata into flat per-field arrays; forked DataLoader workers
+        # then share a few contiguous buffers instead of a tree of dicts
         with open(metadata_file, 'r') as f:
-            self.metadata = json.load(f)
+            metadata = json.load(f)
+        
+        self.filenames = np.array([item['filename'] for item in metadata])
+        self.categories = np.array([item['category'] for item in metadata])
         
         # Create label encoders
         self.category_encoder = LabelEncoder()
-        categories = [item['category'] for item in self.metadata]
-        self.category_encoder.fit(categories)
+        self.category_encoder.fit(self.categories)
+        
+        # Precompute per-item targets once (keeps sklearn out of __getitem__)
+        self.labels = self.category_encoder.transform(self.categories).astype(np.int64)
+        self.sus_scores = np.array(
+            [item['sustainability_score'] for item in metadata], dtype=np.float32
+        ) / 100.0  # Normalize to 0-1
+        del metadata
+        
+        self.cache = None
+        if cache_dir is not None:
+            self.cache = self._load_or_build_cache(Path(cache_dir))
         
     def __len__(self):
-        return len(self.metadata)
+        return len(self.filenames)
+    
+    def _decode(self, idx):
+        """Decode and resize one image to a uint8 (3, 256, 256) tensor"""
+        # Decode straight to a uint8 CHW tensor (libjpeg-turbo, no PIL round trip)
+        img_path = self.root_dir / 'train' / str(self.categories[idx]) / str(self.filenames[idx])
+        return self.resize(read_image(str(img_path), mode=ImageReadMode.RGB))
+    
+    def _cache_key(self):
+        """Hash of everything the cached pixels depend on: resize config, categories, files (size + mtime)"""
+        digest = hashlib.sha1(repr(self.resize).encode())
+        for category, filename in zip(self.categories, self.filenames):
+            stat = (self.root_dir / 'train' / str(category) / str(filename)).stat()
+            digest.update(f"{category}/{filename}:{stat.st_size}:{stat.st_mtime_ns}\n".encode())
+        return digest.hexdigest()[:16]
+    
+    def _load_or_build_cache(self, cache_dir):
+        """Memory-map the resized image cache, building it on first use"""
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        cache_path = cache_dir / f'images_{self.IMAGE_SIZE}_{self._cache_key()}.u8.npy'
+        shape = (len(self.filenames), 3, self.IMAGE_SIZE, self.IMAGE_SIZE)
+        
+        # Only complete builds are ever renamed into place, so an existing file is trustworthy
+        if cache_path.exists():
+            return np.load(cache_path, mmap_mode='r')
+        
+        print(f"🗄️  Caching {shape[0]:,} resized images to {cache_path}...")
+        partial_path = cache_dir / f'{cache_path.name}.partial'
+        cache = np.lib.format.open_memmap(partial_path, mode='w+', dtype=np.uint8, shape=shape)
+        for idx in tqdm(range(shape[0]), desc="Caching images"):
+            cache[idx] = self._decode(idx).numpy()
+        cache.flush()
+        del cache
+        os.replace(partial_path, cache_path)
+        
+        # Drop caches built for an older dataset or resize config
+        for stale in cache_dir.glob('images_*.u8.npy*'):
+            if stale != cache_path:
+                stale.unlink()
+        
+        return np.load(cache_path, mmap_mode='r')
     
     def __getitem__(self, idx):
-        item = self.metadata[idx]
-        
-        # Load image
-        img_path = self.root_dir / 'train' / item['category'] / item['filename']
-        image = Image.open(img_path).convert('RGB')
+        if self.cache is not None:
+            image = torch.from_numpy(self.cache[idx].copy())
+        else:
+            image = self._decode(idx)
         
         if self.transform:
             image = self.transform(image)
         
-        # Encode labels
-        category_label = self.category_encoder.transform([item['category']])[0]
-        sustainability_score = item['sustainability_score'] / 100.0  # Normalize to 0-1
-        
         return {
             'image': image,
-            'category': category_label,
-            'sustainability': torch.tensor(sustainability_score, dtype=torch.float32),
-            'filename': item['filename']
+            'category': int(self.labels[idx]),
+            'sustainability': torch.tensor(self.sus_scores[idx]),
+            'filename': str(self.filenames[idx])
         }
 
 # =====================================================
@@ -203,21 +293,19 @@ class FashionModelTrainer:
         self.device = device or torch.device("cuda" if torch.cuda.is_available() else "cpu")
         print(f"🖥️  Using device: {self.device}")
         
-        # Data transforms
-        self.train_transform = transforms.Compose([
-            transforms.Resize(256),
-            transforms.RandomCrop(224),
-            transforms.RandomHorizontalFlip(),
-            transforms.ColorJitter(brightness=0.2, contrast=0.2, saturation=0.2, hue=0.1),
-            transforms.ToTensor(),
-            transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
+        # Data transforms (tensor-native, operate on the dataset's 256x256 uint8 CHW images)
+        self.train_transform = v2.Compose([
+            v2.RandomCrop(224),
+            v2.RandomHorizontalFlip(),
+            v2.ColorJitter(brightness=0.2, contrast=0.2, saturation=0.2, hue=0.1),
+            v2.ToDtype(torch.float32, scale=True),
+            v2.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
         ])
         
-        self.val_transform = transforms.Compose([
-            transforms.Resize(256),
-            transforms.CenterCrop(224),
-            transforms.ToTensor(),
-            transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
+        self.val_transform = v2.Compose([
+            v2.CenterCrop(224),
+            v2.ToDtype(torch.float32, scale=True),
+            v2.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
         ])
         
     def prepare_dataloaders(self, batch_size=32):
@@ -227,7 +315,8 @@ class FashionModelTrainer:
         dataset = FashionDataset(
             root_dir=self.data_dir,
             metadata_file=self.data_dir / 'metadata.json',
-            transform=self.train_transform
+            transform=self.train_transform,
+            cache_dir=self.data_dir / 'image_cache'
         )
         
         # Split into train/val
@@ -240,42 +329,63 @@ class FashionModelTrainer:
         # Update validation transform
         val_dataset.dataset.transform = self.val_transform
         
-        # Create dataloaders
+        # Create dataloaders (pinned memory, workers kept alive across epochs)
+        loader_kwargs = dict(
+            num_workers=min(8, os.cpu_count() or 1),
+            pin_memory=True,
+            persistent_workers=True,
+            prefetch_factor=4
+        )
+        
         train_loader = DataLoader(
             train_dataset, 
             batch_size=batch_size, 
             shuffle=True, 
-            num_workers=4
+            **loader_kwargs
         )
         
         val_loader = DataLoader(
             val_dataset, 
             batch_size=batch_size, 
             shuffle=False, 
-            num_workers=4
+            **loader_kwargs
         )
         
         return train_loader, val_loader, dataset.category_encoder
         
-    def train_model(self, num_epochs=25, learning_rate=1e-4, batch_size=32):
-        """Train the fashion feature extractor"""
+    def train_model(self, num_epochs=25, learning_rate=1e-4, batch_size=32, accum_steps=1):
+        """Train the fashion feature extractor (effective batch = batch_size * accum_steps)"""
         
         print("🏋️  Starting model training...")
         
+        # Fixed input shapes: let cuDNN autotune conv algorithms; TF32 for FP32 fallbacks
+        torch.backends.cudnn.benchmark = True
+        torch.backends.cudnn.allow_tf32 = True
+        torch.backends.cuda.matmul.allow_tf32 = True
+        
         # Prepare data
         train_loader, val_loader, category_encoder = self.prepare_dataloaders(batch_size)
         num_categories = len(category_encoder.classes_)
         
         # Initialize model
-        model = FashionFeatureExtractor(num_categories=num_categories).to(self.device)
+        model = FashionFeatureExtractor(num_categories=num_categories).to(
+            self.device, memory_format=torch.channels_last
+        )
+        
+        # Compile with TorchInductor for kernel fusion (first steps include
+        # compile time; cached under TORCHINDUCTOR_CACHE_DIR). Checkpoints are
+        # saved from the uncompiled module so state_dict keys stay unprefixed.
+        compiled_model = model
+        if self.device.type == 'cuda':
+            compiled_model = torch.compile(model, mode='max-autotune', fullgraph=False)
         
         # Loss functions
         category_criterion = nn.CrossEntropyLoss()
-        sustainability_criterion = nn.MSELoss()
+        sustainability_criterion = nn.BCEWithLogitsLoss()  # Targets are 0-1 scores
         
         # Optimizer
         optimizer = optim.Adam([
-            {'params': model.backbone.parameters(), 'lr': learning_rate * 0.1},  # Lower LR for pretrained
+            {'params': [p for p in model.backbone.parameters() if p.requires_grad], 'lr': learning_rate * 0.1},  # Lower LR for pretrained
             {'params': model.fashion_head.parameters()},
             {'params': model.category_classifier.parameters()},
             {'params': model.sustainability_predictor.parameters()}
@@ -284,6 +394,10 @@ class FashionModelTrainer:
         # Learning rate scheduler
         scheduler = optim.lr_scheduler.StepLR(optimizer, step_size=10, gamma=0.1)
         
+        # Mixed precision (FP16 autocast + loss scaling) on CUDA
+        use_amp = self.device.type == 'cuda'
+        scaler = torch.cuda.amp.GradScaler(enabled=use_amp)
+        
         # Training loop
         best_val_loss = float('inf')
         
@@ -294,30 +408,40 @@ class FashionModelTrainer:
             train_correct = 0
             train_total = 0
             
+            optimizer.zero_grad(set_to_none=True)
+            
+            # The last accumulation group may be short; average over its real size
+            num_batches = len(train_loader)
+            last_group_start = num_batches - (num_batches % accum_steps or accum_steps)
+            
             pbar = tqdm(train_loader, desc=f'Epoch {epoch+1}/{num_epochs} [Train]')
-            for batch in pbar:
-                images = batch['image'].to(self.device)
-                categories = batch['category'].to(self.device)
-                sustainability = batch['sustainability'].to(self.device)
-                
-                optimizer.zero_grad()
+            for step, batch in enumerate(pbar, 1):
+                images = batch['image'].to(self.device, non_blocking=True).contiguous(memory_format=torch.channels_last)
+                categories = batch['category'].to(self.device, non_blocking=True)
+                sustainability = batch['sustainability'].to(self.device, non_blocking=True)
                 
                 # Forward pass
-                outputs = model(images)
+                with torch.autocast(device_type='cuda', dtype=torch.float16, enabled=use_amp):
+                    outputs = compiled_model(images)
+                    cat_loss = category_criterion(outputs['category_logits'], categories)
                 
-                # Calculate losses
-                cat_loss = category_criterion(outputs['category_logits'], categories)
+                # Sustainability loss on raw logits in FP32 (outside autocast)
                 sus_loss = sustainability_criterion(
-                    outputs['sustainability_score'].squeeze(), 
-                    sustainability * 100
+                    outputs['sustainability_logits'].float().squeeze(-1), 
+                    sustainability
                 )
                 
                 # Combined loss with weights
                 total_loss = cat_loss + 0.5 * sus_loss
                 
-                # Backward pass
-                total_loss.backward()
-                optimizer.step()
+                # Backward pass (scaled to avoid FP16 gradient underflow);
+                # gradients accumulate over accum_steps batches per optimizer step
+                group_size = accum_steps if step <= last_group_start else num_batches - last_group_start
+                scaler.scale(total_loss / group_size).backward()
+                if step % accum_steps == 0 or step == len(train_loader):
+                    scaler.step(optimizer)
+                    scaler.update()
+                    optimizer.zero_grad(set_to_none=True)
                 
                 # Statistics
                 train_loss += total_loss.item()
@@ -336,19 +460,20 @@ class FashionModelTrainer:
             val_correct = 0
             val_total = 0
             
-            with torch.no_grad():
+            with torch.inference_mode():
                 pbar = tqdm(val_loader, desc=f'Epoch {epoch+1}/{num_epochs} [Val]')
                 for batch in pbar:
-                    images = batch['image'].to(self.device)
-                    categories = batch['category'].to(self.device)
-                    sustainability = batch['sustainability'].to(self.device)
+                    images = batch['image'].to(self.device, non_blocking=True).contiguous(memory_format=torch.channels_last)
+                    categories = batch['category'].to(self.device, non_blocking=True)
+                    sustainability = batch['sustainability'].to(self.device, non_blocking=True)
                     
-                    outputs = model(images)
+                    with torch.autocast(device_type='cuda', dtype=torch.float16, enabled=use_amp):
+                        outputs = compiled_model(images)
+                        cat_loss = category_criterion(outputs['category_logits'], categories)
                     
-                    cat_loss = category_criterion(outputs['category_logits'], categories)
                     sus_loss = sustainability_criterion(
-                        outputs['sustainability_score'].squeeze(), 
-                        sustainability * 100
+                        outputs['sustainability_logits'].float().squeeze(-1), 
+                        sustainability
                     )
                     total_loss = cat_loss + 0.5 * sus_loss
                     
@@ -387,6 +512,30 @@ class FashionModelTrainer:
 # 5. Embedding Extraction
 # =====================================================
 
+class _InferDataset(Dataset):
+    """Image paths -> (transformed image, filename) for batched inference"""
+    
+    def __init__(self, image_paths, transform):
+        self.image_paths = image_paths
+        self.transform = transform
+    
+    def __len__(self):
+        return len(self.image_paths)
+    
+    def __getitem__(self, idx):
+        img_path = self.image_paths[idx]
+        try:
+            image = Image.open(img_path).convert('RGB')
+            return self.transform(image), str(img_path.name)
+        except Exception as e:
+            print(f"⚠️  Error processing {img_path}: {e}")
+            return None
+
+def _collate_skip_failed(samples):
+    """Collate a batch, dropping images that failed to load"""
+    samples = [sample for sample in samples if sample is not None]
+    return default_collate(samples) if samples else None
+
 class EmbeddingExtractor:
     """Extract and save embeddings for all fashion items"""
     
@@ -403,6 +552,10 @@ class EmbeddingExtractor:
         self.model.to(self.device)
         self.model.eval()
         
+        # Fixed input shapes: compile with CUDA graphs to cut launch overhead
+        if self.device.type == 'cuda':
+            self.model = torch.compile(self.model, mode='reduce-overhead')
+        
         # Transform for inference
         self.transform = transforms.Compose([
             transforms.Resize(256),
@@ -411,74 +564,98 @@ class EmbeddingExtractor:
             transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
         ])
         
-    def extract_all_embeddings(self, image_dir, output_file='embeddings.json'):
+    def extract_all_embeddings(self, image_dir, output_file='embeddings.fp16.npy', batch_size=128):
         """Extract embeddings for all images in directory"""
         
         print("🔍 Extracting embeddings...")
         
-        embeddings = []
+        emb_mm = None  # (N, dim) float16 memmap after the header, allocated on the first batch
+        bin_path = self.data_dir / 'Embeddings.bin'  # Header + little-endian FP16, mmap-able by iOS
         filenames = []
+        pos = 0
         
         # Find all images
         image_paths = list(Path(image_dir).rglob('*.jpg')) + \
                      list(Path(image_dir).rglob('*.png'))
         
-        for img_path in tqdm(image_paths, desc="Processing images"):
-            try:
-                # Load and transform image
-                image = Image.open(img_path).convert('RGB')
-                image_tensor = self.transform(image).unsqueeze(0).to(self.device)
-                
-                # Extract embedding
-                with torch.no_grad():
-                    embedding = self.model(image_tensor, return_embeddings=True)
-                    embedding = embedding.cpu().numpy().squeeze()
+        # Decode/transform in parallel workers, embed in batches
+        loader = DataLoader(
+            _InferDataset(image_paths, self.transform),
+            batch_size=batch_size,
+            num_workers=min(8, os.cpu_count() or 1),
+            pin_memory=True,
+            collate_fn=_collate_skip_failed
+        )
+        use_amp = self.device.type == 'cuda'
+        
+        # Stream each batch straight to disk: memory stays O(batch), not O(N)
+        with open(self.data_dir / 'Filenames.txt', 'w', encoding='utf-8') as fh:
+            for batch in tqdm(loader, desc="Processing images"):
+                if batch is None:
+                    continue
+                images, names = batch
                 
-                embeddings.append(embedding.tolist())
-                filenames.append(str(img_path.name))
+                with torch.inference_mode(), torch.autocast(device_type='cuda', dtype=torch.float16, enabled=use_amp):
+                    batch_embeddings = self.model(images.to(self.device, non_blocking=True), return_embeddings=True)
                 
-            except Exception as e:
-                print(f"⚠️  Error processing {img_path}: {e}")
-                continue
-        
-        # Save embeddings and filenames as JSON
-        output_data = {
-            'embeddings': embeddings,
-            'filenames': filenames
-        }
-        
-        output_path = self.data_dir / output_file
-        with open(output_path, 'w') as f:
-            json.dump(output_data, f)
-        
-        # Also save as separate files for iOS
-        with open(self.data_dir / 'Embeddings.json', 'w') as f:
-            json.dump(embeddings, f)
-        
-        with open(self.data_dir / 'Filenames.json', 'w') as f:
-            json.dump(filenames, f)
+                if emb_mm is None:
+                    emb_mm = np.memmap(bin_path, dtype='<f2', mode='w+', offset=EMBEDDINGS_HEADER.size,
+                                       shape=(len(image_paths), batch_embeddings.shape[1]))
+                emb_mm[pos:pos + len(names)] = batch_embeddings.cpu().numpy()
+                fh.writelines(name + '\n' for name in names)
+                filenames.extend(names)
+                pos += len(names)
+        
+        dim = emb_mm.shape[1] if emb_mm is not None else 512
+        if emb_mm is not None:
+            emb_mm.flush()
+            del emb_mm
+        
+        # Write the header for the rows actually embedded, and drop rows
+        # reserved for images that failed to load
+        with open(bin_path, 'r+b' if pos else 'wb') as f:
+            f.write(EMBEDDINGS_HEADER.pack(EMBEDDINGS_MAGIC, pos, dim, EMBEDDINGS_DTYPE_FP16))
+            f.truncate(EMBEDDINGS_HEADER.size + pos * dim * np.dtype('<f2').itemsize)
+        
+        if pos:
+            embeddings = np.memmap(bin_path, dtype='<f2', mode='r', offset=EMBEDDINGS_HEADER.size, shape=(pos, dim))
+        else:
+            embeddings = np.empty((0, dim), dtype='<f2')
+        
+        # Same array as .npy for np.load consumers
+        np.save(self.data_dir / output_file, embeddings)
         
         print(f"✅ Extracted {len(embeddings)} embeddings")
         
         return embeddings, filenames
     
-    def build_similarity_index(self, embeddings):
-        """Build nearest neighbor index for similarity search"""
+    def build_similarity_index(self, embeddings, nprobe=None):
+        """
+        Build nearest neighbor index for similarity search.
+        nprobe: IVF lists searched per query (IVF-PQ only; default nlist // FAISS_NPROBE_DIVISOR)
+        """
         
         print("🔨 Building similarity index...")
         
-        embeddings_array = np.array(embeddings)
-        
-        # Build cosine similarity index
-        nn_index = NearestNeighbors(
-            n_neighbors=10, 
-            metric='cosine',
-            algorithm='brute'  # For smaller datasets; use 'ball_tree' for larger
-        )
-        nn_index.fit(embeddings_array)
+        # Cosine similarity = inner product on L2-normalized rows
+        embeddings_array = np.ascontiguousarray(embeddings, dtype=np.float32)
+        faiss.normalize_L2(embeddings_array)
+        num_items, dim = embeddings_array.shape
+        
+        if num_items > FAISS_IVFPQ_THRESHOLD:
+            # Compressed index: 8-bit PQ codes, 8 dims per subquantizer
+            nlist = int(4 * np.sqrt(num_items))
+            quantizer = faiss.IndexFlatIP(dim)
+            nn_index = faiss.IndexIVFPQ(quantizer, dim, nlist, dim // 8, 8, faiss.METRIC_INNER_PRODUCT)
+            nn_index.train(embeddings_array)
+            nn_index.nprobe = nprobe or max(1, nlist // FAISS_NPROBE_DIVISOR)
+            print(f"   IVF-PQ: nlist={nlist}, nprobe={nn_index.nprobe}")
+        else:
+            nn_index = faiss.IndexFlatIP(dim)
+        nn_index.add(embeddings_array)
         
         # Save index
-        joblib.dump(nn_index, self.data_dir / 'similarity_index.pkl')
+        faiss.write_index(nn_index, str(self.data_dir / 'similarity_index.faiss'))
         
         print("✅ Similarity index built and saved")
         
@@ -528,9 +705,15 @@ class CoreMLConverter:
         example_input = torch.rand(1, 3, 224, 224)
         traced_model = torch.jit.trace(embedding_model, example_input)
         
-        # Convert to Core ML
+        # Freeze: fold weights/BN into constants for a smaller, fused graph
+        traced_model = torch.jit.freeze(traced_model.eval())
+        
+        # Convert to Core ML (ML program, FP16 activations for the Neural Engine)
         mlmodel = ct.convert(
             traced_model,
+            convert_to="mlprogram",
+            compute_precision=ct.precision.FLOAT16,
+            minimum_deployment_target=ct.target.iOS16,
             inputs=[ct.ImageType(
                 name="input_image",
                 shape=example_input.shape,
@@ -541,6 +724,15 @@ class CoreMLConverter:
             outputs=[ct.TensorType(name="output")]
         )
         
+        # int8 weights (~4x smaller than FP32)
+        from coremltools.optimize.coreml import (
+            OpLinearQuantizerConfig, OptimizationConfig, linear_quantize_weights
+        )
+        config = OptimizationConfig(
+            global_config=OpLinearQuantizerConfig(mode='linear_symmetric', dtype='int8')
+        )
+        mlmodel = linear_quantize_weights(mlmodel, config)
+        
         # Add metadata
         mlmodel.author = "Modaics"
         mlmodel.short_description = "Fashion item feature extractor for sustainable fashion recommendations"
@@ -548,33 +740,20 @@ class CoreMLConverter:
         mlmodel.output_description["output"] = "512-dimensional fashion embedding vector"
         
         # Save Core ML model
-        output_path = self.output_dir / "FashionEmbedding.mlmodel"
+        output_path = self.output_dir / "FashionEmbedding.mlpackage"
         mlmodel.save(output_path)
         
         print(f"✅ Core ML model saved to {output_path}")
         
-        # Also save a ResNet50-only version for compatibility
-        self.convert_resnet50_only()
-        
-        return mlmodel
-    
-    def convert_resnet50_only(self):
-        """Convert just ResNet50 backbone for simpler integration"""
-        
+        # Also save a backbone-only version for compatibility, reusing the
+        # already-loaded (fine-tuned) backbone instead of re-downloading ResNet50
         print("📱 Converting ResNet50 backbone to Core ML...")
         
-        # Load pretrained ResNet50
-        resnet = models.resnet50(pretrained=True)
-        resnet.fc = nn.Identity()  # Remove classifier
-        resnet.eval()
-        
-        # Trace model
-        example_input = torch.rand(1, 3, 224, 224)
-        traced_model = torch.jit.trace(resnet, example_input)
+        backbone_model = torch.jit.trace(embedding_model.backbone.eval(), example_input)
+        backbone_model = torch.jit.freeze(backbone_model.eval())
         
-        # Convert to Core ML
-        mlmodel = ct.convert(
-            traced_model,
+        backbone_mlmodel = ct.convert(
+            backbone_model,
             inputs=[ct.ImageType(
                 name="input_image",
                 shape=example_input.shape,
@@ -584,16 +763,16 @@ class CoreMLConverter:
             outputs=[ct.TensorType(name="output")]
         )
         
-        # Add metadata
-        mlmodel.short_description = "ResNet50 feature extractor (outputs 2048-d embedding)"
-        mlmodel.input_description["input_image"] = "Input image of size 224x224"
-        mlmodel.output_description["output"] = "2048-dimensional image embedding"
+        backbone_mlmodel.short_description = "ResNet50 feature extractor (outputs 2048-d embedding)"
+        backbone_mlmodel.input_description["input_image"] = "Input image of size 224x224"
+        backbone_mlmodel.output_description["output"] = "2048-dimensional image embedding"
         
-        # Save
-        output_path = self.output_dir / "ResNet50Embedding.mlmodel"
-        mlmodel.save(output_path)
+        backbone_path = self.output_dir / "ResNet50Embedding.mlmodel"
+        backbone_mlmodel.save(backbone_path)
         
-        print(f"✅ ResNet50 Core ML model saved to {output_path}")
+        print(f"✅ ResNet50 Core ML model saved to {backbone_path}")
+        
+        return mlmodel
 
 # =====================================================
 # 7. Main Pipeline Orchestrator
@@ -607,7 +786,9 @@ def main():
     parser.add_argument('--output-dir', type=str, default='models', help='Output directory')
     parser.add_argument('--epochs', type=int, default=25, help='Number of training epochs')
     parser.add_argument('--batch-size', type=int, default=32, help='Batch size')
+    parser.add_argument('--accum-steps', type=int, default=1, help='Gradient accumulation steps')
     parser.add_argument('--lr', type=float, default=1e-4, help='Learning rate')
+    parser.add_argument('--nprobe', type=int, default=None, help='IVF lists probed per query (large indexes only)')
     parser.add_argument('--skip-training', action='store_true', help='Skip training, only convert model')
     
     args = parser.parse_args()
@@ -628,7 +809,8 @@ def main():
         model, category_encoder = trainer.train_model(
             num_epochs=args.epochs,
             learning_rate=args.lr,
-            batch_size=args.batch_size
+            batch_size=args.batch_size,
+            accum_steps=args.accum_steps
         )
     
     # Step 3: Extract embeddings
@@ -638,7 +820,7 @@ def main():
         "processed_data"
     )
     embeddings, filenames = extractor.extract_all_embeddings("processed_data/train")
-    nn_index = extractor.build_similarity_index(embeddings)
+    nn_index = extractor.build_similarity_index(embeddings, nprobe=args.nprobe)
     
     # Step 4: Convert to Core ML
     print("\n📱 Step 4: Converting to Core ML...")
@@ -657,12 +839,13 @@ def main():
     
     # Copy Core ML models
     import shutil
-    shutil.copy("coreml_models/FashionEmbedding.mlmodel", ios_models_dir)
+    shutil.copytree("coreml_models/FashionEmbedding.mlpackage",
+                    ios_models_dir / "FashionEmbedding.mlpackage", dirs_exist_ok=True)
     shutil.copy("coreml_models/ResNet50Embedding.mlmodel", ios_models_dir)
     
     # Copy embeddings
-    shutil.copy("processed_data/Embeddings.json", ios_models_dir)
-    shutil.copy("processed_data/Filenames.json", ios_models_dir)
+    shutil.copy("processed_data/Embeddings.bin", ios_models_dir)
+    shutil.copy("processed_data/Filenames.txt", ios_models_dir)
     
     print("\n✅ Pipeline completed successfully!")
     print(f"   - Trained model saved to: {args.output_dir}/best_fashion_model.pth")
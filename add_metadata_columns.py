@@ -4,7 +4,103 @@ Parse from titles using the same logic as export_createml_data.py
 """
 import asyncio
 import asyncpg
+import ahocorasick
+import os
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+# Titles per worker task when classifying in parallel
+CLASSIFY_CHUNK_SIZE = 10_000
+
+# === KEYWORD TABLES (highest priority first) ===
+CATEGORY_KEYWORDS = [
+    # Jackets & Outerwear (most specific first)
+    ('jacket', ['jacket', 'coat', 'blazer', 'parka', 'windbreaker', 'anorak']),
+    ('hoodie', ['hoodie', 'sweatshirt']),
+    ('sweater', ['sweater', 'jumper', 'cardigan', 'knit']),
+    # Tops
+    ('polo', ['polo']),
+    ('tshirt', ['t-shirt', 'tee', 'tshirt']),
+    ('shirt', ['shirt', 'blouse']),
+    ('tank', ['tank', 'vest']),
+    ('top', ['top', 'crop']),
+    # Bottoms
+    ('jeans', ['jeans', 'denim']),
+    ('shorts', ['shorts', 'short']),
+    ('pants', ['pants', 'trouser', 'chino', 'jogger', 'sweatpant']),
+    ('skirt', ['skirt']),
+    # Dresses
+    ('dress', ['dress', 'gown']),
+    # Shoes
+    ('sneakers', ['sneaker', 'trainer', 'runner']),
+    ('boots', ['boot', 'boots']),
+    ('shoes', ['shoe', 'loafer', 'oxford', 'derby']),
+    # Accessories
+    ('bag', ['bag', 'backpack', 'purse', 'tote']),
+    ('hat', ['hat', 'cap', 'beanie']),
+]
+
+COLOR_KEYWORDS = [
+    ('black', ['black']),
+    ('white', ['white', 'cream', 'ivory', 'off-white']),
+    ('gray', ['gray', 'grey', 'charcoal', 'slate']),
+    ('navy', ['navy']),
+    ('blue', ['blue']),
+    ('red', ['red', 'burgundy', 'maroon']),
+    ('pink', ['pink', 'rose']),
+    ('green', ['green', 'olive', 'khaki', 'sage', 'forest']),
+    ('yellow', ['yellow', 'mustard', 'gold']),
+    ('orange', ['orange', 'rust', 'copper']),
+    ('brown', ['brown', 'tan', 'beige', 'camel', 'taupe']),
+    ('purple', ['purple', 'lavender', 'violet']),
+    ('multicolor', ['multi', 'print', 'pattern', 'floral', 'stripe', 'plaid', 'camo']),
+]
+
+BRAND_KEYWORDS = [
+    'nike', 'adidas', 'supreme', 'palace', 'stussy', 'carhartt',
+    'dickies', 'levis', "levi's", 'wrangler', 'lee',
+    'ralph lauren', 'polo', 'tommy hilfiger', 'tommy',
+    'gap', 'old navy', 'h&m', 'zara', 'uniqlo',
+    'north face', 'patagonia', 'columbia', 
+    'gucci', 'prada', 'louis vuitton', 'balenciaga', 'versace',
+    'ami', 'ami paris', 'stone island', 'cp company',
+    'vans', 'converse', 'new balance', 'reebok', 'puma'
+]
+
+def build_automaton(groups):
+    """Aho-Corasick automaton mapping each keyword to (priority, label)"""
+    automaton = ahocorasick.Automaton()
+    for priority, (label, keywords) in enumerate(groups):
+        for kw in keywords:
+            if kw not in automaton:
+                automaton.add_word(kw, (priority, label))
+    automaton.make_automaton()
+    return automaton
+
+CATEGORY_AUTOMATON = build_automaton(CATEGORY_KEYWORDS)
+COLOR_AUTOMATON = build_automaton(COLOR_KEYWORDS)
+BRAND_AUTOMATON = build_automaton(
+    [(kw.replace(' ', '_').replace("'", ""), [kw]) for kw in BRAND_KEYWORDS]
+)
+
+def best_match(automaton, text, default):
+    """Label of the highest-priority keyword found in text, in one scan"""
+    best = None
+    for _, (priority, label) in automaton.iter(text):
+        if best is None or priority < best[0]:
+            best = (priority, label)
+    return best[1] if best else default
+
+def classify_title(title_lower):
+    """Return (category, color, brand) for a lowercased title"""
+    category = best_match(CATEGORY_AUTOMATON, title_lower, 'other')
+    color = best_match(COLOR_AUTOMATON, title_lower, 'unknown')
+    brand = best_match(BRAND_AUTOMATON, title_lower, 'other')
+    return category, color, brand
+
+def classify_chunk(rows):
+    """Classify a chunk of (id, title) rows in a worker process"""
+    return [(item_id, *classify_title(title.lower())) for item_id, title in rows]
 
 async def add_and_populate_metadata():
     """Add metadata columns and populate from titles"""
@@ -41,123 +137,47 @@ async def add_and_populate_metadata():
         'updated': 0
     }
     
-    print("\n🔄 Parsing titles and updating...")
+    print("\n🔄 Parsing titles...")
+    
+    updates = []  # (id, category, color, brand), applied in one batch below
     
-    for idx, item in enumerate(items, 1):
-        title_lower = item['title'].lower()
-        
-        # === CATEGORY CLASSIFICATION ===
-        category = None
-        
-        # Jackets & Outerwear (most specific first)
-        if any(w in title_lower for w in ['jacket', 'coat', 'blazer', 'parka', 'windbreaker', 'anorak']):
-            category = 'jacket'
-        elif any(w in title_lower for w in ['hoodie', 'sweatshirt']):
-            category = 'hoodie'
-        elif any(w in title_lower for w in ['sweater', 'jumper', 'cardigan', 'knit']):
-            category = 'sweater'
-        
-        # Tops
-        elif 'polo' in title_lower:
-            category = 'polo'
-        elif any(w in title_lower for w in ['t-shirt', 'tee', 'tshirt']):
-            category = 'tshirt'
-        elif any(w in title_lower for w in ['shirt', 'blouse']):
-            category = 'shirt'
-        elif any(w in title_lower for w in ['tank', 'vest']):
-            category = 'tank'
-        elif any(w in title_lower for w in ['top', 'crop']):
-            category = 'top'
-        
-        # Bottoms
-        elif 'jeans' in title_lower or 'denim' in title_lower:
-            category = 'jeans'
-        elif any(w in title_lower for w in ['shorts', 'short']):
-            category = 'shorts'
-        elif any(w in title_lower for w in ['pants', 'trouser', 'chino', 'jogger', 'sweatpant']):
-            category = 'pants'
-        elif 'skirt' in title_lower:
-            category = 'skirt'
-        
-        # Dresses
-        elif 'dress' in title_lower or 'gown' in title_lower:
-            category = 'dress'
-        
-        # Shoes
-        elif any(w in title_lower for w in ['sneaker', 'trainer', 'runner']):
-            category = 'sneakers'
-        elif any(w in title_lower for w in ['boot', 'boots']):
-            category = 'boots'
-        elif any(w in title_lower for w in ['shoe', 'loafer', 'oxford', 'derby']):
-            category = 'shoes'
-        
-        # Accessories
-        elif any(w in title_lower for w in ['bag', 'backpack', 'purse', 'tote']):
-            category = 'bag'
-        elif any(w in title_lower for w in ['hat', 'cap', 'beanie']):
-            category = 'hat'
-        else:
-            category = 'other'
-        
-        # === COLOR CLASSIFICATION ===
-        color = None
-        color_keywords = {
-            'black': ['black'],
-            'white': ['white', 'cream', 'ivory', 'off-white'],
-            'gray': ['gray', 'grey', 'charcoal', 'slate'],
-            'navy': ['navy'],
-            'blue': ['blue'],
-            'red': ['red', 'burgundy', 'maroon'],
-            'pink': ['pink', 'rose'],
-            'green': ['green', 'olive', 'khaki', 'sage', 'forest'],
-            'yellow': ['yellow', 'mustard', 'gold'],
-            'orange': ['orange', 'rust', 'copper'],
-            'brown': ['brown', 'tan', 'beige', 'camel', 'taupe'],
-            'purple': ['purple', 'lavender', 'violet'],
-            'multicolor': ['multi', 'print', 'pattern', 'floral', 'stripe', 'plaid', 'camo']
-        }
-        
-        for color_name, keywords in color_keywords.items():
-            if any(kw in title_lower for kw in keywords):
-                color = color_name
-                break
-        
-        if not color:
-            color = 'unknown'
-        
-        # === BRAND CLASSIFICATION ===
-        brand_keywords = [
-            'nike', 'adidas', 'supreme', 'palace', 'stussy', 'carhartt',
-            'dickies', 'levis', "levi's", 'wrangler', 'lee',
-            'ralph lauren', 'polo', 'tommy hilfiger', 'tommy',
-            'gap', 'old navy', 'h&m', 'zara', 'uniqlo',
-            'north face', 'patagonia', 'columbia', 
-            'gucci', 'prada', 'louis vuitton', 'balenciaga', 'versace',
-            'ami', 'ami paris', 'stone island', 'cp company',
-            'vans', 'converse', 'new balance', 'reebok', 'puma'
-        ]
-        
-        brand = 'other'
-        for brand_kw in brand_keywords:
-            if brand_kw.lower() in title_lower:
-                brand = brand_kw.replace(' ', '_').replace("'", "")
-                break
-        
-        # Update item
+    # Classification is independent per row: fan chunks out across all cores
+    rows = [(item['id'], item['title']) for item in items]
+    chunks = [rows[i:i + CLASSIFY_CHUNK_SIZE] for i in range(0, len(rows), CLASSIFY_CHUNK_SIZE)]
+    loop = asyncio.get_running_loop()
+    
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as pool:
+        tasks = [loop.run_in_executor(pool, classify_chunk, chunk) for chunk in chunks]
+        for task in asyncio.as_completed(tasks):
+            for item_id, category, color, brand in await task:
+                updates.append((item_id, category, color, brand))
+                
+                stats['category'][category] += 1
+                stats['color'][color] += 1
+                stats['brand'][brand] += 1
+                stats['updated'] += 1
+            
+            progress = (len(updates) / len(items)) * 100
+            print(f"   ⏳ Progress: {len(updates):,}/{len(items):,} ({progress:.1f}%)")
+    
+    # Binary COPY into a temp table, then a single set-based UPDATE
+    print("\n💾 Writing updates...")
+    async with conn.transaction():
+        await conn.execute("""
+            CREATE TEMP TABLE _metadata_updates (
+                id INTEGER PRIMARY KEY,
+                category VARCHAR(50),
+                color VARCHAR(50),
+                brand VARCHAR(100)
+            ) ON COMMIT DROP
+        """)
+        await conn.copy_records_to_table('_metadata_updates', records=updates)
         await conn.execute("""
-            UPDATE fashion_items
-            SET category = $1, color = $2, detected_brand = $3
-            WHERE id = $4
-        """, category, color, brand, item['id'])
-        
-        stats['category'][category] += 1
-        stats['color'][color] += 1
-        stats['brand'][brand] += 1
-        stats['updated'] += 1
-        
-        if idx % 1000 == 0:
-            progress = (idx / len(items)) * 100
-            print(f"   ⏳ Progress: {idx:,}/{len(items):,} ({progress:.1f}%)")
+            UPDATE fashion_items f
+            SET category = u.category, color = u.color, detected_brand = u.brand
+            FROM _metadata_updates u
+            WHERE f.id = u.id
+        """)
     
     await conn.close()
     
@@ -2,24 +2,76 @@
 Find This Fit - Production FastAPI backend.
 Handles image upload, embedding generation, and vector search.
 """
-import base64
+import asyncio
+try:
+    import pybase64 as base64  # SIMD (SSSE3/AVX2/NEON) drop-in for the stdlib module
+except ImportError:
+    import base64
+import hashlib
 import logging
+import os
+import re
+import time
 from contextlib import asynccontextmanager
-from typing import List
+from typing import List, Optional, Tuple
 
-from fastapi import FastAPI, HTTPException
+import numpy as np
+from fastapi import FastAPI, File, Form, HTTPException, Request, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 
 try:
-    from .embeddings import embed_image, preload_models
-    from .models import DepopItem, SearchRequest, SearchResponse
-    from .search import search_similar
-    from . import db
+    from .embeddings import clip_batcher, decode_image, embed_image_and_clip, embed_image_async, preload_models
+    from .models import (
+        AddItemRequest,
+        DepopItem,
+        GenerateDescriptionRequest,
+        SearchRequest,
+        SearchResponse,
+        SketchbookPostCreate,
+        SketchbookSettingsUpdate,
+    )
+    from .search import search_similar, search_similar_summary
+    from .brands import TEXT_BRAND_DISPLAY, match_brand_keyword
+    from .keywords import estimate_size, scan_text
+    from .config import (
+        ANALYZE_CACHE_TTL,
+        EMBEDDING_PROVIDER,
+        GPT4_VISION_TIMEOUT,
+        HNSW_EF_SEARCH_ANALYZE,
+        REQUEST_TIMEOUT,
+        SEARCH_CACHE_TTL,
+        TEXT_EMBED_CACHE_TTL,
+    )
+    from . import cache, db, labels, payments, sketchbook
 except ImportError:
-    from embeddings import embed_image, preload_models
-    from models import DepopItem, SearchRequest, SearchResponse
-    from search import search_similar
+    from embeddings import clip_batcher, decode_image, embed_image_and_clip, embed_image_async, preload_models
+    from models import (
+        AddItemRequest,
+        DepopItem,
+        GenerateDescriptionRequest,
+        SearchRequest,
+        SearchResponse,
+        SketchbookPostCreate,
+        SketchbookSettingsUpdate,
+    )
+    from search import search_similar, search_similar_summary
+    from brands import TEXT_BRAND_DISPLAY, match_brand_keyword
+    from keywords import estimate_size, scan_text
+    from config import (
+        ANALYZE_CACHE_TTL,
+        EMBEDDING_PROVIDER,
+        GPT4_VISION_TIMEOUT,
+        HNSW_EF_SEARCH_ANALYZE,
+        REQUEST_TIMEOUT,
+        SEARCH_CACHE_TTL,
+        TEXT_EMBED_CACHE_TTL,
+    )
+    import cache
     import db
+    import labels
+    import payments
+    import sketchbook
 
 # Configure logging
 logging.basicConfig(
@@ -28,6 +80,19 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Bump when the analysis pipeline changes; label edits are covered by LABELS_VERSION
+ANALYZE_CACHE_VERSION = f"v1-{labels.LABELS_VERSION}"
+
+# Pooled async OpenAI client for GPT-4 Vision calls (lazy; reused across requests)
+_vision_client = None
+
+# "BRAND: ..." / "COLOR: ..." lines in the GPT-4 Vision reply
+_LINE_RE = re.compile(r'^[ \t]*(BRAND|COLOR):[ \t]*(.*?)[ \t\r]*$', re.M | re.I)
+_NO_ANSWER = {'unknown', 'none', 'n/a', ''}
+
+# Set once this worker has logged that base64 /search_by_image is deprecated
+_base64_search_warned = False
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -41,21 +106,35 @@ async def lifespan(app: FastAPI):
     await db.init_pool(min_size=2, max_size=10)
     logger.info("Database pool initialized")
     
+    # Result cache (Redis is optional)
+    await cache.init_redis()
+    
     # Preload embedding models (avoids 5+ second delay on first request)
     preload_models()
     logger.info("Embedding models preloaded")
     
+    # Zero-shot label embeddings for /analyze_image (CLIP, whatever the search provider)
+    labels.preload_label_embeddings()
+    
+    # CLIP micro-batcher for the search endpoints
+    batcher_task = clip_batcher.start()
+    
     yield
     
     # Cleanup on shutdown
     logger.info("Shutting down...")
+    batcher_task.cancel()
     await db.close_pool()
+    await cache.close_redis()
+    if _vision_client is not None:
+        await _vision_client.close()
 
 
 app = FastAPI(
     title="Find This Fit API",
     version="1.0.0",
     description="Visual search for fashion items across resale marketplaces",
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
@@ -69,63 +148,95 @@ app.add_middleware(
 )
 
 
-@app.post("/search_by_image", response_model=SearchResponse)
-async def search_by_image(payload: SearchRequest):
+def _decode_base64_image(image_base64: str) -> bytes:
     """
-    Upload an image and get visually similar Depop items.
-    
-    Flow:
-    1. Decode base64 image
-    2. Generate 768-dim embedding (OpenAI or CLIP)
-    3. Query pgvector for nearest neighbors
-    4. Return top 20 matches with deep links
-    
-    Typical latency: 100-500ms (50ms embedding + 10-50ms search + network)
+    Decode a base64 image field (pybase64's SIMD decoder when installed).
+    Raises a 400 on malformed input. The *_binary endpoints skip this entirely.
     """
     try:
-        image_bytes = base64.b64decode(payload.image_base64)
+        return base64.b64decode(image_base64)
     except Exception as exc:
         logger.error(f"Base64 decode failed: {exc}")
         raise HTTPException(status_code=400, detail="Invalid base64 image data") from exc
 
-    try:
-        # Generate multimodal embedding (image only for photo search)
-        # Note: We don't have text for user-uploaded photos,
-        # but our database items have multimodal embeddings (image + title + description)
-        embedding = embed_image(image_bytes, text=None)
-        logger.info(f"Generated embedding: {len(embedding)} dimensions")
-    except Exception as exc:
-        logger.error(f"Embedding generation failed: {exc}")
-        raise HTTPException(status_code=500, detail=f"Embedding error: {str(exc)}") from exc
 
-    try:
-        # Vector search with HNSW index
-        results = await search_similar(embedding, limit=20)
-        logger.info(f"Found {len(results)} similar items")
-    except Exception as exc:
-        logger.error(f"Search failed: {exc}")
-        raise HTTPException(status_code=500, detail=f"Search error: {str(exc)}") from exc
-
-    # Map to Pydantic models
+def _search_payload(results: List[dict]) -> dict:
+    """
+    Map search rows to a SearchResponse dict (what the search endpoints return and cache).
+    Rows come from our own query, so Pydantic validation is skipped (model_construct)
+    and the response is returned directly instead of re-validated via response_model.
+    """
     items: List[DepopItem] = []
     for r in results:
-        distance_val = r.get("distance")
+        price = r.get("price")
+        distance = r.get("distance")
         items.append(
-            DepopItem(
+            DepopItem.model_construct(
                 id=r["id"],
                 external_id=r.get("external_id"),
                 title=r.get("title"),
                 description=r.get("description"),
-                price=float(r["price"]) if r.get("price") is not None else None,
+                price=float(price) if price is not None else None,
                 url=r.get("url"),
                 image_url=r.get("image_url"),
-                distance=float(distance_val) if distance_val is not None else None,
+                distance=float(distance) if distance is not None else None,
                 redirect_url=r.get("redirect_url"),
                 source=r.get("source"),
             )
         )
+    return SearchResponse.model_construct(items=items).model_dump()
+
+
+@app.post("/search_by_image", response_model=SearchResponse, deprecated=True)
+async def search_by_image(payload: SearchRequest):
+    """
+    Upload an image and get visually similar Depop items.
+    Deprecated: kept for older clients; new clients upload to /search_by_image_raw.
     
-    return SearchResponse(items=items)
+    Flow:
+    1. Decode base64 image
+    2. Generate 768-dim embedding (OpenAI or CLIP)
+    3. Query pgvector for nearest neighbors
+    4. Return top 20 matches with deep links
+    
+    Typical latency: 100-500ms (50ms embedding + 10-50ms search + network)
+    """
+    global _base64_search_warned
+    if not _base64_search_warned:
+        logger.warning("/search_by_image (base64 JSON) is deprecated; use /search_by_image_raw (multipart)")
+        _base64_search_warned = True
+    
+    image_bytes = _decode_base64_image(payload.image_base64)
+    return await _run_image_search(image_bytes)
+
+
+@app.post("/search_by_image_raw", response_model=SearchResponse)
+async def search_by_image_raw(
+    image: UploadFile = File(...),
+    query: str = Form(""),
+    limit: int = Form(20, ge=1, le=100),
+):
+    """
+    /search_by_image for a multipart/form-data upload (optional `query` text
+    makes it a combined search). The image arrives as raw bytes: no base64
+    inflation on the wire and no multi-MB JSON string to parse.
+    """
+    image_bytes = await image.read()
+    if not image_bytes:
+        raise HTTPException(status_code=400, detail="Image file is empty")
+    return await _run_image_search(image_bytes, query=query.strip(), limit=limit)
+
+
+@app.post("/search_by_image_binary", response_model=SearchResponse)
+async def search_by_image_binary(request: Request):
+    """
+    /search_by_image for a raw image body (Content-Type: application/octet-stream).
+    Skips base64: ~25% smaller uploads and no decode pass.
+    """
+    image_bytes = await request.body()
+    if not image_bytes:
+        raise HTTPException(status_code=400, detail="Image body is required")
+    return await _run_image_search(image_bytes)
 
 
 @app.post("/search_by_text", response_model=SearchResponse)
@@ -145,43 +256,41 @@ async def search_by_text(payload: dict):
     if not query:
         raise HTTPException(status_code=400, detail="Query text is required")
     
+    # CLIP's tokenizer lowercases, so the cache keys do too
+    normalized_query = query.lower()
+    query_hash = hashlib.sha1(normalized_query.encode()).hexdigest()
+    response_key = f"search:text:{EMBEDDING_PROVIDER.lower()}:{query_hash}"
+    cached = await cache.get(response_key)
+    if cached is not None:
+        return ORJSONResponse(cached)
+    
     try:
         # Generate text-only embedding (no image)
-        # CLIP can embed text without an image
-        embedding = embed_image(image_bytes=None, text=query)
-        logger.info(f"Generated text embedding for: '{query}'")
+        cache_key = f"emb:text:{EMBEDDING_PROVIDER.lower()}:{query_hash}"
+        embedding = await cache.get_vector(cache_key)
+        if embedding is None:
+            embedding = await embed_image_async(image_bytes=None, text=normalized_query)
+            await cache.set_vector(cache_key, embedding, TEXT_EMBED_CACHE_TTL)
+            logger.info(f"Generated text embedding for: '{query}'")
     except Exception as exc:
         logger.error(f"Text embedding generation failed: {exc}")
         raise HTTPException(status_code=500, detail=f"Embedding error: {str(exc)}") from exc
 
-    try:
-        # Vector search with HNSW index
-        results = await search_similar(embedding, limit=20)
-        logger.info(f"Found {len(results)} similar items for text query")
-    except Exception as exc:
-        logger.error(f"Search failed: {exc}")
-        raise HTTPException(status_code=500, detail=f"Search error: {str(exc)}") from exc
+    # Paraphrases ("black hoodie" / "hoodie black") land on near-identical embeddings
+    response = cache.semantic_search.get(embedding)
+    if response is None:
+        try:
+            # Vector search with HNSW index
+            results = await search_similar(embedding, limit=20)
+            logger.info(f"Found {len(results)} similar items for text query")
+        except Exception as exc:
+            logger.error(f"Search failed: {exc}")
+            raise HTTPException(status_code=500, detail=f"Search error: {str(exc)}") from exc
+        response = _search_payload(results)
+        cache.semantic_search.put(embedding, response)
 
-    # Map to Pydantic models
-    items: List[DepopItem] = []
-    for r in results:
-        distance_val = r.get("distance")
-        items.append(
-            DepopItem(
-                id=r["id"],
-                external_id=r.get("external_id"),
-                title=r.get("title"),
-                description=r.get("description"),
-                price=float(r["price"]) if r.get("price") is not None else None,
-                url=r.get("url"),
-                image_url=r.get("image_url"),
-                distance=float(distance_val) if distance_val is not None else None,
-                redirect_url=r.get("redirect_url"),
-                source=r.get("source"),
-            )
-        )
-    
-    return SearchResponse(items=items)
+    await cache.set(response_key, response, SEARCH_CACHE_TTL)
+    return ORJSONResponse(response)
 
 
 @app.post("/search_combined", response_model=SearchResponse)
@@ -207,126 +316,99 @@ async def search_combined(payload: dict):
             detail="At least one of 'query' or 'image_base64' is required"
         )
     
-    image_bytes = None
-    if image_base64:
-        try:
-            image_bytes = base64.b64decode(image_base64)
-        except Exception as exc:
-            logger.error(f"Base64 decode failed: {exc}")
-            raise HTTPException(status_code=400, detail="Invalid base64 image data") from exc
+    image_bytes = _decode_base64_image(image_base64) if image_base64 else None
+    return await _run_image_search(image_bytes, query=query)
+
+
+@app.post("/search_combined_binary", response_model=SearchResponse)
+async def search_combined_binary(request: Request, query: str = ""):
+    """
+    /search_combined with the image as a raw body (application/octet-stream)
+    and the text as the `query` query parameter.
+    """
+    image_bytes = await request.body() or None
+    query = query.strip()
+    if not query and image_bytes is None:
+        raise HTTPException(
+            status_code=400,
+            detail="At least one of 'query' or an image body is required"
+        )
+    return await _run_image_search(image_bytes, query=query)
+
+
+async def _run_image_search(image_bytes: Optional[bytes], query: str = "", limit: int = 20) -> ORJSONResponse:
+    """
+    Shared embed + vector search behind the image search endpoints
+    (base64 JSON, binary and multipart variants).
+    
+    Image only: our database items have multimodal embeddings (image + title + description),
+    so a photo alone still matches well. With a query, image and text are embedded together.
+    Responses are cached by image hash + query, so re-uploads of the same photo skip both steps.
+    """
+    image_hash = hashlib.sha256(image_bytes).hexdigest() if image_bytes is not None else "none"
+    query_hash = hashlib.sha1(query.encode()).hexdigest()
+    response_key = f"search:image:{EMBEDDING_PROVIDER.lower()}:{image_hash}:{query_hash}:{limit}"
+    cached = await cache.get(response_key)
+    if cached is not None:
+        return ORJSONResponse(cached)
     
     try:
-        # Generate multimodal embedding with both image and text
-        embedding = embed_image(image_bytes=image_bytes, text=query if query else None)
-        logger.info(f"Generated combined embedding (image: {image_bytes is not None}, text: '{query}')")
+        # Image and text halves are batched together
+        embedding = await embed_image_async(image_bytes=image_bytes, text=query or None)
+        logger.info(f"Generated embedding (image: {image_bytes is not None}, text: '{query}')")
     except Exception as exc:
-        logger.error(f"Combined embedding generation failed: {exc}")
+        logger.error(f"Embedding generation failed: {exc}")
         raise HTTPException(status_code=500, detail=f"Embedding error: {str(exc)}") from exc
 
     try:
         # Vector search with HNSW index
-        results = await search_similar(embedding, limit=20)
-        logger.info(f"Found {len(results)} similar items for combined query")
+        results = await search_similar(embedding, limit=limit)
+        logger.info(f"Found {len(results)} similar items")
     except Exception as exc:
         logger.error(f"Search failed: {exc}")
         raise HTTPException(status_code=500, detail=f"Search error: {str(exc)}") from exc
 
-    # Map to Pydantic models
-    items: List[DepopItem] = []
-    for r in results:
-        distance_val = r.get("distance")
-        items.append(
-            DepopItem(
-                id=r["id"],
-                external_id=r.get("external_id"),
-                title=r.get("title"),
-                description=r.get("description"),
-                price=float(r["price"]) if r.get("price") is not None else None,
-                url=r.get("url"),
-                image_url=r.get("image_url"),
-                distance=float(distance_val) if distance_val is not None else None,
-                redirect_url=r.get("redirect_url"),
-                source=r.get("source"),
-            )
-        )
-    
-    return SearchResponse(items=items)
+    response = _search_payload(results)
+    await cache.set(response_key, response, SEARCH_CACHE_TTL)
+    return ORJSONResponse(response)
 
 
-@app.post("/analyze_image")
-async def analyze_image(payload: dict):
+def _get_vision_client(api_key: str):
     """
-    AI-powered item analysis using CLIP embeddings + visual similarity.
-    
-    Analyzes uploaded images to extract:
-    - Item name/type (from similar items in database)
-    - Brand (from text in similar items)
-    - Category (from clustering of similar items)
-    - Estimated size (from similar items)
-    - Condition (visual quality assessment)
-    - Colors (from title/description keywords)
-    - Materials (from similar items)
-    - Estimated price (average of top 10 similar items)
-    
-    This uses your 25,677 item database for smart predictions!
+    Lazy-create the shared AsyncOpenAI client (one keep-alive pool per worker).
+    Defaults suit brand/color detection; use .with_options() for other budgets
+    (copies share the same connection pool).
     """
-    image_base64 = payload.get("image", "")
-    if not image_base64:
-        raise HTTPException(status_code=400, detail="Image is required")
-    
-    try:
-        image_bytes = base64.b64decode(image_base64)
-    except Exception as exc:
-        logger.error(f"Base64 decode failed: {exc}")
-        raise HTTPException(status_code=400, detail="Invalid base64 image data") from exc
-    
-    try:
-        # Generate CLIP embedding for uploaded image
-        embedding = embed_image(image_bytes=image_bytes, text=None)
-        
-        # STEP 1: Use zero-shot classification on the actual image
-        # This analyzes the ACTUAL image, not similar items
-        # Reuse the CLIP model from embeddings module for efficiency
-        from sentence_transformers import util
-        import numpy as np
-        from PIL import Image as PILImage
-        from io import BytesIO
+    global _vision_client
+    if _vision_client is None:
+        import httpx
+        from openai import AsyncOpenAI
         
+        # HTTP/2 multiplexes concurrent calls over warm TLS connections
+        limits = httpx.Limits(max_keepalive_connections=20, max_connections=40)
         try:
-            from .embeddings import _get_clip_model
+            http_client = httpx.AsyncClient(http2=True, limits=limits)
         except ImportError:
-            from embeddings import _get_clip_model
-        
-        model = _get_clip_model()
-        uploaded_image = PILImage.open(BytesIO(image_bytes)).convert("RGB")
-        
-        # STEP 0: GPT-4 Vision for brand AND color detection (if API key available)
-        # Much better than OCR for reading brand names and more accurate for colors
-        detected_text_on_image = ""
-        gpt4_detected_color = ""
-        try:
-            import os
-            from openai import OpenAI
-            
-            openai_key = os.getenv("OPENAI_API_KEY")
-            
-            if openai_key:
-                client = OpenAI(api_key=openai_key)
-                
-                # Encode image for GPT-4 Vision
-                import base64 as b64_module
-                image_b64 = b64_module.b64encode(image_bytes).decode('utf-8')
-                
-                # Ask GPT-4 to analyze the image comprehensively
-                response = client.chat.completions.create(
-                    model="gpt-4o",  # Use full gpt-4o for better vision
-                    messages=[
-                        {
-                            "role": "user",
-                            "content": [
-                                {
-                                    "type": "text",
-                                    "text": """Analyze this fashion item carefully and provide:
+            logger.warning("h2 not installed, OpenAI client falling back to HTTP/1.1")
+            http_client = httpx.AsyncClient(limits=limits)
+        _vision_client = AsyncOpenAI(
+            api_key=api_key, timeout=GPT4_VISION_TIMEOUT, max_retries=0, http_client=http_client
+        )
+    return _vision_client
+
+
+async def _stream_brand_color_reply(client, image_b64: str) -> str:
+    """Stream the GPT-4 Vision reply; returns as soon as the BRAND and COLOR lines are in."""
+    # Ask GPT-4 to analyze the image comprehensively (streamed)
+    stream = await client.chat.completions.create(
+        model="gpt-4o",  # Use full gpt-4o for better vision
+        messages=[
+            {
+                "role": "user",
+                "content": [
+                    {
+                        "type": "text",
+                        "text": """Analyze this fashion item carefully and provide:
 
 1. BRAND: Look for ANY text, logos, or brand identifiers (embroidered, printed, on tags, etc.)
    Common brands: Nike, Adidas, Supreme, Palace, Prada, Gucci, Louis Vuitton, Balenciaga,
@@ -351,379 +433,329 @@ BRAND: Nike
 COLOR: White
 
 Be confident and specific. If you see embroidery, logos, or text - identify the brand!"""
-                                },
-                                {
-                                    "type": "image_url",
-                                    "image_url": {
-                                        "url": f"data:image/jpeg;base64,{image_b64}",
-                                        "detail": "high"  # High detail for better recognition
-                                    }
-                                }
-                            ]
+                    },
+                    {
+                        "type": "image_url",
+                        "image_url": {
+                            "url": f"data:image/jpeg;base64,{image_b64}",
+                            "detail": "high"  # High detail for better recognition
                         }
-                    ],
-                    max_tokens=150,
-                    temperature=0
-                )
-                
-                gpt4_response = response.choices[0].message.content.strip()
-                logger.info(f"🔍 GPT-4 Vision response:\n{gpt4_response}")
-                
-                # Parse the structured response
-                detected_text_on_image = ""
-                gpt4_detected_color = ""
-                
-                for line in gpt4_response.split('\n'):
-                    line = line.strip()
-                    if line.startswith('BRAND:'):
-                        brand_text = line.replace('BRAND:', '').strip().lower()
-                        if brand_text not in ['unknown', 'none', 'n/a', '']:
-                            detected_text_on_image = brand_text
-                    elif line.startswith('COLOR:'):
-                        color_text = line.replace('COLOR:', '').strip()
-                        if color_text not in ['unknown', 'none', 'n/a', '']:
-                            gpt4_detected_color = color_text
+                    }
+                ]
+            }
+        ],
+        max_tokens=150,
+        temperature=0,
+        stream=True
+    )
+    
+    # Collect complete lines as they arrive; stop once BRAND and COLOR are both in
+    response = ""
+    pending = ""
+    try:
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            pending += chunk.choices[0].delta.content or ""
+            *complete, pending = pending.split('\n')
+            response += "".join(line + '\n' for line in complete)
+            if 'BRAND:' in response and 'COLOR:' in response:
+                break
+    finally:
+        await stream.close()
+    return (response + pending).strip()
+
+
+async def _gpt4_detect_brand_and_color(image_bytes: bytes) -> Tuple[str, str, bool]:
+    """
+    GPT-4 Vision brand AND color detection (if API key available).
+    Much better than OCR for reading brand names and more accurate for colors.
+    
+    Non-blocking (AsyncOpenAI); gives up after GPT4_VISION_TIMEOUT seconds.
+    Returns (brand_text, color, failed).
+    """
+    detected_text_on_image = ""
+    gpt4_detected_color = ""
+    gpt4_failed = False
+    try:
+        openai_key = os.getenv("OPENAI_API_KEY")
+        
+        if openai_key:
+            client = _get_vision_client(openai_key)
+            
+            # Encode image for GPT-4 Vision
+            image_b64 = base64.b64encode(image_bytes).decode('utf-8')
+            
+            # Whole round trip (connect, first token, stream) bounded by GPT4_VISION_TIMEOUT
+            gpt4_response = await asyncio.wait_for(
+                _stream_brand_color_reply(client, image_b64), timeout=GPT4_VISION_TIMEOUT
+            )
+            logger.info(f"🔍 GPT-4 Vision response:\n{gpt4_response}")
+            
+            # Parse the structured response (one regex pass)
+            fields = {key.upper(): value for key, value in _LINE_RE.findall(gpt4_response)}
+            brand_text = fields.get('BRAND', '').lower()
+            if brand_text not in _NO_ANSWER:
+                detected_text_on_image = brand_text
+            color_text = fields.get('COLOR', '')
+            if color_text.lower() not in _NO_ANSWER:
+                gpt4_detected_color = color_text
+            
+            if detected_text_on_image:
+                logger.info(f"✅ GPT-4 detected brand: {detected_text_on_image}")
+            if gpt4_detected_color:
+                logger.info(f"🎨 GPT-4 detected color: {gpt4_detected_color}")
                 
-                if detected_text_on_image:
-                    logger.info(f"✅ GPT-4 detected brand: {detected_text_on_image}")
-                if gpt4_detected_color:
-                    logger.info(f"🎨 GPT-4 detected color: {gpt4_detected_color}")
-                    
-        except Exception as e:
-            logger.warning(f"GPT-4 Vision error: {e}")
-            detected_text_on_image = ""
-            gpt4_detected_color = ""
+    except asyncio.TimeoutError:
+        logger.warning(f"GPT-4 Vision timed out after {GPT4_VISION_TIMEOUT}s")
+        detected_text_on_image = ""
+        gpt4_detected_color = ""
+        gpt4_failed = True
+    except Exception as e:
+        logger.warning(f"GPT-4 Vision error: {e}")
+        detected_text_on_image = ""
+        gpt4_detected_color = ""
+        gpt4_failed = True
+    
+    return detected_text_on_image, gpt4_detected_color, gpt4_failed
+
+
+def _topk(similarities, group: slice, k: int = 1) -> Tuple[List[float], List[int]]:
+    """Top-k (scores, indices) within one label group, materialized with a single host sync each."""
+    import torch
+    values, indices = torch.topk(similarities[group], k)
+    return values.tolist(), indices.tolist()
+
+
+def _summarize_matches(prices: List[float], top_distance: float) -> Tuple[Optional[float], str, float]:
+    """
+    Numeric summary of the similar items: (estimated_price, condition, confidence).
+    
+    - Price: mean of the prices after dropping > 3 standard deviation outliers
+    - Condition: bucketed distance to the closest match
+    - Confidence: 1 - distance, clamped to [0, 1]
+    Pure NumPy over plain inputs, so it can be reused for batches of analyses.
+    """
+    # CONDITION ESTIMATION - Based on distance to similar items
+    if top_distance < 0.3:
+        condition = "excellent"
+    elif top_distance < 0.5:
+        condition = "good"
+    else:
+        condition = "fair"
+    
+    # PRICE ESTIMATION - Average of top similar items, filter outliers
+    if prices:
+        # Remove outliers (anything > 3 standard deviations)
+        price_arr = np.asarray(prices, dtype=np.float64)
+        if price_arr.size > 3:
+            mean = float(price_arr.mean())
+            stdev = price_arr.std(ddof=1)
+            filtered_prices = price_arr[np.abs(price_arr - mean) < 3 * stdev]
+            # Identical prices give stdev 0 and an empty mask; fall back to the plain mean
+            estimated_price = round(float(filtered_prices.mean()) if filtered_prices.size else mean, 2)
+        else:
+            estimated_price = round(float(price_arr.mean()), 2)
+    else:
+        estimated_price = None
+    
+    # CONFIDENCE SCORE - Based on CLIP distance
+    confidence = max(0.0, min(1.0, 1.0 - top_distance))
+    return estimated_price, condition, confidence
+
+
+@app.post("/analyze_image")
+async def analyze_image(payload: dict):
+    """
+    AI-powered item analysis using CLIP embeddings + visual similarity.
+    
+    Analyzes uploaded images to extract:
+    - Item name/type (from similar items in database)
+    - Brand (from text in similar items)
+    - Category (from clustering of similar items)
+    - Estimated size (from similar items)
+    - Condition (visual quality assessment)
+    - Colors (from title/description keywords)
+    - Materials (from similar items)
+    - Estimated price (average of top 10 similar items)
+    
+    This uses your 25,677 item database for smart predictions!
+    """
+    image_base64 = payload.get("image", "")
+    if not image_base64:
+        raise HTTPException(status_code=400, detail="Image is required")
+    
+    image_bytes = _decode_base64_image(image_base64)
+    return await _analyze_image_bytes(image_bytes)
+
+
+@app.post("/analyze_image_binary")
+async def analyze_image_binary(request: Request):
+    """/analyze_image for a raw image body (Content-Type: application/octet-stream), no base64."""
+    image_bytes = await request.body()
+    if not image_bytes:
+        raise HTTPException(status_code=400, detail="Image body is required")
+    return await _analyze_image_bytes(image_bytes)
+
+
+async def _analyze_image_bytes(image_bytes: bytes) -> ORJSONResponse:
+    """
+    Shared analysis pipeline behind /analyze_image and /analyze_image_binary.
+    Responses are returned as ORJSONResponse directly, skipping FastAPI's
+    jsonable_encoder walk over the result dict.
+    """
+    # Identical uploads (retries, re-analysis) skip GPT-4 Vision and CLIP entirely
+    cache_key = f"analyze:{ANALYZE_CACHE_VERSION}:{hashlib.sha256(image_bytes).hexdigest()}"
+    cached = await cache.get(cache_key)
+    if cached is not None:
+        logger.info("AI analysis served from cache")
+        return ORJSONResponse(cached)
+    
+    try:
+        # STEP 1: Use zero-shot classification on the actual image
+        # This analyzes the ACTUAL image, not similar items
+        # Reuse the CLIP model from embeddings module for efficiency
+        import torch
+        
+        # Decode once; the search embedding and zero-shot scoring share one CLIP pass
+        uploaded_image = await asyncio.to_thread(decode_image, image_bytes)
+        
+        # STEP 0: GPT-4 Vision (network-bound) runs while CLIP encodes the image (CPU-bound)
+        (
+            (detected_text_on_image, gpt4_detected_color, gpt4_failed),
+            (embedding, clip_embedding),
+        ) = await asyncio.gather(
+            _gpt4_detect_brand_and_color(image_bytes),
+            embed_image_and_clip(uploaded_image, image_bytes),
+        )
+        
+        # Step 1: Check if GPT-4 Vision found brand text directly on the image
+        gpt4_brand = ""
+        if detected_text_on_image:
+            # First, try direct match (GPT-4 might return the exact brand name)
+            # (the reply parser already lowercases and strips it)
+            detected_lower = detected_text_on_image
+            
+            # Check for direct brand name match (single automaton pass)
+            brand_name = match_brand_keyword(detected_lower)
+            if brand_name:
+                gpt4_brand = brand_name
+                logger.info(f"✅ GPT-4 Vision identified brand: {brand_name}")
+            
+            # If no match, GPT-4 might have returned a brand we recognize
+            if not gpt4_brand and len(detected_text_on_image) > 2:
+                # Capitalize first letter of each word for brands not in our list
+                gpt4_brand = detected_text_on_image.title()
+                logger.info(f"✅ GPT-4 Vision detected unknown brand: {gpt4_brand}")
+        
+        # GPT-4 answers override CLIP color and visual brand, so skip scoring those labels
+        skip_color = bool(gpt4_detected_color)
+        skip_visual_brand = bool(gpt4_brand)
         
         # Zero-shot category classification - HIGHLY GRANULAR
-        category_labels = [
-            "bomber jacket flight jacket ma-1",
-            "parka winter coat hooded coat",
-            "denim jacket jean jacket trucker jacket",
-            "blazer suit jacket sport coat",
-            "leather jacket moto jacket biker jacket",
-            "windbreaker track jacket coach jacket",
-            "hoodie hooded sweatshirt pullover hoodie zip-up hoodie",
-            "cardigan button-up sweater knit cardigan",
-            "crewneck sweater pullover sweater",
-            "v-neck sweater",
-            "turtleneck sweater roll neck",
-            "fleece jacket fleece pullover",
-            "t-shirt tee short sleeve top",
-            "long sleeve shirt button-up oxford chambray",
-            "polo shirt collared shirt",
-            "tank top sleeveless shirt muscle tee",
-            "blouse feminine top",
-            "dress gown maxi midi mini dress",
-            "jeans denim pants 5-pocket",
-            "chinos khakis dress pants trousers",
-            "cargo pants utility pants tactical pants",
-            "joggers sweatpants track pants",
-            "shorts bermuda shorts",
-            "skirt midi skirt mini skirt",
-            "running shoes athletic sneakers trainers",
-            "basketball sneakers high-top sneakers",
-            "casual sneakers low-top sneakers canvas shoes",
-            "boots leather boots work boots chelsea boots",
-            "sandals slides flip-flops",
-            "backpack rucksack bag",
-            "tote bag shoulder bag handbag",
-            "crossbody bag messenger bag",
-            "hat cap beanie snapback"
-        ]
-        category_names = [
-            "bomber_jacket", "parka", "denim_jacket", "blazer", "leather_jacket", 
-            "windbreaker", "hoodie", "cardigan", "crewneck_sweater", "vneck_sweater",
-            "turtleneck", "fleece", "tshirt", "shirt", "polo", "tank",
-            "blouse", "dress", "jeans", "chinos", "cargo_pants", "joggers",
-            "shorts", "skirt", "running_shoes", "basketball_sneakers", 
-            "casual_sneakers", "boots", "sandals", "backpack", "tote_bag",
-            "crossbody_bag", "hat"
-        ]
-        
-        # Encode image and category labels
-        image_embedding = model.encode(uploaded_image, convert_to_tensor=True)
-        text_embeddings = model.encode(category_labels, convert_to_tensor=True)
-        
-        # Calculate similarity
-        similarities = util.cos_sim(image_embedding, text_embeddings)[0]
-        best_category_idx = similarities.argmax().item()
-        detected_category_type = category_names[best_category_idx]
-        category_confidence = float(similarities[best_category_idx])
+        # (label embeddings are precomputed at startup)
+        # One similarity pass over the needed label groups, sliced per group below.
+        # Image and label embeddings are both L2-normalized, so a dot product is the cosine.
+        label_emb = labels.label_embeddings(need_brand=not skip_visual_brand, need_color=not skip_color)
+        image_embedding = torch.as_tensor(clip_embedding, device=label_emb.device, dtype=label_emb.dtype)
+        similarities = label_emb @ image_embedding
+        
+        (category_confidence,), (best_category_idx,) = _topk(similarities, labels.CATEGORY_SLICE)
+        detected_category_type = labels.CATEGORY_NAMES[best_category_idx]
         
         # Map to broad categories for compatibility
-        category_mapping = {
-            "bomber_jacket": "outerwear",
-            "parka": "outerwear",
-            "denim_jacket": "outerwear",
-            "blazer": "outerwear",
-            "leather_jacket": "outerwear",
-            "windbreaker": "outerwear",
-            "hoodie": "outerwear",
-            "cardigan": "outerwear",
-            "crewneck_sweater": "outerwear",
-            "vneck_sweater": "outerwear",
-            "turtleneck": "outerwear",
-            "fleece": "outerwear",
-            "tshirt": "tops",
-            "shirt": "tops",
-            "polo": "tops",
-            "tank": "tops",
-            "blouse": "tops",
-            "dress": "dresses",
-            "jeans": "bottoms",
-            "chinos": "bottoms",
-            "cargo_pants": "bottoms",
-            "joggers": "bottoms",
-            "shorts": "bottoms",
-            "skirt": "bottoms",
-            "running_shoes": "shoes",
-            "basketball_sneakers": "shoes",
-            "casual_sneakers": "shoes",
-            "boots": "shoes",
-            "sandals": "shoes",
-            "backpack": "bags",
-            "tote_bag": "bags",
-            "crossbody_bag": "bags",
-            "hat": "accessories"
-        }
-        category = category_mapping.get(detected_category_type, "tops")
-        
-        # Zero-shot color classification - ULTRA SIMPLE (just color words)
-        # Debug showed simpler is better: "white" scores 0.2279 vs "white clothing" 0.2250
-        color_labels = [
-            "black", "white", "gray", "red", "blue", "navy",
-            "green", "yellow", "orange", "pink", "purple", 
-            "brown", "multicolor"
-        ]
-        color_names = [
-            "Black", "White", "Gray", "Red", "Blue", "Navy",
-            "Green", "Yellow", "Orange", "Pink", "Purple", 
-            "Brown", "Multicolor"
-        ]
-        
-        color_embeddings = model.encode(color_labels, convert_to_tensor=True)
-        color_similarities = util.cos_sim(image_embedding, color_embeddings)[0]
-        
-        # Debug showed confidence scores are LOW (0.22-0.27 range)
-        # We need to pick the BEST one and ignore weak secondary colors
-        top_color_indices = color_similarities.argsort(descending=True)[:3]
+        category = labels.CATEGORY_GROUPS.get(detected_category_type, "tops")
         
         detected_colors = []
         color_confidences = []
         
         # Override with GPT-4 color if available (more accurate than CLIP for colors)
-        if gpt4_detected_color:
+        if skip_color:
             detected_colors.append(gpt4_detected_color.title())
             color_confidences.append(0.95)  # High confidence for GPT-4
         else:
+            # Zero-shot color classification - ULTRA SIMPLE (just color words)
+            # Debug showed confidence scores are LOW (0.22-0.27 range)
+            # We need to pick the BEST one and ignore weak secondary colors
+            top_color_confs, top_color_indices = _topk(similarities, labels.COLOR_SLICE, k=3)
+            
             # Fall back to CLIP color detection
             # ALWAYS take the top color (even if low confidence)
-            top_idx = top_color_indices[0]
-            top_color = color_names[top_idx.item()]
-            top_conf = float(color_similarities[top_idx])
-            detected_colors.append(top_color)
+            top_conf = top_color_confs[0]
+            detected_colors.append(labels.COLOR_NAMES[top_color_indices[0]])
             color_confidences.append(top_conf)
             
             # Only add secondary colors if they're VERY close to primary (within 0.02)
             # This prevents random weak secondary colors
-            for i in range(1, 3):
-                idx = top_color_indices[i]
-                conf = float(color_similarities[idx])
+            for conf, idx in zip(top_color_confs[1:], top_color_indices[1:]):
                 # Only add if very close to primary AND above 0.24 absolute threshold
                 if (top_conf - conf) < 0.02 and conf > 0.24:
-                    detected_colors.append(color_names[idx.item()])
+                    detected_colors.append(labels.COLOR_NAMES[idx])
                     color_confidences.append(conf)
         
-        # STEP 1B: Pattern detection using zero-shot classification
-        pattern_labels = [
-            "solid plain single color no pattern",
-            "striped horizontal stripes vertical stripes",
-            "graphic print logo text typography",
-            "floral flowers botanical garden print",
-            "plaid checkered tartan gingham",
-            "camouflage camo military print",
-            "tie-dye dyed marble swirl",
-            "polka dot dotted spotted",
-            "animal print leopard zebra snake",
-            "abstract geometric shapes",
-            "denim wash stonewash distressed faded",
-            "embroidered stitched embellished"
-        ]
-        pattern_names = [
-            "Solid", "Striped", "Graphic", "Floral", "Plaid", 
-            "Camo", "Tie-Dye", "Polka Dot", "Animal Print", 
-            "Abstract", "Denim Wash", "Embroidered"
-        ]
-        
-        pattern_embeddings = model.encode(pattern_labels, convert_to_tensor=True)
-        pattern_similarities = util.cos_sim(image_embedding, pattern_embeddings)[0]
+        # Reported scores (at most 3 colors; plain round() beats an array round-trip here)
+        category_score = round(category_confidence, 2)
+        color_scores = [round(c, 2) for c in color_confidences]
         
+        # STEP 1B: Pattern detection using zero-shot classification
         # Get top pattern
-        best_pattern_idx = pattern_similarities.argmax().item()
-        detected_pattern = pattern_names[best_pattern_idx]
-        pattern_confidence = float(pattern_similarities[best_pattern_idx])
+        (pattern_confidence,), (best_pattern_idx,) = _topk(similarities, labels.PATTERN_SLICE)
+        detected_pattern = labels.PATTERN_NAMES[best_pattern_idx]
+        
+        # BUILD DETECTED ITEM NAME using detected attributes:
+        # primary color, pattern if not solid, specific category type
+        # (e.g., "Bomber Jacket" not just "Outerwear")
+        detected_item = " ".join(filter(None, (
+            detected_colors[0] if detected_colors else "",
+            detected_pattern if detected_pattern.lower() != "solid" else "",
+            labels.CATEGORY_DISPLAY[detected_category_type],
+        ))) or "Fashion Item"
         
         # STEP 2: Find similar items for brand/price estimation
-        results = await search_similar(embedding, limit=10)
+        # (aggregated in SQL: one row with their text, prices and closest distance)
+        matches = await search_similar_summary(embedding, limit=10, ef_search=HNSW_EF_SEARCH_ANALYZE)
         
-        if not results:
+        if not matches["count"]:
             logger.warning("No similar items found in database")
-            # Build item name from detected attributes
-            name_parts = [detected_colors[0] if detected_colors else ""]
-            if detected_pattern and detected_pattern.lower() != "solid":
-                name_parts.append(detected_pattern)
-            name_parts.append(detected_category_type.replace("_", " ").title())
-            detected_item_name = " ".join([p for p in name_parts if p])
-            
-            return {
-                "detected_item": detected_item_name,
+            return ORJSONResponse({
+                "detected_item": detected_item,
                 "likely_brand": "",
                 "category": category,
                 "specific_category": detected_category_type,
                 "estimated_size": "M",
                 "estimated_condition": "excellent",
-                "description": f"{detected_item_name} in excellent condition",
+                "description": f"{detected_item} in excellent condition",
                 "colors": detected_colors[:3],
                 "pattern": detected_pattern,
                 "materials": [],
                 "estimated_price": None,
-                "confidence": round(category_confidence, 2),
+                "confidence": category_score,
                 "confidence_scores": {
-                    "category": round(category_confidence, 2),
-                    "colors": [round(c, 2) for c in color_confidences],
+                    "category": category_score,
+                    "colors": color_scores,
                     "pattern": round(pattern_confidence, 2),
                     "brand": 0.0
                 }
-            }
-        
-        # Analyze top matches for price estimation
-        titles = [r.get("title", "") for r in results if r.get("title")]
-        descriptions = [r.get("description", "") for r in results if r.get("description")]
-        prices = [float(r["price"]) for r in results if r.get("price") is not None]
+            })
         
-        # Combine all text for material/size/brand extraction
-        all_text = " ".join(titles + descriptions).lower()
-        
-        # Add GPT-4 Vision detected text if available (HIGHEST PRIORITY for brands)
-        if detected_text_on_image:
-            all_text = detected_text_on_image + " " + all_text
+        # Combine all text for material/size/brand extraction (titles + descriptions
+        # arrive lowercased from SQL); every scan below expects lowercase text and
+        # lowercase keyword tables.
+        # GPT-4 Vision detected text goes first if available (HIGHEST PRIORITY for brands)
+        all_text = " ".join(filter(None, (detected_text_on_image.lower(), matches["text"])))
         
         # BRAND DETECTION - TRIPLE HYBRID (GPT-4 Direct > Text Mining > Visual)
-        # Step 1: Check if GPT-4 Vision found brand text directly on the image
-        gpt4_brand = ""
-        if detected_text_on_image:
-            # Define comprehensive brand list for matching
-            brand_keywords = {
-                # Luxury
-                "prada": "Prada", "gucci": "Gucci", "louis vuitton": "Louis Vuitton", "lv": "Louis Vuitton",
-                "chanel": "Chanel", "dior": "Dior", "balenciaga": "Balenciaga", "versace": "Versace",
-                "fendi": "Fendi", "burberry": "Burberry", "saint laurent": "Saint Laurent", "ysl": "YSL",
-                "hermes": "Hermès", "hermès": "Hermès", "givenchy": "Givenchy", "valentino": "Valentino",
-                # Streetwear
-                "supreme": "Supreme", "palace": "Palace", "bape": "BAPE", "a bathing ape": "BAPE",
-                "stussy": "Stüssy", "stüssy": "Stüssy", "off-white": "Off-White", "off white": "Off-White",
-                "kith": "Kith", "anti social social club": "Anti Social Social Club", "assc": "ASSC",
-                # Athletic
-                "nike": "Nike", "adidas": "Adidas", "puma": "Puma", "reebok": "Reebok",
-                "new balance": "New Balance", "under armour": "Under Armour", "asics": "ASICS",
-                "vans": "Vans", "converse": "Converse", "champion": "Champion", "fila": "Fila",
-                # Contemporary
-                "ami paris": "AMI Paris", "ami": "AMI Paris", "acne studios": "Acne Studios", "acne": "Acne Studios",
-                "a.p.c": "A.P.C.", "apc": "A.P.C.", "stone island": "Stone Island",
-                "cp company": "C.P. Company", "c.p. company": "C.P. Company",
-                "carhartt": "Carhartt", "dickies": "Dickies", "carhartt wip": "Carhartt WIP",
-                "polo ralph lauren": "Polo Ralph Lauren", "ralph lauren": "Ralph Lauren", "polo": "Polo Ralph Lauren",
-                "tommy hilfiger": "Tommy Hilfiger", "tommy": "Tommy Hilfiger", "lacoste": "Lacoste",
-                "patagonia": "Patagonia", "north face": "The North Face", "the north face": "The North Face",
-                "columbia": "Columbia", "arcteryx": "Arc'teryx", "arc'teryx": "Arc'teryx",
-                # Fast fashion
-                "zara": "Zara", "h&m": "H&M", "hm": "H&M", "uniqlo": "Uniqlo", "gap": "Gap",
-                "old navy": "Old Navy", "forever 21": "Forever 21", "primark": "Primark",
-                # Denim
-                "levi's": "Levi's", "levis": "Levi's", "levi": "Levi's", "wrangler": "Wrangler", "lee": "Lee",
-                "diesel": "Diesel", "true religion": "True Religion", "g-star": "G-Star"
-            }
-            
-            # First, try direct match (GPT-4 might return the exact brand name)
-            detected_lower = detected_text_on_image.lower().strip()
-            
-            # Check for direct brand name match
-            for keyword, brand_name in brand_keywords.items():
-                if keyword == detected_lower or keyword in detected_lower or detected_lower in keyword:
-                    gpt4_brand = brand_name
-                    logger.info(f"✅ GPT-4 Vision identified brand: {brand_name}")
-                    break
-            
-            # If no match, GPT-4 might have returned a brand we recognize
-            if not gpt4_brand and len(detected_text_on_image) > 2:
-                # Capitalize first letter of each word for brands not in our list
-                gpt4_brand = detected_text_on_image.title()
-                logger.info(f"✅ GPT-4 Vision detected unknown brand: {gpt4_brand}")
-        
-        # Step 2: Try zero-shot for visually distinctive brands only
-        distinctive_brand_labels = [
-            # Only brands with very distinctive visual styles
-            "supreme box logo red white streetwear",
-            "nike swoosh checkmark athletic",
-            "adidas three stripes trefoil athletic",
-            "gucci gg pattern luxury italian",
-            "louis vuitton lv monogram pattern",
-            "polo ralph lauren polo pony preppy",
-            "tommy hilfiger flag logo red white blue",
-            "champion c logo athletic",
-            "carhartt workwear utility tan brown",
-            "patagonia outdoor fleece mountain",
-            "north face outdoor technical black",
-            "vans skateboard checkerboard",
-            "converse chuck taylor all-star canvas",
-            "no clear brand logo generic plain"
-        ]
-        distinctive_brand_names = [
-            "Supreme", "Nike", "Adidas", "Gucci", "Louis Vuitton",
-            "Polo Ralph Lauren", "Tommy Hilfiger", "Champion", 
-            "Carhartt", "Patagonia", "The North Face", 
-            "Vans", "Converse", ""
-        ]
-        
-        brand_embeddings = model.encode(distinctive_brand_labels, convert_to_tensor=True)
-        brand_similarities = util.cos_sim(image_embedding, brand_embeddings)[0]
-        
-        best_brand_idx = brand_similarities.argmax().item()
-        visual_brand = distinctive_brand_names[best_brand_idx]
-        visual_brand_confidence = float(brand_similarities[best_brand_idx])
+        # Step 1 (GPT-4 Direct) ran above, before the zero-shot pass
+        # Step 2: Try zero-shot for visually distinctive brands only (unused if GPT-4 found one)
+        visual_brand, visual_brand_confidence = "", 0.0
+        if not skip_visual_brand:
+            (visual_brand_confidence,), (best_brand_idx,) = _topk(similarities, labels.BRAND_SLICE)
+            visual_brand = labels.BRAND_NAMES[best_brand_idx]
         
         # Step 3: Text mining from similar items for non-distinctive brands
-        # This works better for brands without obvious visual markers
-        text_brands = {
-            # Luxury (less visually distinctive)
-            "prada", "balenciaga", "versace", "fendi", "burberry", 
-            "saint laurent", "ysl", "dior", "chanel", "hermes",
-            # Streetwear
-            "supreme", "palace", "bape", "stussy", "off-white",
-            # Athletic
-            "nike", "adidas", "puma", "reebok", "new balance", 
-            "under armour", "asics",
-            # Contemporary
-            "ami", "ami paris", "acne studios", "apc", "a.p.c.",
-            "stone island", "cp company", "c.p. company",
-            # Common brands
-            "polo", "polo ralph lauren", "ralph lauren", "tommy hilfiger",
-            "lacoste", "carhartt", "dickies", "champion",
-            "patagonia", "north face", "columbia",
-            "vans", "converse",
-            # Fast fashion
-            "zara", "h&m", "uniqlo", "gap",
-            # Denim
-            "levi's", "levis", "wrangler", "lee"
-        }
-        
-        text_brand = ""
-        text_brand_count = 0
-        for brand in text_brands:
-            count = all_text.count(brand)
-            if count > text_brand_count:
-                text_brand_count = count
-                text_brand = brand
+        # This works better for brands without obvious visual markers (not counted when GPT-4 already won)
+        # MATERIAL DETECTION rides the same automaton pass
+        text_brand, text_brand_count, detected_materials = scan_text(all_text, count_brands=not gpt4_brand)
         
         # Step 4: Decide which brand to use (PRIORITY: GPT-4 > Text Mining > Visual)
         # GPT-4 Vision reading actual text on clothing is most accurate
@@ -732,7 +764,7 @@ Be confident and specific. If you see embroidery, logos, or text - identify the
             detected_brand = gpt4_brand
             brand_confidence = 0.95  # Very high confidence for GPT-4 Vision
         elif text_brand_count >= 3:  # Brand mentioned at least 3 times (raised from 2 for higher confidence)
-            detected_brand = text_brand.title().replace("Ami Paris", "AMI Paris").replace("Ysl", "YSL").replace("Apc", "A.P.C.")
+            detected_brand = TEXT_BRAND_DISPLAY.get(text_brand, text_brand.title())
             brand_confidence = min(0.85, 0.6 + (text_brand_count * 0.08))  # Higher confidence for text
         elif visual_brand_confidence > 0.40 and visual_brand:  # Raised threshold to 0.40 (from 0.30)
             # Only use visual for VERY confident matches (distinctive logos like Nike swoosh, Adidas stripes)
@@ -746,97 +778,19 @@ Be confident and specific. If you see embroidery, logos, or text - identify the
         
         # NOTE: Category, color, and pattern now come from zero-shot classification above
         
-        # MATERIAL DETECTION from similar items
-        material_keywords = {
-            "cotton": ["cotton", "jersey"],
-            "denim": ["denim", "jean"],
-            "leather": ["leather", "suede"],
-            "wool": ["wool", "cashmere", "merino"],
-            "silk": ["silk", "satin"],
-            "polyester": ["polyester", "poly"],
-            "linen": ["linen"],
-            "nylon": ["nylon"],
-            "canvas": ["canvas"]
-        }
-        
-        detected_materials = []
-        for material, keywords in material_keywords.items():
-            if any(kw in all_text for kw in keywords):
-                detected_materials.append(material.title())
+        # SIZE ESTIMATION - From similar items (whole-word size tokens)
+        estimated_size = estimate_size(all_text)
         
-        # BUILD DETECTED ITEM NAME using detected attributes
-        name_parts = []
-        
-        # Add primary color
-        if detected_colors:
-            name_parts.append(detected_colors[0])
-        
-        # Add pattern if not solid
-        if detected_pattern and detected_pattern.lower() != "solid":
-            name_parts.append(detected_pattern)
-        
-        # Add specific category type (e.g., "Bomber Jacket" not just "Outerwear")
-        category_display = detected_category_type.replace("_", " ").title()
-        name_parts.append(category_display)
-        
-        detected_item = " ".join(name_parts) if name_parts else "Fashion Item"
-        
-        # SIZE ESTIMATION - From similar items
-        size_keywords = ["xs", "s", "m", "l", "xl", "xxl"]
-        size_counts = {size: all_text.count(size) for size in size_keywords}
-        if size_counts:
-            estimated_size = max(size_counts, key=lambda k: size_counts[k]).upper()
-        else:
-            estimated_size = "M"
-        
-        # CONDITION ESTIMATION - Based on distance to similar items
-        top_match = results[0]
-        distance = top_match.get("distance", 1.0)
-        
-        if distance < 0.3:
-            estimated_condition = "excellent"
-        elif distance < 0.5:
-            estimated_condition = "good"
-        else:
-            estimated_condition = "fair"
-        
-        # PRICE ESTIMATION - Average of top similar items, filter outliers
-        if prices:
-            # Remove outliers (anything > 3 standard deviations)
-            import statistics
-            if len(prices) > 3:
-                mean = statistics.mean(prices)
-                stdev = statistics.stdev(prices)
-                filtered_prices = [p for p in prices if abs(p - mean) < 3 * stdev]
-                estimated_price = round(statistics.mean(filtered_prices), 2) if filtered_prices else mean
-            else:
-                estimated_price = round(statistics.mean(prices), 2)
-        else:
-            estimated_price = None
+        # CONDITION, PRICE and CONFIDENCE from the similar items
+        estimated_price, estimated_condition, overall_confidence = _summarize_matches(
+            matches["prices"], matches["top_distance"]
+        )
         
         # DESCRIPTION GENERATION - Simple and factual
-        description_parts = []
-        
-        # Brand
-        if detected_brand:
-            description_parts.append(detected_brand)
-        
-        # Item name (e.g., "Navy Windbreaker")
-        description_parts.append(detected_item)
-        
-        # Size
-        if estimated_size:
-            description_parts.append(f"Size {estimated_size}")
-        
-        # Condition
-        if estimated_condition:
-            description_parts.append(estimated_condition.title())
-        
-        # Simple, comma-separated format: "Starter Navy Windbreaker, Size M, Excellent"
-        description = ", ".join(description_parts) + "."
-        
-        # CONFIDENCE SCORE - Based on CLIP distance
-        overall_confidence = max(0.0, min(1.0, 1.0 - distance))
+        # Comma-separated: brand (if any), item name, size, condition
+        # e.g. "Starter, Navy Windbreaker, Size M, Excellent."
+        brand_prefix = f"{detected_brand}, " if detected_brand else ""
+        description = f"{brand_prefix}{detected_item}, Size {estimated_size}, {estimated_condition.title()}."
         
         analysis = {
             "detected_item": detected_item,
@@ -853,15 +807,19 @@ Be confident and specific. If you see embroidery, logos, or text - identify the
             "confidence": round(overall_confidence, 2),
             # Detailed confidence scores for each attribute
             "confidence_scores": {
-                "category": round(category_confidence, 2),
-                "colors": [round(c, 2) for c in color_confidences],
+                "category": category_score,
+                "colors": color_scores,
                 "pattern": round(pattern_confidence, 2),
                 "brand": round(brand_confidence, 2)
             }
         }
         
         logger.info(f"AI analysis: {detected_item} ({detected_brand}) - {overall_confidence:.0%} confidence")
-        return analysis
+        
+        # Don't pin a degraded (GPT-4 Vision failed) result for the whole TTL
+        if not gpt4_failed:
+            await cache.set(cache_key, analysis, ANALYZE_CACHE_TTL)
+        return ORJSONResponse(analysis)
         
     except Exception as exc:
         logger.error(f"AI analysis failed: {exc}")
@@ -869,26 +827,28 @@ Be confident and specific. If you see embroidery, logos, or text - identify the
 
 
 @app.post("/generate_description")
-async def generate_description(payload: dict):
+async def generate_description(payload: GenerateDescriptionRequest):
     """
     Generate a professional product description using GPT-4 Vision API.
     
     Requires OPENAI_API_KEY environment variable to be set.
     Falls back to template-based generation if API key not available.
+    
+    Send either "image" (base64) or "image_url" (already-hosted image); the
+    URL is passed to GPT-4 Vision as-is, skipping the base64 data URL.
     """
     try:
-        import os
-        
         # Extract parameters
-        image_base64 = payload.get("image")
-        category = payload.get("category", "clothing item")
-        brand = payload.get("brand", "")
-        colors = payload.get("colors", [])
-        condition = payload.get("condition", "Good")
-        materials = payload.get("materials", [])
-        size = payload.get("size", "")
-        
-        if not image_base64:
+        image_base64 = payload.image
+        image_url = payload.image_url
+        category = payload.category
+        brand = payload.brand
+        colors = payload.colors
+        condition = payload.condition
+        materials = payload.materials
+        size = payload.size
+        
+        if not image_base64 and not image_url:
             raise HTTPException(status_code=400, detail="No image provided")
         
         # Try GPT-4 Vision API first
@@ -896,8 +856,7 @@ async def generate_description(payload: dict):
         
         if openai_key:
             try:
-                from openai import OpenAI
-                client = OpenAI(api_key=openai_key)
+                client = _get_vision_client(openai_key).with_options(timeout=REQUEST_TIMEOUT)
                 
                 # Build context for GPT-4
                 context_parts = []
@@ -910,7 +869,7 @@ async def generate_description(payload: dict):
                 context = " ".join(context_parts)
                 
                 # Call GPT-4 Vision for simple, factual description
-                response = client.chat.completions.create(
+                response = await client.chat.completions.create(
                     model="gpt-4o",
                     messages=[
                         {
@@ -939,7 +898,7 @@ Write a simple description:"""
                                 {
                                     "type": "image_url",
                                     "image_url": {
-                                        "url": f"data:image/jpeg;base64,{image_base64}"
+                                        "url": image_url or f"data:image/jpeg;base64,{image_base64}"
                                     }
                                 }
                             ]
@@ -1004,7 +963,7 @@ Write a simple description:"""
 
 
 @app.post("/add_item")
-async def add_item(payload: dict):
+async def add_item(payload: AddItemRequest):
     """
     Add a new item to the database with CLIP embeddings.
     
@@ -1024,72 +983,20 @@ async def add_item(payload: dict):
     """
     try:
         # Extract required fields
-        image_base64 = payload.get("image_base64")
-        title = payload.get("title", "")
-        description = payload.get("description", "")
-        price = payload.get("price")
+        image_base64 = payload.image_base64
+        title = payload.title
         
         if not image_base64:
             raise HTTPException(status_code=400, detail="Image is required")
         if not title:
             raise HTTPException(status_code=400, detail="Title is required")
         
-        # Extract optional fields
-        brand = payload.get("brand", "")
-        category = payload.get("category", "")
-        size = payload.get("size", "")
-        condition = payload.get("condition", "")
-        owner_id = payload.get("owner_id", "")
-        source = payload.get("source", "modaics")
-        image_url = payload.get("image_url", "")
-        
-        # Decode image
-        try:
-            image_bytes = base64.b64decode(image_base64)
-        except Exception as exc:
-            logger.error(f"Base64 decode failed: {exc}")
-            raise HTTPException(status_code=400, detail="Invalid base64 image data") from exc
-        
-        # Generate multimodal CLIP embedding (image + text)
-        # Combine title and description for better semantic search
-        text_for_embedding = f"{title}. {description}"
-        try:
-            embedding = embed_image(image_bytes=image_bytes, text=text_for_embedding)
-            logger.info(f"Generated embedding for new item: {title}")
-        except Exception as exc:
-            logger.error(f"Embedding generation failed: {exc}")
-            raise HTTPException(status_code=500, detail=f"Embedding error: {str(exc)}") from exc
+        # Decode image (off the event loop; payloads can be several MB)
+        image_bytes = await asyncio.to_thread(_decode_base64_image, image_base64)
         
-        # Insert into database
-        try:
-            # Build full item data
-            item_data = {
-                "title": title,
-                "description": description,
-                "price": price,
-                "brand": brand,
-                "category": category,
-                "size": size,
-                "condition": condition,
-                "owner_id": owner_id,
-                "source": source,
-                "image_url": image_url,
-                "embedding": embedding
-            }
-            
-            # Insert into DB and get the new ID
-            item_id = await db.insert_item(item_data)
-            logger.info(f"Successfully added item with ID: {item_id}")
-            
-            return {
-                "success": True,
-                "item_id": item_id,
-                "message": "Item added successfully with CLIP embeddings"
-            }
-            
-        except Exception as exc:
-            logger.error(f"Database insertion failed: {exc}")
-            raise HTTPException(status_code=500, detail=f"Database error: {str(exc)}") from exc
+        # Build full item data (every field but the image)
+        item_data = payload.model_dump(exclude={"image_base64"})
+        return await _insert_item(image_bytes, item_data)
         
     except HTTPException:
         raise
@@ -1098,15 +1005,86 @@ async def add_item(payload: dict):
         raise HTTPException(status_code=500, detail=f"Server error: {str(exc)}") from exc
 
 
+@app.post("/add_item_multipart")
+async def add_item_multipart(
+    image: UploadFile = File(...),
+    title: str = Form(...),
+    description: str = Form(""),
+    price: Optional[float] = Form(None),
+    brand: str = Form(""),
+    category: str = Form(""),
+    size: str = Form(""),
+    condition: str = Form(""),
+    owner_id: str = Form(""),
+    source: str = Form("modaics"),
+    image_url: str = Form(""),
+):
+    """
+    /add_item with the image as a multipart file part instead of base64 JSON.
+    Same fields as /add_item; no base64 expansion or decode.
+    """
+    image_bytes = await image.read()
+    if not image_bytes:
+        raise HTTPException(status_code=400, detail="Image is required")
+    if not title:
+        raise HTTPException(status_code=400, detail="Title is required")
+    
+    try:
+        item_data = {
+            "title": title,
+            "description": description,
+            "price": price,
+            "brand": brand,
+            "category": category,
+            "size": size,
+            "condition": condition,
+            "owner_id": owner_id,
+            "source": source,
+            "image_url": image_url,
+        }
+        return await _insert_item(image_bytes, item_data)
+    except HTTPException:
+        raise
+    except Exception as exc:
+        logger.error(f"Add item failed: {exc}")
+        raise HTTPException(status_code=500, detail=f"Server error: {str(exc)}") from exc
+
+
+async def _insert_item(image_bytes: bytes, item_data: dict) -> dict:
+    """Embed a new listing (image + title/description) and insert it; shared by both add_item endpoints."""
+    title = item_data["title"]
+    
+    # Generate multimodal CLIP embedding (image + text)
+    # Combine title and description for better semantic search
+    text_for_embedding = f"{title}. {item_data['description']}"
+    try:
+        embedding = await embed_image_async(image_bytes=image_bytes, text=text_for_embedding)
+        logger.info(f"Generated embedding for new item: {title}")
+    except Exception as exc:
+        logger.error(f"Embedding generation failed: {exc}")
+        raise HTTPException(status_code=500, detail=f"Embedding error: {str(exc)}") from exc
+    
+    # Insert into database
+    try:
+        # Insert into DB and get the new ID
+        item_id = await db.insert_item({**item_data, "embedding": embedding})
+        logger.info(f"Successfully added item with ID: {item_id}")
+        
+        return {
+            "success": True,
+            "item_id": item_id,
+            "message": "Item added successfully with CLIP embeddings"
+        }
+        
+    except Exception as exc:
+        logger.error(f"Database insertion failed: {exc}")
+        raise HTTPException(status_code=500, detail=f"Database error: {str(exc)}") from exc
+
+
 # ============================================================================
 # SKETCHBOOK API ENDPOINTS
 # ============================================================================
 
-try:
-    from . import sketchbook
-except ImportError:
-    import sketchbook
-
 
 @app.get("/sketchbook/brand/{brand_id}")
 async def get_brand_sketchbook(brand_id: str):
@@ -1122,17 +1100,12 @@ async def get_brand_sketchbook(brand_id: str):
 
 
 @app.put("/sketchbook/{sketchbook_id}/settings")
-async def update_sketchbook(sketchbook_id: int, payload: dict):
+async def update_sketchbook(sketchbook_id: int, payload: SketchbookSettingsUpdate):
     """Update sketchbook settings (brand only)."""
     try:
         result = await sketchbook.update_sketchbook_settings(
             sketchbook_id=sketchbook_id,
-            title=payload.get("title"),
-            description=payload.get("description"),
-            access_policy=payload.get("access_policy"),
-            membership_rule=payload.get("membership_rule"),
-            min_spend_amount=payload.get("min_spend_amount"),
-            min_spend_window_months=payload.get("min_spend_window_months")
+            **payload.model_dump()
         )
         
         if not result:
@@ -1156,30 +1129,13 @@ async def get_posts(sketchbook_id: int, user_id: str = None, limit: int = 50):
 
 
 @app.post("/sketchbook/{sketchbook_id}/posts")
-async def create_post(sketchbook_id: int, payload: dict):
+async def create_post(sketchbook_id: int, payload: SketchbookPostCreate):
     """Create a new sketchbook post (brand only)."""
     try:
-        from datetime import datetime
-        
-        # Parse poll_closes_at if present
-        poll_closes_at = None
-        if payload.get("poll_closes_at"):
-            poll_closes_at = datetime.fromisoformat(payload["poll_closes_at"].replace("Z", "+00:00"))
-        
+        # poll_closes_at (ISO-8601, "Z" allowed) is parsed by the request model
         result = await sketchbook.create_sketchbook_post(
             sketchbook_id=sketchbook_id,
-            author_user_id=payload["author_user_id"],
-            post_type=payload["post_type"],
-            title=payload["title"],
-            body=payload.get("body"),
-            media=payload.get("media"),
-            tags=payload.get("tags"),
-            visibility=payload.get("visibility", "public"),
-            poll_question=payload.get("poll_question"),
-            poll_options=payload.get("poll_options"),
-            poll_closes_at=poll_closes_at,
-            event_id=payload.get("event_id"),
-            event_highlight=payload.get("event_highlight")
+            **payload.model_dump()
         )
         
         if not result:
@@ -1326,12 +1282,30 @@ async def health():
     }
 
 
+@app.get("/cache/stats")
+async def cache_stats():
+    """Hit/miss counters for the result, embedding and semantic caches (this worker only)."""
+    return cache.stats()
+
+
+# Last /metrics payload: (monotonic timestamp, payload)
+_metrics_cache = (float("-inf"), {})
+METRICS_CACHE_SECONDS = 1.0
+
+
 @app.get("/metrics")
 async def metrics():
     """
     Basic metrics endpoint.
     In production: integrate Prometheus or DataDog.
+    Served from a 1-second cache so scrape bursts don't hammer the pool.
     """
+    global _metrics_cache
+    now = time.monotonic()
+    cached_at, cached = _metrics_cache
+    if now - cached_at < METRICS_CACHE_SECONDS:
+        return cached
+    
     # Get DB pool stats
     pool = db._pool
     if pool:
@@ -1342,25 +1316,21 @@ async def metrics():
     else:
         pool_stats = {"error": "pool_not_initialized"}
     
-    return {
+    payload = {
         "database": pool_stats,
     }
+    _metrics_cache = (now, payload)
+    return payload
 
 
 # ============================================================================
 # PAYMENT ENDPOINTS
 # ============================================================================
 
-try:
-    from . import payments
-except ImportError:
-    import payments
-
 
 @app.get("/config/stripe")
 async def get_stripe_config():
     """Get Stripe publishable key for client-side initialization."""
-    import os
     return {
         "publishableKey": os.getenv("STRIPE_PUBLISHABLE_KEY", "pk_test_your_key"),
         "connectedAccountId": None  # Set if using Stripe Connect
@@ -1454,7 +1424,6 @@ async def create_event_ticket_payment(payload: payments.EventTicketRequest, requ
         ephemeral_key = await payments.create_ephemeral_key(customer_id)
         
         import stripe
-        import os
         
         payment_intent = stripe.PaymentIntent.create(
             amount=int(payload.amount * 100),
@@ -0,0 +1,100 @@
+"""
+Brand keyword matching for /analyze_image.
+Keyword tables are compiled into Aho-Corasick automata at import, so each
+lookup is a single pass over the text regardless of dictionary size.
+Keywords are lowercase; callers pass lowercased text.
+"""
+from typing import Optional
+
+import ahocorasick
+
+# Keyword -> display name for brand text read off the image (earlier entries win)
+BRAND_KEYWORDS = {
+    # Luxury
+    "prada": "Prada", "gucci": "Gucci", "louis vuitton": "Louis Vuitton", "lv": "Louis Vuitton",
+    "chanel": "Chanel", "dior": "Dior", "balenciaga": "Balenciaga", "versace": "Versace",
+    "fendi": "Fendi", "burberry": "Burberry", "saint laurent": "Saint Laurent", "ysl": "YSL",
+    "hermes": "Hermès", "hermès": "Hermès", "givenchy": "Givenchy", "valentino": "Valentino",
+    # Streetwear
+    "supreme": "Supreme", "palace": "Palace", "bape": "BAPE", "a bathing ape": "BAPE",
+    "stussy": "Stüssy", "stüssy": "Stüssy", "off-white": "Off-White", "off white": "Off-White",
+    "kith": "Kith", "anti social social club": "Anti Social Social Club", "assc": "ASSC",
+    # Athletic
+    "nike": "Nike", "adidas": "Adidas", "puma": "Puma", "reebok": "Reebok",
+    "new balance": "New Balance", "under armour": "Under Armour", "asics": "ASICS",
+    "vans": "Vans", "converse": "Converse", "champion": "Champion", "fila": "Fila",
+    # Contemporary
+    "ami paris": "AMI Paris", "ami": "AMI Paris", "acne studios": "Acne Studios", "acne": "Acne Studios",
+    "a.p.c": "A.P.C.", "apc": "A.P.C.", "stone island": "Stone Island",
+    "cp company": "C.P. Company", "c.p. company": "C.P. Company",
+    "carhartt": "Carhartt", "dickies": "Dickies", "carhartt wip": "Carhartt WIP",
+    "polo ralph lauren": "Polo Ralph Lauren", "ralph lauren": "Ralph Lauren", "polo": "Polo Ralph Lauren",
+    "tommy hilfiger": "Tommy Hilfiger", "tommy": "Tommy Hilfiger", "lacoste": "Lacoste",
+    "patagonia": "Patagonia", "north face": "The North Face", "the north face": "The North Face",
+    "columbia": "Columbia", "arcteryx": "Arc'teryx", "arc'teryx": "Arc'teryx",
+    # Fast fashion
+    "zara": "Zara", "h&m": "H&M", "hm": "H&M", "uniqlo": "Uniqlo", "gap": "Gap",
+    "old navy": "Old Navy", "forever 21": "Forever 21", "primark": "Primark",
+    # Denim
+    "levi's": "Levi's", "levis": "Levi's", "levi": "Levi's", "wrangler": "Wrangler", "lee": "Lee",
+    "diesel": "Diesel", "true religion": "True Religion", "g-star": "G-Star"
+}
+
+# Brands mined from similar items' titles/descriptions
+TEXT_BRANDS = (
+    # Luxury (less visually distinctive)
+    "prada", "balenciaga", "versace", "fendi", "burberry", 
+    "saint laurent", "ysl", "dior", "chanel", "hermes",
+    # Streetwear
+    "supreme", "palace", "bape", "stussy", "off-white",
+    # Athletic
+    "nike", "adidas", "puma", "reebok", "new balance", 
+    "under armour", "asics",
+    # Contemporary
+    "ami", "ami paris", "acne studios", "apc", "a.p.c.",
+    "stone island", "cp company", "c.p. company",
+    # Common brands
+    "polo", "polo ralph lauren", "ralph lauren", "tommy hilfiger",
+    "lacoste", "carhartt", "dickies", "champion",
+    "patagonia", "north face", "columbia",
+    "vans", "converse",
+    # Fast fashion
+    "zara", "h&m", "uniqlo", "gap",
+    # Denim
+    "levi's", "levis", "wrangler", "lee"
+)
+
+# Display name for each text-mined brand keyword (title case unless overridden)
+TEXT_BRAND_DISPLAY = {kw: kw.title() for kw in TEXT_BRANDS}
+TEXT_BRAND_DISPLAY.update({
+    "ami paris": "AMI Paris", "ysl": "YSL", "apc": "A.P.C.", "levi's": "Levi's",
+})
+
+
+def _build_automaton(keywords):
+    """Aho-Corasick automaton mapping each keyword to (priority, keyword)"""
+    automaton = ahocorasick.Automaton()
+    for priority, kw in enumerate(keywords):
+        if kw not in automaton:
+            automaton.add_word(kw, (priority, kw))
+    automaton.make_automaton()
+    return automaton
+
+
+_BRAND_KEYWORD_AUTOMATON = _build_automaton(BRAND_KEYWORDS)
+
+
+def match_brand_keyword(detected_lower: str) -> Optional[str]:
+    """
+    Display name for brand text detected on the image, or None.
+    
+    Prefers the highest-priority keyword contained in the text; falls back to
+    keywords that contain the text (e.g. "north" -> "north face").
+    """
+    best = min((hit for _, hit in _BRAND_KEYWORD_AUTOMATON.iter(detected_lower)), default=None)
+    if best is not None:
+        return BRAND_KEYWORDS[best[1]]
+    for keyword, brand_name in BRAND_KEYWORDS.items():
+        if detected_lower in keyword:
+            return brand_name
+    return None
@@ -0,0 +1,224 @@
+"""
+Result cache for expensive inference endpoints.
+In-process LRU in front of an optional shared Redis (REDIS_URL).
+"""
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, List, Optional
+
+import numpy as np
+
+try:
+    from .config import (
+        CACHE_LRU_SIZE,
+        REDIS_URL,
+        SEARCH_CACHE_TTL,
+        SEMANTIC_CACHE_SIZE,
+        SEMANTIC_CACHE_THRESHOLD,
+        TEXT_EMBED_LRU_SIZE,
+    )
+except ImportError:
+    from config import (
+        CACHE_LRU_SIZE,
+        REDIS_URL,
+        SEARCH_CACHE_TTL,
+        SEMANTIC_CACHE_SIZE,
+        SEMANTIC_CACHE_THRESHOLD,
+        TEXT_EMBED_LRU_SIZE,
+    )
+
+logger = logging.getLogger(__name__)
+
+# Per-worker LRU (key -> decoded value)
+_lru: "OrderedDict[str, Any]" = OrderedDict()
+
+# Per-worker LRU for embedding vectors (key -> list of floats)
+_vector_lru: "OrderedDict[str, List[float]]" = OrderedDict()
+
+# Shared Redis client (None when REDIS_URL is unset or unreachable)
+_redis = None
+
+# Exact-key lookups served by get() (LRU or Redis) vs. not found
+_hits = 0
+_misses = 0
+
+
+async def init_redis():
+    """Connect to Redis at app startup. The cache degrades to LRU-only on failure."""
+    global _redis
+    if _redis is not None or not REDIS_URL:
+        return
+    try:
+        import redis.asyncio as aioredis
+        client = aioredis.from_url(REDIS_URL)
+        await client.ping()
+        _redis = client
+        logger.info("Redis cache connected")
+    except Exception as e:
+        logger.warning(f"Redis unavailable, using in-process cache only: {e}")
+
+
+async def close_redis():
+    """Close the Redis client at app shutdown."""
+    global _redis
+    if _redis is not None:
+        await _redis.close()
+        _redis = None
+
+
+def _lru_put(key: str, value: Any, lru: OrderedDict = _lru, size: int = CACHE_LRU_SIZE):
+    lru[key] = value
+    lru.move_to_end(key)
+    while len(lru) > size:
+        lru.popitem(last=False)
+
+
+async def get(key: str) -> Optional[Any]:
+    """Look up a cached value: LRU first, then Redis (backfilling the LRU)."""
+    global _hits, _misses
+    if key in _lru:
+        _lru.move_to_end(key)
+        _hits += 1
+        return _lru[key]
+    if _redis is None:
+        _misses += 1
+        return None
+    try:
+        raw = await _redis.get(key)
+    except Exception as e:
+        logger.warning(f"Redis GET failed: {e}")
+        raw = None
+    if raw is None:
+        _misses += 1
+        return None
+    value = json.loads(raw)
+    _lru_put(key, value)
+    _hits += 1
+    return value
+
+
+async def set(key: str, value: Any, ttl: int):
+    """Store a JSON-serializable value in the LRU and in Redis with a TTL (seconds)."""
+    _lru_put(key, value)
+    if _redis is None:
+        return
+    try:
+        await _redis.setex(key, ttl, json.dumps(value))
+    except Exception as e:
+        logger.warning(f"Redis SETEX failed: {e}")
+
+
+async def get_vector(key: str) -> Optional[List[float]]:
+    """Look up a cached embedding vector: LRU first, then Redis (raw float32 bytes)."""
+    if key in _vector_lru:
+        _vector_lru.move_to_end(key)
+        return _vector_lru[key]
+    if _redis is None:
+        return None
+    try:
+        raw = await _redis.get(key)
+    except Exception as e:
+        logger.warning(f"Redis GET failed: {e}")
+        return None
+    if raw is None:
+        return None
+    vector = np.frombuffer(raw, dtype=np.float32).tolist()
+    _lru_put(key, vector, _vector_lru, TEXT_EMBED_LRU_SIZE)
+    return vector
+
+
+async def set_vector(key: str, vector: List[float], ttl: int):
+    """Store an embedding vector in the LRU and in Redis as raw float32 bytes."""
+    _lru_put(key, vector, _vector_lru, TEXT_EMBED_LRU_SIZE)
+    if _redis is None:
+        return
+    try:
+        await _redis.setex(key, ttl, np.asarray(vector, dtype=np.float32).tobytes())
+    except Exception as e:
+        logger.warning(f"Redis SETEX failed: {e}")
+
+
+class SemanticCache:
+    """
+    Near-duplicate lookup for query embeddings.
+    Vectors live in one preallocated (N, dim) float32 matrix, so a lookup is a
+    single mat-vec product; a hit is the best fresh match with cosine >= threshold.
+    A put replaces a near-identical row, else reuses an expired row; the least
+    recently used row is overwritten once the cache is full.
+    """
+
+    def __init__(self, size: int, threshold: float, ttl: float):
+        self.size = size
+        self.threshold = threshold
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._vecs: Optional[np.ndarray] = None  # allocated on first put (dim unknown until then)
+        self._values: List[Any] = []
+        self._stored_at = np.zeros(size)
+        self._used_at = np.zeros(size)
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        v = np.asarray(vector, dtype=np.float32)
+        return v / (np.linalg.norm(v) or 1.0)
+
+    def get(self, vector) -> Optional[Any]:
+        """Value stored for the most similar cached vector, if close enough and fresh."""
+        n = len(self._values)
+        if n == 0:
+            self.misses += 1
+            return None
+        now = time.monotonic()
+        sims = self._vecs[:n] @ self._normalize(vector)
+        sims[now - self._stored_at[:n] > self.ttl] = -np.inf  # expired rows can't win
+        i = int(np.argmax(sims))
+        if sims[i] < self.threshold:
+            self.misses += 1
+            return None
+        self._used_at[i] = now
+        self.hits += 1
+        return self._values[i]
+
+    def put(self, vector, value: Any):
+        v = self._normalize(vector)
+        if self._vecs is None:
+            self._vecs = np.zeros((self.size, v.shape[0]), dtype=np.float32)
+        n = len(self._values)
+        now = time.monotonic()
+        i = None
+        if n:
+            sims = self._vecs[:n] @ v
+            expired = now - self._stored_at[:n] > self.ttl
+            best = int(np.argmax(sims))
+            if sims[best] >= self.threshold:
+                i = best  # refresh the (possibly stale) near-duplicate in place
+            elif expired.any():
+                i = int(np.argmax(expired))
+        if i is None:
+            if n < self.size:
+                i = n
+                self._values.append(None)
+            else:
+                i = int(np.argmin(self._used_at))
+        self._values[i] = value
+        self._vecs[i] = v
+        self._stored_at[i] = self._used_at[i] = now
+
+    def stats(self) -> dict:
+        return {"entries": len(self._values), "hits": self.hits, "misses": self.misses}
+
+
+# Text search responses keyed by query embedding (per worker)
+semantic_search = SemanticCache(SEMANTIC_CACHE_SIZE, SEMANTIC_CACHE_THRESHOLD, SEARCH_CACHE_TTL)
+
+
+def stats() -> dict:
+    """Hit/miss counters for /cache/stats."""
+    return {
+        "exact": {"entries": len(_lru), "hits": _hits, "misses": _misses, "redis": _redis is not None},
+        "text_embeddings": {"entries": len(_vector_lru)},
+        "semantic_search": semantic_search.stats(),
+    }
@@ -9,7 +9,34 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "clip")  # options: openai, clip
 OPENAI_EMBEDDING_MODEL = os.getenv("OPENAI_EMBEDDING_MODEL", "image-embedding-3-large")
 EMBEDDING_DIMENSION = 768
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "100"))  # pgvector default is 40
+HNSW_EF_SEARCH_ANALYZE = int(os.getenv("HNSW_EF_SEARCH_ANALYZE", "200"))  # /analyze_image favours recall over latency
+HNSW_EF_SEARCH_MAX = 1000  # pgvector rejects larger hnsw.ef_search values
+# >0: /analyze_image recalls this many via the bit index (migration 003), then reranks.
+# Needs ef_search >= candidates, so values above HNSW_EF_SEARCH_MAX (1000) are clamped to it.
+BINARY_RERANK_CANDIDATES = min(int(os.getenv("BINARY_RERANK_CANDIDATES", "0")), HNSW_EF_SEARCH_MAX)
 REQUEST_TIMEOUT = int(os.getenv("REQUEST_TIMEOUT", "20"))
+GPT4_VISION_TIMEOUT = float(os.getenv("GPT4_VISION_TIMEOUT", "5"))  # seconds; analysis falls back to CLIP after this
+CLIP_SERVER_URL = os.getenv("CLIP_SERVER_URL")  # e.g. grpc://clip-server:51000; unset = in-process model
+CLIP_DEVICE = os.getenv("CLIP_DEVICE")  # e.g. cuda, cpu; unset = auto-detect
+# options: none, int8 (CPU only; opt-in - query/label vectors drift from the FP32 item
+# vectors in pgvector, and the zero-shot thresholds in app.py were tuned on FP32)
+CLIP_QUANTIZE = os.getenv("CLIP_QUANTIZE", "none")
+CLIP_COMPILE = os.getenv("CLIP_COMPILE", "true").lower() in ("1", "true", "yes")  # torch.compile the towers (CUDA only)
+TORCH_NUM_THREADS = int(os.getenv("TORCH_NUM_THREADS", str(max(1, (os.cpu_count() or 2) // 2))))  # ~physical cores
+CLIP_BATCH_WINDOW_MS = float(os.getenv("CLIP_BATCH_WINDOW_MS", "8"))  # micro-batch collection window
+CLIP_MAX_BATCH = int(os.getenv("CLIP_MAX_BATCH", "32"))
+REQUIRE_LIBJPEG_TURBO = os.getenv("REQUIRE_LIBJPEG_TURBO", "false").lower() in ("1", "true", "yes")  # fail startup without it
+
+# Cache Configuration (Redis is optional; the in-process LRU is always on)
+REDIS_URL = os.getenv("REDIS_URL")
+CACHE_LRU_SIZE = int(os.getenv("CACHE_LRU_SIZE", "1024"))
+ANALYZE_CACHE_TTL = int(os.getenv("ANALYZE_CACHE_TTL", "86400"))  # seconds
+TEXT_EMBED_LRU_SIZE = int(os.getenv("TEXT_EMBED_LRU_SIZE", "10000"))
+TEXT_EMBED_CACHE_TTL = int(os.getenv("TEXT_EMBED_CACHE_TTL", "604800"))  # seconds
+SEARCH_CACHE_TTL = int(os.getenv("SEARCH_CACHE_TTL", "300"))  # seconds; results go stale as items are added
+SEMANTIC_CACHE_SIZE = int(os.getenv("SEMANTIC_CACHE_SIZE", "10000"))  # ~30MB of 768-dim float32 vectors
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.97"))  # min cosine similarity for a hit
 
 # Stripe Configuration
 STRIPE_SECRET_KEY = os.getenv("STRIPE_SECRET_KEY", "sk_test_your_key_here")
@@ -2,28 +2,48 @@
 Image embedding generation using OpenAI or OpenCLIP.
 Production-optimized with model caching and error handling.
 """
-import base64
+import asyncio
+try:
+    import pybase64 as base64  # SIMD (SSSE3/AVX2/NEON) drop-in for the stdlib module
+except ImportError:
+    import base64
 import logging
 from io import BytesIO
-from typing import List, Optional
+from typing import Any, List, Optional
 
 from PIL import Image
 
 try:
     from .config import (
+        CLIP_BATCH_WINDOW_MS,
+        CLIP_COMPILE,
+        CLIP_DEVICE,
+        CLIP_MAX_BATCH,
+        CLIP_QUANTIZE,
+        CLIP_SERVER_URL,
         EMBEDDING_DIMENSION,
         EMBEDDING_PROVIDER,
         OPENAI_API_KEY,
         OPENAI_EMBEDDING_MODEL,
         REQUEST_TIMEOUT,
+        REQUIRE_LIBJPEG_TURBO,
+        TORCH_NUM_THREADS,
     )
 except ImportError:
     from config import (
+        CLIP_BATCH_WINDOW_MS,
+        CLIP_COMPILE,
+        CLIP_DEVICE,
+        CLIP_MAX_BATCH,
+        CLIP_QUANTIZE,
+        CLIP_SERVER_URL,
         EMBEDDING_DIMENSION,
         EMBEDDING_PROVIDER,
         OPENAI_API_KEY,
         OPENAI_EMBEDDING_MODEL,
         REQUEST_TIMEOUT,
+        REQUIRE_LIBJPEG_TURBO,
+        TORCH_NUM_THREADS,
     )
 
 logger = logging.getLogger(__name__)
@@ -31,6 +51,7 @@ logger = logging.getLogger(__name__)
 # Global model cache (lazy loaded)
 _openai_client = None
 _clip_model = None
+_clip_client = None
 _clip_processor = None
 
 
@@ -39,10 +60,14 @@ def preload_models():
     Preload models at startup to avoid cold-start latency.
     Call this in FastAPI lifespan to warm up models before first request.
     """
+    check_image_backend()
     provider = EMBEDDING_PROVIDER.lower()
     if provider == "openai":
         _get_openai_client()
         logger.info("OpenAI client initialized")
+    elif provider == "clip" and CLIP_SERVER_URL:
+        _get_clip_client()
+        logger.info(f"Using shared CLIP server at {CLIP_SERVER_URL}")
     elif provider == "clip":
         _get_clip_model()
         logger.info("CLIP model loaded into memory")
@@ -50,6 +75,21 @@ def preload_models():
         logger.warning(f"Unknown provider '{provider}', skipping preload")
 
 
+def check_image_backend():
+    """
+    Verify Pillow decodes JPEGs with libjpeg-turbo (SIMD decode path).
+    Raises when REQUIRE_LIBJPEG_TURBO is set (production image), otherwise warns.
+    """
+    from PIL import features
+    if features.check_feature("libjpeg_turbo"):
+        logger.info(f"Pillow {features.version('PIL')} using libjpeg-turbo {features.version('jpg')}")
+        return
+    message = "Pillow is not linked against libjpeg-turbo; JPEG decode will be slower"
+    if REQUIRE_LIBJPEG_TURBO:
+        raise RuntimeError(message)
+    logger.warning(message)
+
+
 def _get_openai_client():
     """Lazy-load OpenAI client with timeout and retry config."""
     global _openai_client
@@ -71,13 +111,123 @@ def _get_clip_model():
     """
     global _clip_model
     if _clip_model is None:
+        import torch
         from sentence_transformers import SentenceTransformer
+        
+        # One intra-op pool sized to physical cores; no inter-op fan-out on top of
+        # uvicorn workers and the to_thread pool (avoids oversubscription)
+        torch.set_num_threads(TORCH_NUM_THREADS)
+        try:
+            torch.set_num_interop_threads(1)
+        except RuntimeError:
+            pass  # only settable before the first parallel op
+        
         # Using ViT-B/32 (512-dim) - we'll pad to 768
         # For true 768-dim, use: open_clip ViT-L/14
-        _clip_model = SentenceTransformer("clip-ViT-B-32")
+        _clip_model = SentenceTransformer("clip-ViT-B-32", device=CLIP_DEVICE)
+        _clip_model.eval()
+        if CLIP_QUANTIZE.lower() == "int8" and _clip_model.device.type == "cpu":
+            # Dynamic INT8 for every Linear (attention + MLP) - the bulk of ViT/text FLOPs
+            torch.quantization.quantize_dynamic(
+                _clip_model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True
+            )
+            logger.info("CLIP quantized to INT8 (dynamic, Linear layers)")
+        if CLIP_COMPILE and _clip_model.device.type == "cuda":
+            _compile_clip(_clip_model)
+        logger.info(f"CLIP model on {_clip_model.device}")
     return _clip_model
 
 
+def _compile_clip(model):
+    """
+    torch.compile the vision and text towers in place, then warm them up so the
+    compile cost is paid at startup (inside lifespan) rather than by the first
+    requests. Default mode (fused Inductor kernels, no CUDA graphs): CUDA graphs
+    would be recorded per input shape and per thread, and the batcher encodes
+    varying batch sizes on arbitrary to_thread workers. dynamic=True compiles
+    shape-generic kernels so new batch sizes / text lengths don't recompile.
+    """
+    import torch
+    hf_clip = model[0].model
+    hf_clip.vision_model = torch.compile(hf_clip.vision_model, dynamic=True)
+    hf_clip.text_model = torch.compile(hf_clip.text_model, dynamic=True)
+    warmup = [Image.new("RGB", (224, 224)), "warmup"]
+    for _ in range(2):
+        with torch.inference_mode(), torch.autocast("cuda", dtype=torch.float16):
+            model.encode(warmup, batch_size=len(warmup))
+    logger.info("CLIP towers compiled (torch.compile, dynamic shapes)")
+
+
+def _get_clip_client():
+    """
+    Lazy-create the gRPC client for the shared CLIP server (clip-as-service).
+    All workers share the server's single GPU-resident model instead of each
+    loading its own copy.
+    """
+    global _clip_client
+    if _clip_client is None:
+        from clip_client import Client
+        _clip_client = Client(CLIP_SERVER_URL)
+    return _clip_client
+
+
+def _shrink_for_clip(image: Image.Image, size: int = 224):
+    """
+    Resize so the short side is `size` (what CLIP preprocessing does first),
+    so only a ~224px RGB array crosses the wire instead of the full photo.
+    """
+    import numpy as np
+    scale = size / min(image.size)
+    if scale < 1:
+        image = image.resize(
+            (round(image.width * scale), round(image.height * scale)), Image.BICUBIC
+        )
+    return np.asarray(image)
+
+
+def _remote_clip_encode(inputs, convert_to_tensor: bool = False, normalize_embeddings: bool = False, **kwargs):
+    """clip_encode() against CLIP_SERVER_URL; same input and output shapes as model.encode()."""
+    import numpy as np
+    from docarray import Document, DocumentArray
+    
+    single = not isinstance(inputs, list)
+    items = [inputs] if single else inputs
+    docs = DocumentArray([
+        Document(text=item) if isinstance(item, str) else Document(tensor=_shrink_for_clip(item))
+        for item in items
+    ])
+    embeddings = np.asarray(_get_clip_client().encode(docs).embeddings, dtype=np.float32)
+    if normalize_embeddings:
+        embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    if convert_to_tensor:
+        import torch
+        embeddings = torch.from_numpy(embeddings)
+    return embeddings[0] if single else embeddings
+
+
+def clip_encode(inputs, **kwargs):
+    """
+    model.encode() for the shared CLIP model, under inference_mode (no autograd
+    bookkeeping). On CUDA, also runs under FP16 autocast (tensor cores, half the
+    activation bytes). With CLIP_SERVER_URL set, encodes on the CLIP server instead.
+    """
+    if CLIP_SERVER_URL:
+        return _remote_clip_encode(inputs, **kwargs)
+    
+    import torch
+    model = _get_clip_model()
+    with torch.inference_mode():
+        if model.device.type != "cuda":
+            return model.encode(inputs, **kwargs)
+        with torch.autocast("cuda", dtype=torch.float16):
+            return model.encode(inputs, **kwargs)
+
+
+def decode_image(image_bytes: bytes) -> Image.Image:
+    """Decode uploaded bytes into an RGB PIL image (the form CLIP expects)."""
+    return Image.open(BytesIO(image_bytes)).convert("RGB")
+
+
 def _ensure_dimension(vec: List[float]) -> List[float]:
     """
     Ensure vector is exactly 768-dim via truncation or zero-padding.
@@ -118,6 +268,16 @@ def _embed_with_openai(image_bytes: bytes) -> List[float]:
         raise RuntimeError(f"OpenAI API error: {e}") from e
 
 
+def _average_normalized(image_embedding, text_embedding):
+    """
+    Multimodal embedding: average of two unit vectors, re-normalized.
+    Weighted equally; could also use weighted: 0.7 * image + 0.3 * text
+    """
+    import numpy as np
+    combined = (np.asarray(image_embedding) + np.asarray(text_embedding)) / 2.0
+    return combined / np.linalg.norm(combined)
+
+
 def _embed_with_clip(image_bytes: Optional[bytes] = None, text: Optional[str] = None) -> List[float]:
     """
     Generate embedding using open-source CLIP (via sentence-transformers).
@@ -135,33 +295,24 @@ def _embed_with_clip(image_bytes: Optional[bytes] = None, text: Optional[str] =
     - Enable GPU batching
     - Cache embeddings in Redis
     """
-    model = _get_clip_model()
-    
     try:
-        import numpy as np
-        
         # Text-only embedding
         if image_bytes is None and text and text.strip():
-            text_embedding = model.encode(text, normalize_embeddings=True)
+            text_embedding = clip_encode(text, normalize_embeddings=True)
             return _ensure_dimension(text_embedding.tolist())
         
         # Image-only embedding
         if image_bytes is not None and (text is None or not text.strip()):
-            image = Image.open(BytesIO(image_bytes)).convert("RGB")
-            image_embedding = model.encode(image, normalize_embeddings=True)
+            image = decode_image(image_bytes)
+            image_embedding = clip_encode(image, normalize_embeddings=True)
             return _ensure_dimension(image_embedding.tolist())
         
         # Multimodal (image + text) embedding
         if image_bytes is not None and text and text.strip():
-            image = Image.open(BytesIO(image_bytes)).convert("RGB")
-            image_embedding = model.encode(image, normalize_embeddings=True)
-            text_embedding = model.encode(text, normalize_embeddings=True)
-            # Average the embeddings (weighted equally)
-            # Could also use weighted: 0.7 * image + 0.3 * text
-            combined = (image_embedding + text_embedding) / 2.0
-            # Re-normalize after averaging
-            combined = combined / np.linalg.norm(combined)
-            return _ensure_dimension(combined.tolist())
+            image = decode_image(image_bytes)
+            image_embedding = clip_encode(image, normalize_embeddings=True)
+            text_embedding = clip_encode(text, normalize_embeddings=True)
+            return _ensure_dimension(_average_normalized(image_embedding, text_embedding).tolist())
             
         raise ValueError("Must provide image_bytes, text, or both")
             
@@ -211,3 +362,145 @@ def embed_image(image_bytes: Optional[bytes] = None, text: Optional[str] = None)
     except Exception as e:
         logger.error(f"Embedding failed for provider {provider}: {e}")
         raise
+
+
+class ClipBatcher:
+    """
+    Micro-batcher for CLIP encodes.
+    Inputs (PIL images or text) arriving within CLIP_BATCH_WINDOW_MS of the
+    first queued one run as a single clip_encode() (at most CLIP_MAX_BATCH);
+    each caller awaits its own Future.
+    """
+    
+    def __init__(self, window_ms: float = CLIP_BATCH_WINDOW_MS, max_batch: int = CLIP_MAX_BATCH):
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self.queue: Optional[asyncio.Queue] = None  # created by start(), on the serving loop
+        self.running = False
+    
+    def start(self) -> asyncio.Task:
+        """
+        Create the queue and launch the worker on the running loop (call from lifespan).
+        Creating the queue at import would bind it to the import-time loop on Python < 3.10.
+        """
+        self.queue = asyncio.Queue()
+        return asyncio.create_task(self.run())
+    
+    async def submit(self, item: Any):
+        """Queue an image or text and wait for its normalized embedding (numpy)"""
+        if not self.running:
+            # No worker (e.g. scripts outside the app lifespan): encode directly
+            return await asyncio.to_thread(clip_encode, item, normalize_embeddings=True)
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((item, future))
+        return await future
+    
+    async def run(self):
+        """Worker loop: collect a batch, run one forward pass, resolve futures"""
+        self.running = True
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                batch = [await self.queue.get()]
+                # One window per batch (not per item), so a steady trickle can't stall the first caller
+                deadline = loop.time() + self.window
+                while len(batch) < self.max_batch:
+                    try:
+                        batch.append(self.queue.get_nowait())
+                        continue
+                    except asyncio.QueueEmpty:
+                        pass
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self.queue.get(), timeout=remaining))
+                    except asyncio.TimeoutError:
+                        break
+                
+                # CLIPModel routes images and texts in one batch to their own towers
+                items = [item for item, _ in batch]
+                try:
+                    embeddings = await asyncio.to_thread(
+                        clip_encode, items, batch_size=len(items), normalize_embeddings=True
+                    )
+                except Exception as e:
+                    for _, future in batch:
+                        if not future.done():
+                            future.set_exception(e)
+                    continue
+                
+                for (_, future), embedding in zip(batch, embeddings):
+                    if not future.done():
+                        future.set_result(embedding)
+        finally:
+            self.running = False
+
+
+clip_batcher = ClipBatcher()
+
+
+async def embed_image_async(
+    image_bytes: Optional[bytes] = None,
+    text: Optional[str] = None,
+    pil_image: Optional[Image.Image] = None,
+) -> List[float]:
+    """
+    Async embed_image() for request handlers.
+    
+    CLIP encodes go through clip_batcher, so concurrent requests share one
+    forward pass. For multimodal (image + text) input the text is queued
+    first and encodes while the image is still being decoded. Other
+    providers run embed_image() in a worker thread.
+    
+    pil_image: already-decoded RGB image; skips decoding image_bytes for CLIP
+    """
+    has_text = bool(text and text.strip())
+    if image_bytes is None and pil_image is None and not has_text:
+        raise ValueError("Must provide either image_bytes or text (or both)")
+    
+    if EMBEDDING_PROVIDER.lower() != "clip":
+        return await asyncio.to_thread(embed_image, image_bytes, text)
+    
+    text_task = asyncio.ensure_future(clip_batcher.submit(text)) if has_text else None
+    try:
+        parts = []
+        if pil_image is not None:
+            parts.append(clip_batcher.submit(pil_image))
+        elif image_bytes is not None:
+            image = await asyncio.to_thread(decode_image, image_bytes)
+            parts.append(clip_batcher.submit(image))
+        if text_task is not None:
+            parts.append(text_task)
+        embeddings = await asyncio.gather(*parts)
+    except Exception as e:
+        if text_task is not None:
+            text_task.cancel()
+        logger.error(f"CLIP embedding failed: {e}")
+        raise RuntimeError(f"CLIP encoding error: {e}") from e
+    
+    if len(embeddings) == 2:
+        return _ensure_dimension(_average_normalized(*embeddings).tolist())
+    return _ensure_dimension(embeddings[0].tolist())
+
+
+async def embed_image_and_clip(pil_image: Image.Image, image_bytes: bytes):
+    """
+    Search embedding and raw CLIP image embedding for one upload.
+    
+    With the CLIP provider both come from a single batched encode of
+    pil_image (the search vector is just the padded copy). Other providers
+    embed image_bytes alongside the CLIP encode.
+    
+    Returns:
+        (768-dim search embedding, normalized CLIP embedding as np.ndarray)
+    """
+    clip_task = clip_batcher.submit(pil_image)
+    if EMBEDDING_PROVIDER.lower() == "clip":
+        clip_embedding = await clip_task
+        return _ensure_dimension(clip_embedding.tolist()), clip_embedding
+    embedding, clip_embedding = await asyncio.gather(
+        embed_image_async(image_bytes=image_bytes),
+        clip_task,
+    )
+    return embedding, clip_embedding
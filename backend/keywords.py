@@ -0,0 +1,106 @@
+"""
+Keyword mining over the similar-items text for /analyze_image.
+Brand and material keywords share one Aho-Corasick automaton (a single pass
+finds both); sizes need whole-word matches, so they use a regex. Everything
+is compiled once at import. Tables are lowercase; callers pass lowercased text.
+"""
+import re
+from collections import Counter
+from typing import List, Tuple
+
+import ahocorasick
+
+try:
+    from .brands import TEXT_BRANDS
+except ImportError:
+    from brands import TEXT_BRANDS
+
+# Material -> keywords mentioned in similar items' titles/descriptions
+MATERIAL_KEYWORDS = {
+    "cotton": ["cotton", "jersey"],
+    "denim": ["denim", "jean"],
+    "leather": ["leather", "suede"],
+    "wool": ["wool", "cashmere", "merino"],
+    "silk": ["silk", "satin"],
+    "polyester": ["polyester", "poly"],
+    "linen": ["linen"],
+    "nylon": ["nylon"],
+    "canvas": ["canvas"]
+}
+
+# Size labels
+SIZE_KEYWORDS = ("xs", "s", "m", "l", "xl", "xxl")
+
+# Whole-word size tokens only ("m" in "cotton" or the "s" in "levi's" don't count)
+_SIZE_RE = re.compile(
+    r"(?<![\w'])(%s)(?![\w'])" % "|".join(sorted(SIZE_KEYWORDS, key=len, reverse=True))
+)
+
+
+# TEXT_BRANDS longest first, each with the longer keywords that contain it
+# ("ami" -> ("ami paris",)), so a mention is credited to its longest keyword only
+_BRAND_CONTAINERS = tuple(
+    (kw, tuple(other for other in TEXT_BRANDS if other != kw and kw in other))
+    for kw in sorted(TEXT_BRANDS, key=len, reverse=True)
+)
+
+
+def _build_automaton(tagged):
+    """Aho-Corasick automaton mapping each keyword to its (bucket, label) tags"""
+    tags = {}
+    for kw, tag in tagged:
+        tags.setdefault(kw, []).append(tag)
+    automaton = ahocorasick.Automaton()
+    for kw, kw_tags in tags.items():
+        automaton.add_word(kw, tuple(kw_tags))
+    automaton.make_automaton()
+    return automaton
+
+
+_TEXT_AUTOMATON = _build_automaton([
+    *((kw, ("brand", kw)) for kw in TEXT_BRANDS),
+    *((kw, ("material", material)) for material, keywords in MATERIAL_KEYWORDS.items() for kw in keywords),
+])
+
+
+def scan_text(all_text: str, count_brands: bool = True) -> Tuple[str, int, List[str]]:
+    """
+    Brand mentions and materials in all_text, in one automaton pass.
+    
+    A mention counts only for the longest brand keyword covering it
+    ("ami paris" is not also an "ami"); ties go to the longer keyword.
+    
+    Returns:
+        (most mentioned TEXT_BRANDS keyword or "", its count,
+         materials title-cased in MATERIAL_KEYWORDS order)
+    """
+    brand_counts = Counter()
+    found = set()
+    for _, tags in _TEXT_AUTOMATON.iter(all_text):
+        for bucket, label in tags:
+            if bucket == "material":
+                found.add(label)
+            elif count_brands:
+                brand_counts[label] += 1
+    materials = [material.title() for material in MATERIAL_KEYWORDS if material in found]
+    
+    # Raw counts include hits inside longer keywords; peel those off, longest first
+    own_counts = {}
+    if brand_counts:
+        for kw, containers in _BRAND_CONTAINERS:
+            if brand_counts[kw]:
+                own_counts[kw] = brand_counts[kw] - sum(own_counts.get(c, 0) for c in containers)
+    text_brand, text_brand_count = max(
+        ((kw, n) for kw, n in own_counts.items() if n > 0),
+        key=lambda kv: (kv[1], len(kv[0])),
+        default=("", 0),
+    )
+    return text_brand, text_brand_count, materials
+
+
+def estimate_size(all_text: str, default: str = "M") -> str:
+    """Most frequently mentioned size in all_text (upper-cased), or default if none is."""
+    counts = Counter(_SIZE_RE.findall(all_text))
+    if not counts:
+        return default
+    return counts.most_common(1)[0][0].upper()
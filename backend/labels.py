@@ -0,0 +1,197 @@
+"""
+Zero-shot label sets for /analyze_image and their CLIP text embeddings.
+Label embeddings are constant, so they are encoded once at startup.
+"""
+import hashlib
+import logging
+from itertools import accumulate
+
+try:
+    from .embeddings import clip_encode
+except ImportError:
+    from embeddings import clip_encode
+
+logger = logging.getLogger(__name__)
+
+# Category prompts - HIGHLY GRANULAR
+CATEGORY_LABELS = [
+    "bomber jacket flight jacket ma-1",
+    "parka winter coat hooded coat",
+    "denim jacket jean jacket trucker jacket",
+    "blazer suit jacket sport coat",
+    "leather jacket moto jacket biker jacket",
+    "windbreaker track jacket coach jacket",
+    "hoodie hooded sweatshirt pullover hoodie zip-up hoodie",
+    "cardigan button-up sweater knit cardigan",
+    "crewneck sweater pullover sweater",
+    "v-neck sweater",
+    "turtleneck sweater roll neck",
+    "fleece jacket fleece pullover",
+    "t-shirt tee short sleeve top",
+    "long sleeve shirt button-up oxford chambray",
+    "polo shirt collared shirt",
+    "tank top sleeveless shirt muscle tee",
+    "blouse feminine top",
+    "dress gown maxi midi mini dress",
+    "jeans denim pants 5-pocket",
+    "chinos khakis dress pants trousers",
+    "cargo pants utility pants tactical pants",
+    "joggers sweatpants track pants",
+    "shorts bermuda shorts",
+    "skirt midi skirt mini skirt",
+    "running shoes athletic sneakers trainers",
+    "basketball sneakers high-top sneakers",
+    "casual sneakers low-top sneakers canvas shoes",
+    "boots leather boots work boots chelsea boots",
+    "sandals slides flip-flops",
+    "backpack rucksack bag",
+    "tote bag shoulder bag handbag",
+    "crossbody bag messenger bag",
+    "hat cap beanie snapback"
+]
+CATEGORY_NAMES = [
+    "bomber_jacket", "parka", "denim_jacket", "blazer", "leather_jacket", 
+    "windbreaker", "hoodie", "cardigan", "crewneck_sweater", "vneck_sweater",
+    "turtleneck", "fleece", "tshirt", "shirt", "polo", "tank",
+    "blouse", "dress", "jeans", "chinos", "cargo_pants", "joggers",
+    "shorts", "skirt", "running_shoes", "basketball_sneakers", 
+    "casual_sneakers", "boots", "sandals", "backpack", "tote_bag",
+    "crossbody_bag", "hat"
+]
+
+# Fine-grained category -> display name (e.g. "bomber_jacket" -> "Bomber Jacket")
+CATEGORY_DISPLAY = {name: name.replace("_", " ").title() for name in CATEGORY_NAMES}
+
+# Fine-grained category -> broad category (for compatibility)
+CATEGORY_GROUPS = {
+    "bomber_jacket": "outerwear",
+    "parka": "outerwear",
+    "denim_jacket": "outerwear",
+    "blazer": "outerwear",
+    "leather_jacket": "outerwear",
+    "windbreaker": "outerwear",
+    "hoodie": "outerwear",
+    "cardigan": "outerwear",
+    "crewneck_sweater": "outerwear",
+    "vneck_sweater": "outerwear",
+    "turtleneck": "outerwear",
+    "fleece": "outerwear",
+    "tshirt": "tops",
+    "shirt": "tops",
+    "polo": "tops",
+    "tank": "tops",
+    "blouse": "tops",
+    "dress": "dresses",
+    "jeans": "bottoms",
+    "chinos": "bottoms",
+    "cargo_pants": "bottoms",
+    "joggers": "bottoms",
+    "shorts": "bottoms",
+    "skirt": "bottoms",
+    "running_shoes": "shoes",
+    "basketball_sneakers": "shoes",
+    "casual_sneakers": "shoes",
+    "boots": "shoes",
+    "sandals": "shoes",
+    "backpack": "bags",
+    "tote_bag": "bags",
+    "crossbody_bag": "bags",
+    "hat": "accessories"
+}
+
+# Colors - ULTRA SIMPLE (just color words)
+# Debug showed simpler is better: "white" scores 0.2279 vs "white clothing" 0.2250
+COLOR_LABELS = [
+    "black", "white", "gray", "red", "blue", "navy",
+    "green", "yellow", "orange", "pink", "purple", 
+    "brown", "multicolor"
+]
+COLOR_NAMES = [
+    "Black", "White", "Gray", "Red", "Blue", "Navy",
+    "Green", "Yellow", "Orange", "Pink", "Purple", 
+    "Brown", "Multicolor"
+]
+
+# Patterns
+PATTERN_LABELS = [
+    "solid plain single color no pattern",
+    "striped horizontal stripes vertical stripes",
+    "graphic print logo text typography",
+    "floral flowers botanical garden print",
+    "plaid checkered tartan gingham",
+    "camouflage camo military print",
+    "tie-dye dyed marble swirl",
+    "polka dot dotted spotted",
+    "animal print leopard zebra snake",
+    "abstract geometric shapes",
+    "denim wash stonewash distressed faded",
+    "embroidered stitched embellished"
+]
+PATTERN_NAMES = [
+    "Solid", "Striped", "Graphic", "Floral", "Plaid", 
+    "Camo", "Tie-Dye", "Polka Dot", "Animal Print", 
+    "Abstract", "Denim Wash", "Embroidered"
+]
+
+# Visually distinctive brands (text mining covers the rest)
+BRAND_LABELS = [
+    # Only brands with very distinctive visual styles
+    "supreme box logo red white streetwear",
+    "nike swoosh checkmark athletic",
+    "adidas three stripes trefoil athletic",
+    "gucci gg pattern luxury italian",
+    "louis vuitton lv monogram pattern",
+    "polo ralph lauren polo pony preppy",
+    "tommy hilfiger flag logo red white blue",
+    "champion c logo athletic",
+    "carhartt workwear utility tan brown",
+    "patagonia outdoor fleece mountain",
+    "north face outdoor technical black",
+    "vans skateboard checkerboard",
+    "converse chuck taylor all-star canvas",
+    "no clear brand logo generic plain"
+]
+BRAND_NAMES = [
+    "Supreme", "Nike", "Adidas", "Gucci", "Louis Vuitton",
+    "Polo Ralph Lauren", "Tommy Hilfiger", "Champion", 
+    "Carhartt", "Patagonia", "The North Face", 
+    "Vans", "Converse", ""
+]
+
+# Changes whenever any prompt changes (used to version cached analyses)
+LABELS_VERSION = hashlib.sha256(
+    "\n".join(CATEGORY_LABELS + COLOR_LABELS + PATTERN_LABELS + BRAND_LABELS).encode("utf-8")
+).hexdigest()[:12]
+
+# All groups are stacked into one [N_all, D] matrix; these slice it per group.
+# Brand and color go last: they are the groups GPT-4 Vision can make redundant.
+_ALL_LABELS = CATEGORY_LABELS + PATTERN_LABELS + BRAND_LABELS + COLOR_LABELS
+_ends = list(accumulate(len(g) for g in (CATEGORY_LABELS, PATTERN_LABELS, BRAND_LABELS, COLOR_LABELS)))
+CATEGORY_SLICE = slice(0, _ends[0])
+PATTERN_SLICE = slice(_ends[0], _ends[1])
+BRAND_SLICE = slice(_ends[1], _ends[2])
+COLOR_SLICE = slice(_ends[2], _ends[3])
+
+# Normalized text embeddings (torch tensor on the model's device), set by preload
+ALL_LABEL_EMB = None
+
+
+def preload_label_embeddings():
+    """Encode every label set once. Call from FastAPI lifespan after preload_models()."""
+    global ALL_LABEL_EMB
+    if ALL_LABEL_EMB is not None:
+        return
+    ALL_LABEL_EMB = clip_encode(_ALL_LABELS, convert_to_tensor=True, normalize_embeddings=True)
+    logger.info(f"Label embeddings precomputed: {tuple(ALL_LABEL_EMB.shape)}")
+
+
+def label_embeddings(need_brand: bool = True, need_color: bool = True):
+    """
+    Leading rows of ALL_LABEL_EMB covering the groups still needed (a view, no copy).
+    Category and pattern are always included; the other slices stay valid.
+    """
+    if need_color:
+        return ALL_LABEL_EMB
+    if need_brand:
+        return ALL_LABEL_EMB[:COLOR_SLICE.start]
+    return ALL_LABEL_EMB[:BRAND_SLICE.start]
@@ -26,6 +26,67 @@ class SearchResponse(BaseModel):
     items: List[DepopItem]
 
 
+# ============================================================================
+# Listing Models
+# ============================================================================
+
+class AddItemRequest(BaseModel):
+    """New listing for /add_item (image and title are checked by the endpoint)"""
+    image_base64: Optional[str] = None
+    title: Optional[str] = ""
+    description: Optional[str] = ""
+    price: Optional[float] = None
+    brand: Optional[str] = ""
+    category: Optional[str] = ""
+    size: Optional[str] = ""
+    condition: Optional[str] = ""
+    owner_id: Optional[str] = ""
+    source: Optional[str] = "modaics"
+    image_url: Optional[str] = ""
+
+
+class GenerateDescriptionRequest(BaseModel):
+    """Listing attributes for /generate_description (send image or image_url)"""
+    image: Optional[str] = Field(default=None, description="Base64 encoded image data")
+    image_url: Optional[str] = None
+    category: str = "clothing item"
+    brand: Optional[str] = ""
+    colors: List[str] = []
+    condition: str = "Good"
+    materials: List[str] = []
+    size: Optional[str] = ""
+
+
+# ============================================================================
+# Sketchbook Models
+# ============================================================================
+
+class SketchbookSettingsUpdate(BaseModel):
+    """Sketchbook settings patch; None leaves a field unchanged"""
+    title: Optional[str] = None
+    description: Optional[str] = None
+    access_policy: Optional[str] = None
+    membership_rule: Optional[str] = None
+    min_spend_amount: Optional[float] = None
+    min_spend_window_months: Optional[int] = None
+
+
+class SketchbookPostCreate(BaseModel):
+    """New sketchbook post"""
+    author_user_id: str
+    post_type: str
+    title: str
+    body: Optional[str] = None
+    media: Optional[List[Dict[str, Any]]] = None
+    tags: Optional[List[str]] = None
+    visibility: str = "public"
+    poll_question: Optional[str] = None
+    poll_options: Optional[List[Dict[str, Any]]] = None
+    poll_closes_at: Optional[datetime] = None
+    event_id: Optional[int] = None
+    event_highlight: Optional[str] = None
+
+
 # ============================================================================
 # Payment Models
 # ============================================================================
@@ -0,0 +1,59 @@
+"""Tests for the in-process semantic search cache."""
+from backend import cache
+from backend.cache import SemanticCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_cache(monkeypatch, size=4, ttl=60.0):
+    clock = FakeClock()
+    monkeypatch.setattr(cache.time, "monotonic", clock)
+    return SemanticCache(size=size, threshold=0.97, ttl=ttl), clock
+
+
+def test_hit_for_near_duplicate_and_miss_for_unrelated(monkeypatch):
+    sc, _ = make_cache(monkeypatch)
+    sc.put([1.0, 0.0, 0.0], "a")
+    assert sc.get([1.0, 0.01, 0.0]) == "a"
+    assert sc.get([0.0, 1.0, 0.0]) is None
+
+
+def test_expired_entry_misses_then_re_put_replaces_it(monkeypatch):
+    sc, clock = make_cache(monkeypatch)
+    sc.put([1.0, 0.0, 0.0], "old")
+    clock.now += 61
+    assert sc.get([1.0, 0.0, 0.0]) is None
+
+    sc.put([1.0, 0.0, 0.0], "new")
+    assert sc.get([1.0, 0.0, 0.0]) == "new"
+    assert sc.get([1.0, 0.01, 0.0]) == "new"  # paraphrases hit again too
+    assert sc.stats()["entries"] == 1
+
+
+def test_expired_row_does_not_shadow_a_fresh_match(monkeypatch):
+    sc, clock = make_cache(monkeypatch)
+    sc.put([1.0, 0.13, 0.0], "stale")  # both rows are hits for the query,
+    clock.now += 50
+    sc.put([1.0, -0.13, 0.0], "fresh")  # but not near-duplicates of each other
+    clock.now += 20
+    assert sc.get([1.0, 0.02, 0.0]) == "fresh"
+    assert sc.stats()["entries"] == 2
+
+
+def test_full_cache_evicts_least_recently_used(monkeypatch):
+    sc, clock = make_cache(monkeypatch, size=2)
+    sc.put([1.0, 0.0, 0.0], "a")
+    clock.now += 1
+    sc.put([0.0, 1.0, 0.0], "b")
+    clock.now += 1
+    assert sc.get([1.0, 0.0, 0.0]) == "a"  # touch "a"
+    sc.put([0.0, 0.0, 1.0], "c")
+    assert sc.get([0.0, 1.0, 0.0]) is None
+    assert sc.get([1.0, 0.0, 0.0]) == "a"
+    assert sc.get([0.0, 0.0, 1.0]) == "c"
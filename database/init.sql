@@ -20,8 +20,8 @@ CREATE TABLE IF NOT EXISTS fashion_items (
     location VARCHAR(100),
     seller_username VARCHAR(100),
     
-    -- CLIP embedding (768-dimensional for clip-ViT-B-32)
-    embedding vector(768),
+    -- CLIP embedding (768-dimensional for clip-ViT-B-32, half precision)
+    embedding halfvec(768),
     
     -- Modaics-specific fields
     sustainability_score INTEGER CHECK (sustainability_score >= 0 AND sustainability_score <= 100),
@@ -37,9 +37,16 @@ CREATE TABLE IF NOT EXISTS fashion_items (
 
 -- Create HNSW index for fast vector similarity search
 -- This enables <=> operator for cosine similarity
+-- m/ef_construction raised from the defaults (16/64) for recall; see search.py for ef_search
 CREATE INDEX IF NOT EXISTS idx_fashion_items_embedding 
 ON fashion_items 
-USING hnsw (embedding vector_cosine_ops);
+USING hnsw (embedding halfvec_cosine_ops)
+WITH (m = 24, ef_construction = 128);
+
+-- Binary-quantized index for two-stage search (Hamming recall, then halfvec rerank)
+CREATE INDEX IF NOT EXISTS idx_fashion_items_embedding_bits
+ON fashion_items
+USING hnsw ((binary_quantize(embedding)::bit(768)) bit_hamming_ops);
 
 -- Indexes for filtering
 CREATE INDEX IF NOT EXISTS idx_fashion_items_platform ON fashion_items(platform);
@@ -508,7 +515,7 @@ CREATE TRIGGER update_sketchbook_comments_updated_at BEFORE UPDATE ON sketchbook
 -- (Will be populated after data import)
 COMMENT ON TABLE fashion_items IS 'Marketplace items scraped from Depop, Grailed, Vinted with CLIP embeddings';
 COMMENT ON TABLE user_wardrobe IS 'User-owned items in digital wardrobe, searchable with same CLIP embeddings';
-COMMENT ON COLUMN fashion_items.embedding IS '768-dimensional CLIP embeddings from sentence-transformers/clip-ViT-B-32';
+COMMENT ON COLUMN fashion_items.embedding IS '768-dimensional CLIP embeddings (halfvec) from sentence-transformers/clip-ViT-B-32';
 COMMENT ON COLUMN user_wardrobe.embedding IS 'Same CLIP embeddings used for marketplace search';
 COMMENT ON TABLE sketchbooks IS 'Brand workspaces for sharing WIPs, drops, events, and polls with their community';
 COMMENT ON TABLE sketchbook_posts IS 'Posts within sketchbooks - updates, events, drops, polls, moodboards';